@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autoemail', '0002_auto_20210402_1145'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='emailqueue',
+            index=models.Index(fields=['-create_date', '-id'], name='emailqueue_create_id_idx'),
+        ),
+    ]
@@ -268,6 +268,17 @@ class EmailQueue(models.Model):
     create_date = models.DateTimeField(default=timezone.now)
     update_date = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        """Meta for the model."""
+
+        indexes = [
+            # keyset pagination order
+            models.Index(
+                fields=["-create_date", "-id"],
+                name="emailqueue_create_id_idx",
+            ),
+        ]
+
     def __str__(self):
         """Return Value."""
         return self.subject + " - " + self.sent_to
@@ -1,8 +1,9 @@
 import pytz
 from datetime import datetime
+from decimal import Decimal
 
-from django.db.models import Sum
 from django.shortcuts import get_object_or_404
+from djmoney import settings as money_settings
 
 
 from rest_framework import viewsets, mixins, status
@@ -17,8 +18,11 @@ from django_filters.rest_framework import DjangoFilterBackend
 
 from bat.autoemail import serializers
 from bat.autoemail.models import EmailCampaign, EmailQueue
+from bat.company.models import Company
+from bat.globalutils.pagination import KeysetPagination
 
 from bat.market.models import AmazonOrder, AmazonOrderItem, AmazonMarketplace
+from bat.setting.exchange import sum_converted
 
 from bat.autoemail.constants import (
     ORDER_EMAIL_STATUS_QUEUED,
@@ -58,11 +62,12 @@ class EmailQueueViewsets(
     queryset = EmailQueue.objects.all()
     serializer_class = serializers.EmailQueueSerializer
     permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
 
     def filter_queryset(self, queryset):
         company_id = self.kwargs.get("company_pk", None)
         queryset = super().filter_queryset(queryset)
-        return queryset.filter(emailcampaign__company__id=company_id).order_by("-create_date")
+        return queryset.filter(emailcampaign__company__id=company_id).order_by("-create_date", "-id")
 
 
 class DashboardAPIView(APIView):
@@ -100,31 +105,36 @@ class DashboardAPIView(APIView):
             all_email_queue = all_email_queue.filter(
                 emailcampaign__amazonmarketplace_id=marketplace.id)
 
+        # totals of all marketplaces in the requested or company currency
         currency = request.GET.get("currency", None)
         if currency:
             currency = currency.upper()
-            all_amazon_orders = all_amazon_orders.filter(
-                amount_currency=currency)
-
-            all_email_queue = all_email_queue.filter(
-                amazonorder__amount_currency=currency)
+        else:
+            company = get_object_or_404(Company, pk=company_pk)
+            currency = company.currency or money_settings.BASE_CURRENCY
 
         total_orders = all_amazon_orders.count()
 
-        total_sales = all_amazon_orders.aggregate(Sum('amount')).get("amount__sum")
+        # orders of currencies without a rate are left out of the totals
+        missing_rates = set()
+        amount_par_day = sum_converted(
+            all_amazon_orders, "amount", "purchase_date", currency,
+            missing=missing_rates,
+        )
+        total_sales = sum(amount_par_day.values(), Decimal("0.00"))
 
         total_email_sent = all_email_queue.filter(status__name=ORDER_EMAIL_STATUS_SEND).count()
 
         total_email_in_queue = all_email_queue.filter(
             status__name__in=[ORDER_EMAIL_STATUS_SCHEDULED, ORDER_EMAIL_STATUS_QUEUED]).count()
 
-        amount_par_day = list(all_amazon_orders.values("purchase_date__date").annotate(total_amount=Sum('amount')).values_list(
-            'purchase_date__date', 'total_amount').order_by('purchase_date__date'))
         data = {}
-        for date, total_amount in amount_par_day:
+        for date, total_amount in sorted(amount_par_day.items()):
             data[date.strftime(dt_format)] = total_amount
 
         stats = {"data": data,
+                 "currency": currency,
+                 "missing_rates": sorted(missing_rates),
                  "total_sales": total_sales,
                  "total_orders": total_orders,
                  "total_email_sent": total_email_sent,
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class CommentsConfig(AppConfig):
     name = 'bat.comments'
+
+    def ready(self):
+        import bat.comments.signals  # noqa F401
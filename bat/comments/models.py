@@ -31,15 +31,33 @@ class Comment(models.Model):
     def has_retrieve_permission(request):
         return True
 
+    def has_parent_retrieve_permission(self, request):
+        """
+        check retrieve permission of the commented object once per request
+        """
+        checked = getattr(request, "_comment_parent_permissions", None)
+        if checked is None:
+            checked = {}
+            request._comment_parent_permissions = checked
+        key = (self.content_type_id, self.object_id)
+        if key not in checked:
+            checked[key] = self.content_object.has_retrieve_permission(
+                request)
+        return checked[key]
+
     def has_object_retrieve_permission(self, request):
-        return self.content_object.has_retrieve_permission(request) and self.content_object.has_retrieve_permission(request)
+        return self.has_parent_retrieve_permission(request)
 
     @staticmethod
     def has_list_permission(request):
         return True
 
     def has_object_list_permission(self, request):
-        return self.content_object.has_retrieve_permission(request) and self.content_object.has_retrieve_permission(request)
+        return self.has_parent_retrieve_permission(request)
+
+    @staticmethod
+    def has_thread_permission(request):
+        return True
 
     @staticmethod
     def has_create_permission(request):
@@ -2,6 +2,7 @@ from rest_framework import serializers
 
 from bat.users.serializers import UserSerializer
 from bat.comments.models import Comment
+from bat.comments.threads import get_comment_counts
 
 
 class CommentSerializear(serializers.ModelSerializer):
@@ -13,3 +14,41 @@ class CommentSerializear(serializers.ModelSerializer):
                   "content", "posted", "edited")
         read_only_fields = ("id", "user", "content_type",
                             "object_id", "posted", "edited")
+
+
+class CommentThreadSerializer(CommentSerializear):
+    """Comment with its replies nested, built by threads.load_thread."""
+
+    replies = serializers.SerializerMethodField()
+
+    class Meta(CommentSerializear.Meta):
+        fields = CommentSerializear.Meta.fields + ("replies",)
+
+    def get_replies(self, obj):
+        return CommentThreadSerializer(
+            getattr(obj, "thread_replies", []), many=True, context=self.context
+        ).data
+
+
+class CommentCountField(serializers.ReadOnlyField):
+    """
+    Number of comments of the object.
+
+    Inside a list the counts of all listed objects are loaded at once and
+    kept in the serializer context.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs["source"] = "*"
+        super().__init__(**kwargs)
+
+    def to_representation(self, obj):
+        counts = self.context.setdefault("comment_counts", {})
+        if obj.pk not in counts:
+            objects = [obj]
+            list_serializer = getattr(self.parent, "parent", None)
+            if isinstance(list_serializer, serializers.ListSerializer) and \
+                    isinstance(list_serializer.instance, list):
+                objects = list_serializer.instance
+            counts.update(get_comment_counts(objects))
+        return counts.get(obj.pk, 0)
@@ -0,0 +1,13 @@
+"""File to receive signals from model or actions."""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from bat.comments.models import Comment
+from bat.comments.threads import invalidate_comment_count
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_count_receiver(sender, instance, **kwargs):
+    """Drop cached comment count of the commented object."""
+    invalidate_comment_count(instance.content_type_id, instance.object_id)
@@ -0,0 +1,82 @@
+"""Loading of comment threads and cached comment counts."""
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db.models import Count
+
+from bat.comments.models import Comment
+
+COMMENT_COUNT_CACHE_TIMEOUT = 60 * 60
+
+
+def get_comment_count_cache_key(content_type_id, object_id):
+    return "comment_count_{0}_{1}".format(content_type_id, object_id)
+
+
+def invalidate_comment_count(content_type_id, object_id):
+    cache.delete(get_comment_count_cache_key(content_type_id, object_id))
+
+
+def get_comment_counts(objects):
+    """
+    return comment count of every object by its pk, cached counts are read
+    with one cache call and missing ones are counted with one query.
+    """
+    objects = list(objects)
+    if not objects:
+        return {}
+    content_type = ContentType.objects.get_for_model(objects[0])
+    keys = {
+        obj.pk: get_comment_count_cache_key(content_type.id, obj.pk)
+        for obj in objects
+    }
+    cached = cache.get_many(keys.values())
+    counts = {pk: cached[key] for pk, key in keys.items() if key in cached}
+    missing = [pk for pk in keys if pk not in counts]
+    if missing:
+        found = dict(
+            Comment.objects.filter(
+                content_type=content_type, object_id__in=missing
+            )
+            .values("object_id")
+            .annotate(total=Count("id"))
+            .values_list("object_id", "total")
+        )
+        counted = {pk: found.get(pk, 0) for pk in missing}
+        cache.set_many(
+            {keys[pk]: count for pk, count in counted.items()},
+            COMMENT_COUNT_CACHE_TIMEOUT,
+        )
+        counts.update(counted)
+    return counts
+
+
+def build_thread(comments):
+    """
+    attach replies of every comment as ``thread_replies`` and return the top
+    level comments, order of the given comments is kept.
+    """
+    by_id = {}
+    for comment in comments:
+        comment.thread_replies = []
+        by_id[comment.id] = comment
+    roots = []
+    for comment in by_id.values():
+        parent = by_id.get(comment.parent_id)
+        if parent is None:
+            roots.append(comment)
+        else:
+            parent.thread_replies.append(comment)
+    return roots
+
+
+def load_thread(content_type, object_id):
+    """
+    return top level comments of the object with nested replies, the whole
+    thread is fetched with one query.
+    """
+    comments = (
+        Comment.objects.filter(content_type=content_type, object_id=object_id)
+        .select_related("user")
+        .order_by("posted", "id")
+    )
+    return build_thread(comments)
@@ -1,5 +1,7 @@
 from django.utils.translation import ugettext_lazy as _
 from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import Http404
 
 from rest_framework import viewsets, status
 from rest_framework.permissions import IsAuthenticated
@@ -11,6 +13,7 @@ from dry_rest_permissions.generics import DRYPermissions
 
 from bat.comments.models import Comment
 from bat.comments import serializers
+from bat.comments.threads import load_thread
 from bat.company.utils import get_member
 from bat.globalutils.utils import has_any_permission
 
@@ -20,6 +23,31 @@ class BaseCommentViewSet(viewsets.ModelViewSet):
     serializer_class = serializers.CommentSerializear
     queryset = Comment.objects.all()
     permission_classes = (IsAuthenticated, DRYPermissions,)
+    # lookup from the commented object to the id of its company
+    parent_company_lookup = None
+
+    def get_parent_object(self, company_pk, object_pk):
+        """
+        return the commented object of the company, 404 when it doesn't
+        exist or belongs to another company
+        """
+        try:
+            return self.get_content_type().get_object_for_this_type(
+                pk=object_pk, **{self.parent_company_lookup: company_pk})
+        except (ObjectDoesNotExist, ValueError):
+            raise Http404
+
+    def has_list_permission(self, request, company_pk, object_pk):
+        """
+        check list permission of the member and retrieve permission of the
+        commented object once per list
+        """
+        member = get_member(company_id=company_pk, user_id=request.user.id)
+        if not has_any_permission(member, self.allow_list_permission_list):
+            return False
+        parent = self.get_parent_object(company_pk, object_pk)
+        return parent.has_retrieve_permission(
+            request) and parent.has_object_retrieve_permission(request)
 
     def filter_queryset(self, queryset):
         queryset = super().filter_queryset(queryset)
@@ -32,7 +60,8 @@ class BaseCommentViewSet(viewsets.ModelViewSet):
         )
         content_type = self.get_content_type()
         return queryset.filter(
-            content_type=content_type, object_id=object_id).order_by("posted")
+            content_type=content_type, object_id=object_id).select_related(
+                "user").order_by("posted")
 
     def create(self, request, company_pk, object_pk):
         member = get_member(company_id=company_pk, user_id=request.user.id)
@@ -48,9 +77,11 @@ class BaseCommentViewSet(viewsets.ModelViewSet):
 
     def list(self, request, *args, **kwargs):
         company_pk = self.kwargs.get("company_pk", None)
-        member = get_member(company_id=company_pk, user_id=request.user.id)
-        if not (has_any_permission(member, self.allow_list_permission_list)):
-            return Response({"detail": _("You do not have permission to perform this action.")}, status=status.HTTP_403_FORBIDDEN)
+        object_pk = self.kwargs.get("object_pk", None)
+        if not self.has_list_permission(request, company_pk, object_pk):
+            return Response(
+                {"detail": _("You do not have permission to perform this action.")},
+                status=status.HTTP_403_FORBIDDEN)
 
         queryset = self.filter_queryset(self.get_queryset())
 
@@ -61,3 +92,17 @@ class BaseCommentViewSet(viewsets.ModelViewSet):
 
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
+
+    @action(detail=False, methods=["get"])
+    def thread(self, request, company_pk, object_pk):
+        """
+        list comments of the object as a tree of replies
+        """
+        if not self.has_list_permission(request, company_pk, object_pk):
+            return Response(
+                {"detail": _("You do not have permission to perform this action.")},
+                status=status.HTTP_403_FORBIDDEN)
+        comments = load_thread(self.get_content_type(), object_pk)
+        serializer = serializers.CommentThreadSerializer(
+            comments, many=True, context=self.get_serializer_context())
+        return Response(serializer.data)
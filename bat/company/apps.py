@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class CompanyConfig(AppConfig):
     name = "bat.company"
+
+    def ready(self):
+        import bat.company.partners  # noqa F401
@@ -40,4 +40,23 @@ INVENTORY_PREDICATION_TYPE = (
     (MONTHLY, "Monthly"),
     (QUARTERLY, "Quarterly"),
     (YEARLY, "Yearly"),
-)
\ No newline at end of file
+)
+
+INVENTORY_IN_STOCK = "In stock"
+INVENTORY_PICKED_UP = "Picked up"
+INVENTORY_IN_TRANSIT = "In transit"
+INVENTORY_READY_TO_SHIP = "Ready to ship"
+INVENTORY_SHIPPED = "Shipped"
+INVENTORY_TRANSFER = "Transfer"
+INVENTORY_LOST = "Lost"
+INVENTORY_DAMAGED = "Damaged"
+INVENTORY_DETAIL_TYPE = (
+    (INVENTORY_IN_STOCK, "In stock"),
+    (INVENTORY_PICKED_UP, "Picked up"),
+    (INVENTORY_IN_TRANSIT, "In transit"),
+    (INVENTORY_READY_TO_SHIP, "Ready to ship"),
+    (INVENTORY_SHIPPED, "Shipped"),
+    (INVENTORY_TRANSFER, "Transfer"),
+    (INVENTORY_LOST, "Lost"),
+    (INVENTORY_DAMAGED, "Damaged"),
+)
@@ -0,0 +1,332 @@
+"""Weekly inventory forecast of company products computed with NumPy."""
+import datetime
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import DateField, Sum
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+from psycopg2.extras import execute_values
+
+from bat.company.constants import WEEKLY
+from bat.company.models import (
+    CompanyInventory,
+    CompanyInventoryPrediction,
+    CompanyOrderProduct,
+    CompanyProduct,
+)
+from bat.market.models import AmazonOrderItem
+from bat.setting.models import LogisticLeadTime
+
+HISTORY_WEEKS = 104
+FORECAST_WEEKS = 26
+# weeks of sales averaged into the weekly demand
+DEMAND_WINDOW_WEEKS = 8
+SAFETY_STOCK_WEEKS = 2
+DEFAULT_LEAD_TIME_DAYS = 56
+UPSERT_PAGE_SIZE = 5000
+
+
+def compute_forecast(
+    sales,
+    on_hand,
+    incoming,
+    lead_weeks,
+    demand_weeks=DEMAND_WINDOW_WEEKS,
+    safety_weeks=SAFETY_STOCK_WEEKS,
+):
+    """
+    forecast stock of all products in one vectorized pass.
+
+    sales is a (products, history weeks) array of sold quantities, on_hand
+    the current stock per product, incoming a (products, forecast weeks)
+    array of open order quantities by arrival week and lead_weeks the
+    supply time per product. Weekly demand is the rolling average of the
+    last demand_weeks of sales. return a dict of arrays.
+    """
+    sales = np.asarray(sales, dtype=np.float64)
+    on_hand = np.asarray(on_hand, dtype=np.float64)
+    incoming = np.asarray(incoming, dtype=np.float64)
+    lead_weeks = np.asarray(lead_weeks, dtype=np.float64)
+    products, history = sales.shape
+    horizon = incoming.shape[1]
+
+    window = max(1, min(demand_weeks, history))
+    cumulative = np.zeros((products, history + 1))
+    np.cumsum(sales, axis=1, out=cumulative[:, 1:])
+    rolling_demand = (
+        cumulative[:, window:] - cumulative[:, :-window]
+    ) / window
+    if rolling_demand.shape[1]:
+        demand = rolling_demand[:, -1]
+    else:
+        demand = np.zeros(products)
+
+    outgoing = np.repeat(demand[:, None], horizon, axis=1)
+    projected = on_hand[:, None] + np.cumsum(incoming - outgoing, axis=1)
+    instock = np.clip(projected, 0, None)
+
+    stockout = projected <= 0
+    stockout_week = np.where(
+        stockout.any(axis=1), stockout.argmax(axis=1), -1
+    )
+    # stock needed to cover demand until a new order arrives, plus safety
+    cover = demand * (lead_weeks + safety_weeks)
+    reorder = np.clip(cover[:, None] - instock, 0, None)
+    weeks_of_supply = np.divide(
+        on_hand,
+        demand,
+        out=np.zeros(products),
+        where=demand > 0,
+    )
+    return {
+        "rolling_demand": rolling_demand,
+        "demand": demand,
+        "outgoing": outgoing,
+        "instock": instock,
+        "stockout_week": stockout_week,
+        "reorder": reorder,
+        "weeks_of_supply": weeks_of_supply,
+    }
+
+
+def get_lead_time_days(company):
+    """
+    return supply time in days from the logistic lead times of the company
+    members, the slowest one is used.
+    """
+    lead_times = LogisticLeadTime.objects.filter(is_active=True)
+    company_lead_times = lead_times.filter(
+        user__member_user__company=company
+    )
+    for queryset in (company_lead_times, lead_times):
+        days = [
+            shipping_time + misc_time
+            for shipping_time, misc_time in queryset.values_list(
+                "shipping_time", "misc_time"
+            )
+        ]
+        if days:
+            return max(days)
+    return DEFAULT_LEAD_TIME_DAYS
+
+
+def _start_of_day(date):
+    return timezone.make_aware(
+        datetime.datetime.combine(date, datetime.time.min)
+    )
+
+
+def _week_index(dates, start):
+    return np.fromiter(
+        ((date - start).days // 7 for date in dates),
+        dtype=np.int64,
+        count=len(dates),
+    )
+
+
+def load_forecast_data(company, start, history, horizon, lead_days):
+    """
+    return product ids, latest inventories and the sales, stock and incoming
+    arrays of the company products, one query per source.
+    """
+    products = list(
+        CompanyProduct.objects.filter(
+            companytype__company=company, is_active=True
+        )
+        .order_by("id")
+        .values_list("id", "asin", "sku")
+    )
+    product_ids = [row[0] for row in products]
+    index = {product_id: i for i, product_id in enumerate(product_ids)}
+    asin_index = {asin: i for i, (_id, asin, _sku) in enumerate(products) if asin}
+    sku_index = {sku: i for i, (_id, _asin, sku) in enumerate(products) if sku}
+    count = len(products)
+    today = start + datetime.timedelta(weeks=history)
+
+    sales = np.zeros((count, history))
+    rows = list(
+        AmazonOrderItem.objects.filter(
+            amazonorder__amazonaccounts__company=company,
+            amazonorder__purchase_date__gte=_start_of_day(start),
+            amazonorder__purchase_date__lt=_start_of_day(today),
+        )
+        .annotate(
+            week=TruncWeek(
+                "amazonorder__purchase_date", output_field=DateField()
+            )
+        )
+        .values_list("asin", "amazonproduct__sku", "week")
+        .annotate(total=Sum("quantity"))
+        .order_by()
+    )
+    if rows:
+        positions = np.fromiter(
+            (
+                asin_index.get(asin, sku_index.get(sku, -1))
+                for asin, sku, _week, _total in rows
+            ),
+            dtype=np.int64,
+            count=len(rows),
+        )
+        weeks = _week_index([row[2] for row in rows], start)
+        totals = np.array([row[3] or 0 for row in rows], dtype=np.float64)
+        valid = (positions >= 0) & (weeks >= 0) & (weeks < history)
+        np.add.at(sales, (positions[valid], weeks[valid]), totals[valid])
+
+    inventories = list(
+        CompanyInventory.objects.filter(companyproduct_id__in=product_ids)
+        .order_by("companyproduct_id", "-date", "-id")
+        .distinct("companyproduct_id")
+    )
+    on_hand = np.zeros(count)
+    for inventory in inventories:
+        on_hand[index[inventory.companyproduct_id]] = max(
+            inventory.quantity, 0
+        )
+
+    incoming = np.zeros((count, horizon))
+    orders = list(
+        CompanyOrderProduct.objects.filter(
+            companyproduct_id__in=product_ids,
+            remaining_quantity__gt=0,
+            is_active=True,
+        ).values_list(
+            "companyproduct_id",
+            "companyorder__delivery_date",
+            "companyorder__order_date",
+            "remaining_quantity",
+        )
+    )
+    if orders:
+        lead_time = datetime.timedelta(days=lead_days)
+        positions = np.array([index[row[0]] for row in orders], dtype=np.int64)
+        arrivals = _week_index(
+            [
+                (delivery_date or order_date + lead_time).date()
+                for _id, delivery_date, order_date, _quantity in orders
+            ],
+            today,
+        )
+        quantities = np.array([row[3] for row in orders], dtype=np.float64)
+        # late orders are expected this week
+        arrivals = np.clip(arrivals, 0, None)
+        valid = arrivals < horizon
+        np.add.at(
+            incoming, (positions[valid], arrivals[valid]), quantities[valid]
+        )
+    return product_ids, inventories, sales, on_hand, incoming
+
+
+def save_predictions(product_ids, forecast, incoming, today, lead_days):
+    """
+    upsert weekly predictions with INSERT .. ON CONFLICT in pages, manual
+    adjusted quantities are kept.
+    """
+    horizon = incoming.shape[1]
+    now = timezone.now()
+    weeks = []
+    for h in range(horizon):
+        date_start = today + datetime.timedelta(weeks=h)
+        iso_year, iso_week, _day = date_start.isocalendar()
+        weeks.append(
+            (iso_week, date_start, date_start + datetime.timedelta(days=6), iso_year)
+        )
+
+    instock = np.rint(forecast["instock"]).astype(np.int64).tolist()
+    outgoing = np.rint(forecast["outgoing"]).astype(np.int64).tolist()
+    reorder = np.ceil(forecast["reorder"]).astype(np.int64).tolist()
+    incoming = np.rint(incoming).astype(np.int64).tolist()
+    values = [
+        (
+            product_id,
+            WEEKLY,
+            week,
+            date_start,
+            date_end,
+            year,
+            instock[i][h],
+            outgoing[i][h],
+            0,
+            reorder[i][h],
+            incoming[i][h],
+            outgoing[i][h],
+            lead_days,
+            True,
+            now,
+            now,
+        )
+        for i, product_id in enumerate(product_ids)
+        for h, (week, date_start, date_end, year) in enumerate(weeks)
+    ]
+    sql = (
+        "INSERT INTO {0} (companyproduct_id, type, week, date_start, "
+        "date_end, year, instock, quantity_required, adjusted_quantity, "
+        "total_quantity_required, incoming_quantity, outgoing_quantity, "
+        "supply_time, is_active, create_date, update_date) VALUES %s "
+        "ON CONFLICT (companyproduct_id, type, year, week) DO UPDATE SET "
+        "date_start = EXCLUDED.date_start, date_end = EXCLUDED.date_end, "
+        "instock = EXCLUDED.instock, "
+        "quantity_required = EXCLUDED.quantity_required, "
+        "total_quantity_required = EXCLUDED.total_quantity_required, "
+        "incoming_quantity = EXCLUDED.incoming_quantity, "
+        "outgoing_quantity = EXCLUDED.outgoing_quantity, "
+        "supply_time = EXCLUDED.supply_time, "
+        "is_active = EXCLUDED.is_active, "
+        "update_date = EXCLUDED.update_date"
+    ).format(connection.ops.quote_name(CompanyInventoryPrediction._meta.db_table))
+    with connection.cursor() as cursor:
+        execute_values(cursor.cursor, sql, values, page_size=UPSERT_PAGE_SIZE)
+    return len(values)
+
+
+def forecast_company_inventory(
+    company, history=HISTORY_WEEKS, horizon=FORECAST_WEEKS
+):
+    """
+    compute weekly predictions for every product of the company, update the
+    week average, weeks of supply and ytd sold of their latest inventory.
+    return number of prediction rows written.
+    """
+    today = timezone.localdate()
+    today = today - datetime.timedelta(days=today.weekday())
+    start = today - datetime.timedelta(weeks=history)
+    lead_days = get_lead_time_days(company)
+
+    product_ids, inventories, sales, on_hand, incoming = load_forecast_data(
+        company, start, history, horizon, lead_days
+    )
+    if not product_ids:
+        return 0
+    lead_weeks = np.full(len(product_ids), np.ceil(lead_days / 7))
+    forecast = compute_forecast(sales, on_hand, incoming, lead_weeks)
+
+    week_starts = np.array(
+        [start + datetime.timedelta(weeks=w) for w in range(history)]
+    )
+    year_start = datetime.date(today.year, 1, 1)
+    ytd_sold = sales[:, week_starts >= year_start].sum(axis=1)
+
+    with transaction.atomic():
+        written = save_predictions(
+            product_ids, forecast, incoming, today, lead_days
+        )
+        index = {product_id: i for i, product_id in enumerate(product_ids)}
+        now = timezone.now()
+        for inventory in inventories:
+            i = index[inventory.companyproduct_id]
+            inventory.week_average_quantity = int(round(forecast["demand"][i]))
+            inventory.weeks_of_supply = int(forecast["weeks_of_supply"][i])
+            inventory.ytd_quantity_sold = int(ytd_sold[i])
+            inventory.update_date = now
+        CompanyInventory.objects.bulk_update(
+            inventories,
+            [
+                "week_average_quantity",
+                "weeks_of_supply",
+                "ytd_quantity_sold",
+                "update_date",
+            ],
+            batch_size=UPSERT_PAGE_SIZE,
+        )
+    return written
@@ -0,0 +1,369 @@
+"""Inventory ledger, movements folded into running totals and snapshots."""
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.db.models import F, OuterRef, Q, Subquery, Sum, Value
+from django.utils import timezone
+
+from bat.company.constants import (
+    INVENTORY_IN_STOCK,
+    INVENTORY_IN_TRANSIT,
+    INVENTORY_READY_TO_SHIP,
+    INVENTORY_SHIPPED,
+)
+from bat.company.models import (
+    CompanyInventory,
+    CompanyInventoryDetail,
+    CompanyOrderProduct,
+    CompanyProduct,
+    InventoryMovement,
+    InventorySnapshot,
+)
+
+APPLY_BATCH_SIZE = 10000
+APPEND_BATCH_SIZE = 5000
+# first keys of the advisory locks taken on products by apply_movements and
+# take_snapshots
+PRODUCT_LOCK_NAMESPACE = 3501
+SNAPSHOT_LOCK_NAMESPACE = 3502
+
+
+def append_movements(movements, source=None):
+    """
+    insert movements in bulk and fold them into the totals once the current
+    transaction commits.
+
+    movements is a list of (companyproduct_id, type, quantity, companyorder_id)
+    """
+    content_type = object_id = None
+    if source is not None:
+        content_type = ContentType.objects.get_for_model(source)
+        object_id = source.pk
+    objects = [
+        InventoryMovement(
+            companyproduct_id=companyproduct_id,
+            type=movement_type,
+            quantity=quantity,
+            companyorder_id=companyorder_id,
+            content_type=content_type,
+            object_id=object_id,
+        )
+        for companyproduct_id, movement_type, quantity, companyorder_id in movements
+        if quantity
+    ]
+    if not objects:
+        return []
+    InventoryMovement.objects.bulk_create(objects, batch_size=APPEND_BATCH_SIZE)
+
+    from bat.company.tasks import apply_inventory_movements
+
+    transaction.on_commit(lambda: apply_inventory_movements.delay())
+    return objects
+
+
+def record_delivery(companyorderdelivery, deliveryproducts):
+    """
+    delivered order products leave the vendor: ready to ship goes down and
+    in transit goes up.
+    """
+    movements = []
+    for deliveryproduct in deliveryproducts:
+        orderproduct = deliveryproduct.companyorderproduct
+        for movement_type, quantity in (
+            (INVENTORY_READY_TO_SHIP, -deliveryproduct.quantity),
+            (INVENTORY_IN_TRANSIT, deliveryproduct.quantity),
+        ):
+            movements.append(
+                (
+                    orderproduct.companyproduct_id,
+                    movement_type,
+                    quantity,
+                    orderproduct.companyorder_id,
+                )
+            )
+    return append_movements(movements, source=companyorderdelivery)
+
+
+def record_inspection(companyorderinspection):
+    """
+    an inspection of an order marks its undelivered quantities ready to ship
+    and receives its in transit quantities into stock, only the part not
+    moved by an earlier inspection is moved.
+    """
+    companyorder_id = companyorderinspection.companyorder_id
+    remaining = dict(
+        CompanyOrderProduct.objects.filter(
+            companyorder_id=companyorder_id, is_active=True
+        )
+        .values("companyproduct_id")
+        .annotate(total=Sum("remaining_quantity"))
+        .values_list("companyproduct_id", "total")
+    )
+    balances = {
+        (companyproduct_id, movement_type): total
+        for companyproduct_id, movement_type, total in InventoryMovement.objects.filter(
+            companyorder_id=companyorder_id,
+            type__in=[INVENTORY_READY_TO_SHIP, INVENTORY_IN_TRANSIT],
+        )
+        .values("companyproduct_id", "type")
+        .annotate(total=Sum("quantity"))
+        .values_list("companyproduct_id", "type", "total")
+    }
+    movements = []
+    for companyproduct_id, quantity in remaining.items():
+        ready = balances.get((companyproduct_id, INVENTORY_READY_TO_SHIP), 0)
+        movements.append(
+            (
+                companyproduct_id,
+                INVENTORY_READY_TO_SHIP,
+                quantity - ready,
+                companyorder_id,
+            )
+        )
+    for (companyproduct_id, movement_type), total in balances.items():
+        if movement_type == INVENTORY_IN_TRANSIT and total > 0:
+            movements.append(
+                (companyproduct_id, INVENTORY_IN_TRANSIT, -total, companyorder_id)
+            )
+            movements.append(
+                (companyproduct_id, INVENTORY_IN_STOCK, total, companyorder_id)
+            )
+    return append_movements(movements, source=companyorderinspection)
+
+
+def record_amazon_order_items(amazonaccount, order_items):
+    """
+    sold amazon order items leave the stock of the matching company products
+    (by asin, then sku). order_items is a list of (asin, sku, quantity)
+    """
+    company_id = amazonaccount.company_id
+    products = CompanyProduct.objects.filter(
+        companytype__company_id=company_id, is_active=True
+    ).values_list("id", "asin", "sku")
+    asin_map = {}
+    sku_map = {}
+    for companyproduct_id, asin, sku in products:
+        if asin:
+            asin_map.setdefault(asin, companyproduct_id)
+        if sku:
+            sku_map.setdefault(sku, companyproduct_id)
+
+    sold = {}
+    for asin, sku, quantity in order_items:
+        companyproduct_id = asin_map.get(asin) or sku_map.get(sku)
+        if companyproduct_id and quantity:
+            sold[companyproduct_id] = sold.get(companyproduct_id, 0) + quantity
+    movements = []
+    for companyproduct_id, quantity in sold.items():
+        movements.append((companyproduct_id, INVENTORY_IN_STOCK, -quantity, None))
+        movements.append((companyproduct_id, INVENTORY_SHIPPED, quantity, None))
+    return append_movements(movements)
+
+
+def lock_products(product_ids, namespace=PRODUCT_LOCK_NAMESPACE):
+    """
+    take transaction advisory locks on the products in id order, so
+    consumers holding movements of the same products fold them one after
+    the other without deadlocks.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_advisory_xact_lock(%s, id) "
+            "FROM (SELECT unnest(%s::integer[]) AS id ORDER BY 1) AS ids",
+            [namespace, sorted(product_ids)],
+        )
+
+
+def apply_movements(batch_size=APPLY_BATCH_SIZE):
+    """
+    fold a batch of pending movements into CompanyInventoryDetail totals
+    and CompanyInventory.quantity (in stock). Concurrent consumers skip rows
+    locked by each other and lock the products of their batch before
+    reading totals, so two consumers never both create the inventory or
+    detail of a product. return number of folded movements.
+    """
+    with transaction.atomic():
+        ids = list(
+            InventoryMovement.objects.filter(is_processed=False)
+            .select_for_update(skip_locked=True)
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+        totals = list(
+            InventoryMovement.objects.filter(id__in=ids)
+            .values("companyproduct_id", "type")
+            .annotate(total=Sum("quantity"))
+            .values_list("companyproduct_id", "type", "total")
+        )
+        product_ids = {companyproduct_id for companyproduct_id, _t, _q in totals}
+        lock_products(product_ids)
+
+        inventories = {
+            inventory.companyproduct_id: inventory
+            for inventory in CompanyInventory.objects.filter(
+                companyproduct_id__in=product_ids
+            )
+            .order_by("companyproduct_id", "-date", "-id")
+            .distinct("companyproduct_id")
+        }
+        missing = [
+            CompanyInventory(companyproduct_id=companyproduct_id, is_active=True)
+            for companyproduct_id in product_ids
+            if companyproduct_id not in inventories
+        ]
+        for inventory in CompanyInventory.objects.bulk_create(missing):
+            inventories[inventory.companyproduct_id] = inventory
+
+        details = {
+            (detail.companyinventory_id, detail.type): detail
+            for detail in CompanyInventoryDetail.objects.filter(
+                companyinventory_id__in=[i.id for i in inventories.values()]
+            )
+        }
+        new_details = []
+        changed_details = []
+        changed_inventories = []
+        now = timezone.now()
+        for companyproduct_id, movement_type, total in totals:
+            inventory = inventories[companyproduct_id]
+            detail = details.get((inventory.id, movement_type))
+            if detail is None:
+                detail = CompanyInventoryDetail(
+                    companyinventory=inventory, type=movement_type, quantity=total
+                )
+                details[(inventory.id, movement_type)] = detail
+                new_details.append(detail)
+            else:
+                detail.quantity = F("quantity") + Value(total)
+                changed_details.append(detail)
+            if movement_type == INVENTORY_IN_STOCK:
+                inventory.quantity = F("quantity") + Value(total)
+                inventory.update_date = now
+                changed_inventories.append(inventory)
+
+        CompanyInventoryDetail.objects.bulk_create(new_details)
+        CompanyInventoryDetail.objects.bulk_update(changed_details, ["quantity"])
+        CompanyInventory.objects.bulk_update(
+            changed_inventories, ["quantity", "update_date"]
+        )
+        InventoryMovement.objects.filter(id__in=ids).update(is_processed=True)
+    return len(ids)
+
+
+def take_snapshots(batch_size=APPLY_BATCH_SIZE):
+    """
+    snapshot totals of every product and type changed by a batch of folded
+    movements that are in no snapshot yet, and link the movements to their
+    snapshot. Movements are picked by being folded, not by id, so one whose
+    transaction committed after a later id was snapshotted goes into the
+    next snapshot and a snapshot never skips a movement. return number of
+    snapshotted movements.
+    """
+    with transaction.atomic():
+        ids = list(
+            InventoryMovement.objects.filter(
+                is_processed=True, snapshot__isnull=True
+            )
+            .select_for_update(skip_locked=True)
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+        changes = list(
+            InventoryMovement.objects.filter(id__in=ids)
+            .values("companyproduct_id", "type")
+            .annotate(total=Sum("quantity"))
+            .values_list("companyproduct_id", "type", "total")
+        )
+        product_ids = {companyproduct_id for companyproduct_id, _t, _q in changes}
+        # snapshots of a product are taken one after the other, so each one
+        # adds to the latest and their ids follow the order they're taken in
+        lock_products(product_ids, namespace=SNAPSHOT_LOCK_NAMESPACE)
+
+        previous = {
+            (snapshot.companyproduct_id, snapshot.type): snapshot.quantity
+            for snapshot in InventorySnapshot.objects.filter(
+                companyproduct_id__in=product_ids
+            )
+            .order_by("companyproduct_id", "type", "-id")
+            .distinct("companyproduct_id", "type")
+        }
+        now = timezone.now()
+        snapshots = InventorySnapshot.objects.bulk_create(
+            [
+                InventorySnapshot(
+                    companyproduct_id=companyproduct_id,
+                    type=movement_type,
+                    quantity=previous.get((companyproduct_id, movement_type), 0)
+                    + total,
+                    create_date=now,
+                )
+                for companyproduct_id, movement_type, total in changes
+            ],
+            batch_size=APPEND_BATCH_SIZE,
+        )
+        InventoryMovement.objects.filter(id__in=ids).update(
+            snapshot=Subquery(
+                InventorySnapshot.objects.filter(
+                    id__in=[snapshot.id for snapshot in snapshots],
+                    companyproduct_id=OuterRef("companyproduct_id"),
+                    type=OuterRef("type"),
+                ).values("id")[:1]
+            )
+        )
+    return len(ids)
+
+
+def get_inventory(companyproduct_id):
+    """
+    return current totals by type of the product from its latest inventory
+    """
+    inventory = (
+        CompanyInventory.objects.filter(companyproduct_id=companyproduct_id)
+        .order_by("-date", "-id")
+        .first()
+    )
+    if inventory is None:
+        return {}
+    return dict(
+        CompanyInventoryDetail.objects.filter(
+            companyinventory=inventory
+        ).values_list("type", "quantity")
+    )
+
+
+def get_inventory_at(companyproduct_id, date):
+    """
+    return totals by type of the product at the given time, replayed from
+    the nearest snapshot taken before it and the movements not in it or in
+    an earlier snapshot.
+    """
+    snapshots = {
+        movement_type: (quantity, snapshot_id)
+        for movement_type, quantity, snapshot_id in InventorySnapshot.objects.filter(
+            companyproduct_id=companyproduct_id, create_date__lte=date
+        )
+        .order_by("type", "-id")
+        .distinct("type")
+        .values_list("type", "quantity", "id")
+    }
+    after_snapshot = ~Q(type__in=snapshots.keys())
+    for movement_type, (_quantity, snapshot_id) in snapshots.items():
+        after_snapshot |= Q(type=movement_type) & (
+            Q(snapshot__isnull=True) | Q(snapshot_id__gt=snapshot_id)
+        )
+    totals = {
+        movement_type: quantity for movement_type, (quantity, _id) in snapshots.items()
+    }
+    for movement_type, total in (
+        InventoryMovement.objects.filter(
+            after_snapshot, companyproduct_id=companyproduct_id, create_date__lte=date
+        )
+        .values("type")
+        .annotate(total=Sum("quantity"))
+        .values_list("type", "total")
+    ):
+        totals[movement_type] = totals.get(movement_type, 0) + total
+    return totals
@@ -0,0 +1,41 @@
+"""Time the vectorized inventory forecast on generated data."""
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from bat.company.forecast import FORECAST_WEEKS, HISTORY_WEEKS, compute_forecast
+
+
+class Command(BaseCommand):
+    help = (
+        "Run compute_forecast on random sales of the given number of "
+        "products and weeks, without touching the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=50000)
+        parser.add_argument("--weeks", type=int, default=HISTORY_WEEKS)
+        parser.add_argument("--horizon", type=int, default=FORECAST_WEEKS)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options["seed"])
+        products = options["products"]
+        sales = rng.poisson(5, (products, options["weeks"]))
+        on_hand = rng.integers(0, 200, products)
+        incoming = np.zeros((products, options["horizon"]))
+        incoming[:, options["horizon"] // 2] = rng.integers(0, 100, products)
+        lead_weeks = rng.integers(2, 12, products)
+
+        start = time.perf_counter()
+        forecast = compute_forecast(sales, on_hand, incoming, lead_weeks)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            "{0} products x {1} weeks: {2:.2f}s, {3} projected stock-outs".format(
+                products,
+                options["weeks"],
+                elapsed,
+                int((forecast["stockout_week"] >= 0).sum()),
+            )
+        )
@@ -0,0 +1,151 @@
+"""Time inventory ledger appends, folding and point in time queries."""
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from djmoney.money import Money
+
+from bat.company.constants import INVENTORY_DETAIL_TYPE
+from bat.company.ledger import (
+    APPEND_BATCH_SIZE,
+    APPLY_BATCH_SIZE,
+    apply_movements,
+    get_inventory,
+    get_inventory_at,
+    take_snapshots,
+)
+from bat.company.models import Company, CompanyProduct, CompanyType, InventoryMovement
+from bat.product.models import Product
+from bat.setting.models import Category, Status
+
+
+class Command(BaseCommand):
+    help = (
+        "Append generated movements for generated company products, fold "
+        "them, take snapshots and time current and point in time inventory "
+        "reads. Everything runs in one transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--movements", type=int, default=10000000)
+        parser.add_argument("--products", type=int, default=1000)
+        parser.add_argument("--snapshot-every", type=int, default=1000000)
+        parser.add_argument("--queries", type=int, default=100)
+
+    def handle(self, *args, **options):
+        # their products would stay locked by the benchmark until it ends
+        if InventoryMovement.objects.filter(
+            Q(is_processed=False) | Q(snapshot__isnull=True)
+        ).exists():
+            raise CommandError(
+                "Movements are waiting to be folded or snapshotted, run the "
+                "benchmark once they are."
+            )
+        with transaction.atomic():
+            product_ids = self.create_products(options["products"])
+            self.run(product_ids, options)
+            transaction.set_rollback(True)
+
+    def create_products(self, count):
+        """return ids of count company products of a generated company."""
+        user = get_user_model().objects.create(
+            username="benchmark-inventory-ledger",
+            email="benchmark-inventory-ledger@example.com",
+        )
+        status = Status.objects.create(name="Benchmark", user=user)
+        category = Category.objects.create(
+            name="Benchmark", user=user, is_vendor_category=True
+        )
+        company, partner = (
+            Company.objects.create(name=name, email=user.email, country="SE")
+            for name in ("Benchmark company", "Benchmark vendor")
+        )
+        companytype = CompanyType.objects.create(
+            partner=partner, company=company, category=category
+        )
+        products = Product.objects.bulk_create(
+            [
+                Product(company=company, title="product {0}".format(i), status=status)
+                for i in range(count)
+            ]
+        )
+        return [
+            companyproduct.id
+            for companyproduct in CompanyProduct.objects.bulk_create(
+                [
+                    CompanyProduct(
+                        product=product,
+                        companytype=companytype,
+                        title=product.title,
+                        price=Money(10, "USD"),
+                        status=status,
+                    )
+                    for product in products
+                ]
+            )
+        ]
+
+    def run(self, product_ids, options):
+        types = [choice for choice, _label in INVENTORY_DETAIL_TYPE]
+        started = timezone.now()
+
+        append_time = fold_time = snapshot_time = 0
+        appended = 0
+        while appended < options["movements"]:
+            size = min(APPEND_BATCH_SIZE, options["movements"] - appended)
+            batch = [
+                InventoryMovement(
+                    companyproduct_id=random.choice(product_ids),
+                    type=random.choice(types),
+                    quantity=random.randint(-50, 100),
+                )
+                for _i in range(size)
+            ]
+            start = time.perf_counter()
+            InventoryMovement.objects.bulk_create(batch)
+            append_time += time.perf_counter() - start
+            appended += size
+
+            if appended % options["snapshot_every"] < size or appended == options["movements"]:
+                start = time.perf_counter()
+                while apply_movements() == APPLY_BATCH_SIZE:
+                    pass
+                fold_time += time.perf_counter() - start
+                start = time.perf_counter()
+                while take_snapshots() == APPLY_BATCH_SIZE:
+                    pass
+                snapshot_time += time.perf_counter() - start
+
+        self.stdout.write(
+            "append: {0} movements in {1:.1f}s ({2:.0f}/s)".format(
+                appended, append_time, appended / append_time
+            )
+        )
+        self.stdout.write(
+            "fold: {0:.1f}s ({1:.0f}/s), snapshots: {2:.1f}s".format(
+                fold_time, appended / fold_time, snapshot_time
+            )
+        )
+
+        finished = timezone.now()
+        current, past = [], []
+        for _i in range(options["queries"]):
+            companyproduct_id = random.choice(product_ids)
+            date = started + (finished - started) * random.random()
+            start = time.perf_counter()
+            get_inventory(companyproduct_id)
+            current.append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            get_inventory_at(companyproduct_id, date)
+            past.append((time.perf_counter() - start) * 1000)
+        for name, timings in (("current", current), ("point in time", past)):
+            self.stdout.write(
+                "{0}: median={1:.1f}ms max={2:.1f}ms".format(
+                    name, statistics.median(timings), max(timings)
+                )
+            )
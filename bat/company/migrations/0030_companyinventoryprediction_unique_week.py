@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('company', '0029_auto_20210201_0811'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='companyinventoryprediction',
+            constraint=models.UniqueConstraint(fields=('companyproduct', 'type', 'year', 'week'), name='companyinventoryprediction_unique_week'),
+        ),
+    ]
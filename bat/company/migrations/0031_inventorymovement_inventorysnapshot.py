@@ -0,0 +1,69 @@
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+INVENTORY_DETAIL_TYPE = [
+    ('In stock', 'In stock'),
+    ('Picked up', 'Picked up'),
+    ('In transit', 'In transit'),
+    ('Ready to ship', 'Ready to ship'),
+    ('Shipped', 'Shipped'),
+    ('Transfer', 'Transfer'),
+    ('Lost', 'Lost'),
+    ('Damaged', 'Damaged'),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('company', '0030_companyinventoryprediction_unique_week'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryMovement',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=INVENTORY_DETAIL_TYPE, max_length=100)),
+                ('quantity', models.IntegerField()),
+                ('object_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('is_processed', models.BooleanField(default=False)),
+                ('create_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('companyorder', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='company.companyorder')),
+                ('companyproduct', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='company.companyproduct')),
+                ('content_type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+            ],
+            options={
+                'verbose_name_plural': 'Inventory Movements',
+            },
+        ),
+        migrations.CreateModel(
+            name='InventorySnapshot',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=INVENTORY_DETAIL_TYPE, max_length=100)),
+                ('quantity', models.IntegerField(default=0)),
+                ('movement_id', models.BigIntegerField()),
+                ('create_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('companyproduct', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='company.companyproduct')),
+            ],
+            options={
+                'verbose_name_plural': 'Inventory Snapshots',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='inventorymovement',
+            index=models.Index(condition=models.Q(is_processed=False), fields=['id'], name='inventorymovement_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorymovement',
+            index=models.Index(fields=['companyproduct', 'id'], name='inventorymovement_product_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorysnapshot',
+            index=models.Index(fields=['companyproduct', 'type', '-movement_id'], name='inventorysnapshot_product_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations, models
+
+# duplicated totals of a type are merged into the oldest row before the
+# constraint is added
+MERGE_DUPLICATES = """
+UPDATE company_companyinventorydetail AS detail
+SET quantity = duplicate.quantity
+FROM (
+    SELECT MIN(id) AS id, SUM(quantity) AS quantity
+    FROM company_companyinventorydetail
+    GROUP BY companyinventory_id, type
+    HAVING COUNT(*) > 1
+) AS duplicate
+WHERE detail.id = duplicate.id;
+
+DELETE FROM company_companyinventorydetail AS detail
+USING company_companyinventorydetail AS kept
+WHERE detail.companyinventory_id = kept.companyinventory_id
+AND detail.type = kept.type
+AND detail.id > kept.id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('company', '0031_inventorymovement_inventorysnapshot'),
+    ]
+
+    operations = [
+        migrations.RunSQL(MERGE_DUPLICATES, migrations.RunSQL.noop),
+        migrations.AddConstraint(
+            model_name='companyinventorydetail',
+            constraint=models.UniqueConstraint(fields=('companyinventory', 'type'), name='companyinventorydetail_unique_type'),
+        ),
+    ]
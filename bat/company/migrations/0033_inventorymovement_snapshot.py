@@ -0,0 +1,34 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+# processed movements are linked to the first snapshot of their product and
+# type whose watermark covers them
+LINK_SNAPSHOTS = """
+UPDATE company_inventorymovement AS movement
+SET snapshot_id = (
+    SELECT snapshot.id
+    FROM company_inventorysnapshot AS snapshot
+    WHERE snapshot.companyproduct_id = movement.companyproduct_id
+    AND snapshot.type = movement.type
+    AND snapshot.movement_id >= movement.id
+    ORDER BY snapshot.movement_id
+    LIMIT 1
+)
+WHERE movement.is_processed;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('company', '0032_companyinventorydetail_unique_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventorymovement',
+            name='snapshot',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movements', to='company.inventorysnapshot'),
+        ),
+        migrations.RunSQL(LINK_SNAPSHOTS, migrations.RunSQL.noop),
+    ]
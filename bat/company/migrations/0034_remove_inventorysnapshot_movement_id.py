@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('company', '0033_inventorymovement_snapshot'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='inventorysnapshot',
+            name='inventorysnapshot_product_idx',
+        ),
+        migrations.RemoveField(
+            model_name='inventorysnapshot',
+            name='movement_id',
+        ),
+        migrations.AddIndex(
+            model_name='inventorymovement',
+            index=models.Index(condition=models.Q(('is_processed', True), ('snapshot__isnull', True)), fields=['id'], name='inventorymovement_unsnap_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorysnapshot',
+            index=models.Index(fields=['companyproduct', 'type', '-id'], name='inventorysnapshot_type_idx'),
+        ),
+    ]
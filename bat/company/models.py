@@ -2,6 +2,7 @@
 import logging
 import os
 import uuid
+from decimal import Decimal
 
 import pytz
 from defender.models import AccessAttempt
@@ -14,7 +15,9 @@ from django.contrib.contenttypes.fields import (
 )
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.postgres.fields import HStoreField
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
 from django.utils import timezone
@@ -22,6 +25,7 @@ from django.utils.translation import ugettext_lazy as _
 from django_countries.fields import CountryField
 from django_measurement.models import MeasurementField
 from djmoney.models.fields import MoneyField
+from djmoney.money import Money
 from djmoney.settings import CURRENCY_CHOICES
 from measurement.measures import Weight
 from multiselectfield import MultiSelectField
@@ -31,7 +35,6 @@ from rolepermissions.roles import get_user_roles
 from bat.comments.models import Comment
 from bat.company.constants import *
 from bat.globalprop.validator import validator
-from bat.globalutils.utils import pdf_file_from_html
 from bat.setting.models import Category, Status
 
 User = get_user_model()
@@ -1544,21 +1547,20 @@ class CompanyContract(models.Model):
 
     def save_pdf_file(self):
         """
-        docstring
+        create contract file and queue rendering of its pdf
         """
+        from bat.company.tasks import queue_pdf_file
+
         data = {"data": "I am variable"}
         name = "company_contract_" + str(self.id)
-        contract_file = pdf_file_from_html(
-            data, "company/pdf_file.html", "company_contract_" + str(self.id)
-        )
-        f = File(
+        f = File.objects.create(
             content_object=self,
             company=self.company_member.company,
             note=self.note,
-            title="company_contract_" + str(self.id),
+            title=name,
         )
-        f.save()
-        f.file.save(name + ".pdf", contract_file)
+        queue_pdf_file(f.id, "company/pdf_file.html", data, name)
+        return f
 
     @staticmethod
     def has_retrieve_permission(request):
@@ -2108,6 +2110,57 @@ class CompanyProduct(models.Model):
         return has_permission(member, "restore_company_product")
 
 
+class CompanyOrderManager(models.Manager):
+    def place_order(self, data, lines, currency):
+        """
+        create an order with its order products.
+
+        Prices and payment terms of the lines must be loaded already (see
+        BulkRelatedListSerializer), totals and deposits are summed in one
+        pass and the order products are bulk inserted, so the number of
+        queries doesn't depend on the number of lines.
+
+        lines is a list of dicts with companyproduct, componentprice,
+        companypaymentterms and quantity. currency is used when no line has
+        a price, otherwise the currency of the last price is used.
+        """
+        with transaction.atomic():
+            companyorder = self.create(**data)
+            quantity = companyorder.quantity or 0
+            total_amount = Decimal(0)
+            deposit_amount = Decimal(0)
+            orderproducts = []
+            for line in lines:
+                line = line.copy()
+                line.pop("price", None)
+                line.pop("amount", None)
+                price = line["componentprice"].price
+                currency = price.currency
+                product_quantity = line.get("quantity", 0)
+                amount = Decimal(price.amount) * Decimal(product_quantity)
+                deposit = line["companypaymentterms"].deposit
+                if deposit:
+                    deposit_amount += Decimal(deposit) * amount / Decimal(100)
+                quantity += product_quantity
+                total_amount += amount
+                orderproducts.append(
+                    CompanyOrderProduct(
+                        companyorder=companyorder,
+                        price=Money(price.amount, currency),
+                        amount=Money(amount, currency),
+                        remaining_quantity=product_quantity,
+                        **line,
+                    )
+                )
+            CompanyOrderProduct.objects.bulk_create(orderproducts)
+            companyorder.sub_amount = Money(total_amount, currency)
+            companyorder.total_amount = Money(total_amount, currency)
+            companyorder.deposit_amount = Money(deposit_amount, currency)
+            companyorder.quantity = quantity
+            companyorder.save()
+        return companyorder
+
+
 class CompanyOrder(models.Model):
     """
     Company order Model.
@@ -2158,6 +2211,8 @@ class CompanyOrder(models.Model):
     create_date = models.DateTimeField(default=timezone.now)
     update_date = models.DateTimeField(default=timezone.now)
 
+    objects = CompanyOrderManager()
+
     class Meta:
         """Meta Class."""
 
@@ -2172,23 +2227,20 @@ class CompanyOrder(models.Model):
 
     def save_pdf_file(self):
         """
-        docstring
+        create purchase order file and queue rendering of its pdf
         """
+        from bat.company.tasks import queue_pdf_file
+
         data = {"data": "I am variable"}
         name = "company_order_" + str(self.batch_id)
-        po_file = pdf_file_from_html(
-            data,
-            "company/order_po.html",
-            "company_order_" + str(self.batch_id),
-        )
-        f = File(
+        f = File.objects.create(
             content_object=self,
             company=self.companytype.company,
             note=self.note,
-            title="company_order_" + str(self.batch_id),
+            title=name,
         )
-        f.save()
-        f.file.save(name + ".pdf", po_file)
+        queue_pdf_file(f.id, "company/order_po.html", data, name)
+        return f
 
     @staticmethod
     def has_retrieve_permission(request):
@@ -2277,6 +2329,92 @@ class CompanyOrderProduct(models.Model):
         return str(self.companyorder.batch_id)
 
 
+class CompanyOrderDeliveryManager(models.Manager):
+    def post_products(self, companyorderdelivery, lines, currency):
+        """
+        create delivery products and move their quantities from remaining to
+        shipped on the order products.
+
+        All affected order product rows are locked with one select_for_update
+        so parallel deliveries of the same order can't lose updates, the
+        quantities are written with F expressions in one bulk_update and the
+        delivery products are bulk inserted. The number of queries doesn't
+        depend on the number of lines.
+
+        lines is a list of dicts with companyorderproduct and quantity.
+        return remaining quantity of every order product by its id.
+        """
+        from bat.company.ledger import record_delivery
+
+        delivered = {}
+        for line in lines:
+            orderproduct_id = line["companyorderproduct"].id
+            delivered[orderproduct_id] = delivered.get(
+                orderproduct_id, 0
+            ) + line.get("quantity", 0)
+
+        with transaction.atomic():
+            # lock in id order so concurrent deliveries don't deadlock
+            orderproducts = {
+                orderproduct.id: orderproduct
+                for orderproduct in CompanyOrderProduct.objects.select_for_update()
+                .filter(id__in=delivered.keys())
+                .order_by("id")
+            }
+            now = timezone.now()
+            remaining = {}
+            shipped = {}
+            for orderproduct_id, orderproduct in orderproducts.items():
+                quantity = delivered[orderproduct_id]
+                remaining[orderproduct_id] = max(
+                    orderproduct.remaining_quantity - quantity, 0
+                )
+                shipped[orderproduct_id] = (
+                    orderproduct.shipped_quantity + quantity
+                )
+                orderproduct.remaining_quantity = Greatest(
+                    F("remaining_quantity") - Value(quantity), Value(0)
+                )
+                orderproduct.shipped_quantity = F("shipped_quantity") + Value(
+                    quantity
+                )
+                orderproduct.update_date = now
+            CompanyOrderProduct.objects.bulk_update(
+                orderproducts.values(),
+                ["remaining_quantity", "shipped_quantity", "update_date"],
+            )
+
+            total_quantity = companyorderdelivery.quantity or 0
+            total_amount = Decimal(0)
+            deliveryproducts = []
+            for line in lines:
+                orderproduct = orderproducts[line["companyorderproduct"].id]
+                quantity = line.get("quantity", 0)
+                currency = orderproduct.price.currency
+                amount = Decimal(orderproduct.price.amount) * Decimal(quantity)
+                total_quantity += quantity
+                total_amount += amount
+                deliveryproducts.append(
+                    CompanyOrderDeliveryProduct(
+                        companyorderdelivery=companyorderdelivery,
+                        companyorderproduct=orderproduct,
+                        quantity=quantity,
+                        amount=Money(amount, currency),
+                    )
+                )
+            CompanyOrderDeliveryProduct.objects.bulk_create(deliveryproducts)
+            record_delivery(companyorderdelivery, deliveryproducts)
+
+            # rows are locked, so the computed values are the stored ones
+            for orderproduct_id, orderproduct in orderproducts.items():
+                orderproduct.remaining_quantity = remaining[orderproduct_id]
+                orderproduct.shipped_quantity = shipped[orderproduct_id]
+            companyorderdelivery.amount = Money(total_amount, currency)
+            companyorderdelivery.quantity = total_quantity
+            companyorderdelivery.save()
+        return remaining
+
+
 class CompanyOrderDelivery(models.Model):
     """
     Company Order Delivery.
@@ -2298,6 +2436,8 @@ class CompanyOrderDelivery(models.Model):
     create_date = models.DateTimeField(default=timezone.now)
     update_date = models.DateTimeField(default=timezone.now)
 
+    objects = CompanyOrderDeliveryManager()
+
     class Meta:
         """Meta Class."""
 
@@ -2880,6 +3020,12 @@ class CompanyInventoryDetail(models.Model):
         """Meta Class."""
 
         verbose_name_plural = _("Company Inventory Details")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["companyinventory", "type"],
+                name="companyinventorydetail_unique_type",
+            )
+        ]
 
     def __str__(self):
         """Return Value."""
@@ -2924,7 +3070,102 @@ class CompanyInventoryPrediction(models.Model):
         """Meta Class."""
 
         verbose_name_plural = _("Company Inventory Predication")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["companyproduct", "type", "year", "week"],
+                name="companyinventoryprediction_unique_week",
+            )
+        ]
 
     def __str__(self):
         """Return Value."""
         return self.companyproduct.title
+
+
+class InventoryMovement(models.Model):
+    """
+    Inventory Movement.
+
+    Append only ledger of quantity changes per product and inventory type,
+    folded into CompanyInventoryDetail totals by bat.company.ledger.
+    """
+
+    companyproduct = models.ForeignKey(
+        CompanyProduct, on_delete=models.CASCADE
+    )
+    type = models.CharField(max_length=100, choices=INVENTORY_DETAIL_TYPE)
+    quantity = models.IntegerField()
+    companyorder = models.ForeignKey(
+        CompanyOrder, on_delete=models.CASCADE, blank=True, null=True
+    )
+    content_type = models.ForeignKey(
+        ContentType, on_delete=models.CASCADE, blank=True, null=True
+    )
+    object_id = models.PositiveIntegerField(blank=True, null=True)
+    source = GenericForeignKey("content_type", "object_id")
+    is_processed = models.BooleanField(default=False)
+    snapshot = models.ForeignKey(
+        "InventorySnapshot",
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="movements",
+    )
+    create_date = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        """Meta Class."""
+
+        verbose_name_plural = _("Inventory Movements")
+        indexes = [
+            models.Index(
+                fields=["id"],
+                name="inventorymovement_pending_idx",
+                condition=models.Q(is_processed=False),
+            ),
+            models.Index(
+                fields=["id"],
+                name="inventorymovement_unsnap_idx",
+                condition=models.Q(is_processed=True, snapshot__isnull=True),
+            ),
+            models.Index(
+                fields=["companyproduct", "id"],
+                name="inventorymovement_product_idx",
+            ),
+        ]
+
+    def __str__(self):
+        """Return Value."""
+        return "{0} {1}".format(self.type, self.quantity)
+
+
+class InventorySnapshot(models.Model):
+    """
+    Inventory Snapshot.
+
+    Total of an inventory type of a product including the movements linked
+    to it and to its earlier snapshots, used to replay inventory at a point
+    in time.
+    """
+
+    companyproduct = models.ForeignKey(
+        CompanyProduct, on_delete=models.CASCADE
+    )
+    type = models.CharField(max_length=100, choices=INVENTORY_DETAIL_TYPE)
+    quantity = models.IntegerField(default=0)
+    create_date = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        """Meta Class."""
+
+        verbose_name_plural = _("Inventory Snapshots")
+        indexes = [
+            models.Index(
+                fields=["companyproduct", "type", "-id"],
+                name="inventorysnapshot_type_idx",
+            ),
+        ]
+
+    def __str__(self):
+        """Return Value."""
+        return "{0} {1}".format(self.type, self.quantity)
@@ -0,0 +1,142 @@
+"""Cached partner graph of companies, partner and client ids by category."""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from bat.company.models import CompanyType
+from bat.setting.models import Category
+
+PARTNER_GRAPH_CACHE_TIMEOUT = 60 * 60 * 24
+VENDOR_CATEGORIES = "vendor"
+SALES_CHANNEL_CATEGORIES = "sales_channel"
+CATEGORY_FLAGS = {
+    VENDOR_CATEGORIES: "is_vendor_category",
+    SALES_CHANNEL_CATEGORIES: "is_sales_channel_category",
+}
+
+
+def get_partner_graph_cache_key(company_id):
+    return "partner_graph_{0}".format(company_id)
+
+
+def get_category_ids_cache_key(kind):
+    return "partner_categories_{0}".format(kind)
+
+
+def build_partner_graph(company_id, rows):
+    """
+    return {"partners": {category id: {partner id: company type id}},
+    "clients": {category id: {company id: company type id}}} of the company
+    from its company type rows in both directions.
+    """
+    graph = {"partners": {}, "clients": {}}
+    for companytype_id, partner_id, client_id, category_id in rows:
+        if client_id == company_id:
+            graph["partners"].setdefault(category_id, {})[partner_id] = companytype_id
+        if partner_id == company_id:
+            graph["clients"].setdefault(category_id, {})[client_id] = companytype_id
+    return graph
+
+
+def get_partner_graph(company_id):
+    """
+    return partner graph of the company, one query on a cache miss.
+    """
+    company_id = int(company_id)
+    key = get_partner_graph_cache_key(company_id)
+    graph = cache.get(key)
+    if graph is None:
+        rows = CompanyType.objects.filter(
+            Q(company_id=company_id) | Q(partner_id=company_id)
+        ).values_list("id", "partner_id", "company_id", "category_id")
+        graph = build_partner_graph(company_id, rows)
+        cache.set(key, graph, PARTNER_GRAPH_CACHE_TIMEOUT)
+    return graph
+
+
+def invalidate_partner_graph(*company_ids):
+    keys = [get_partner_graph_cache_key(company_id) for company_id in company_ids]
+    cache.delete_many(keys)
+    # again after commit, a request may cache the old graph meanwhile
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def get_category_ids(kind):
+    """
+    return ids of vendor or sales channel categories.
+    """
+    key = get_category_ids_cache_key(kind)
+    category_ids = cache.get(key)
+    if category_ids is None:
+        category_ids = set(
+            Category.objects.filter(**{CATEGORY_FLAGS[kind]: True}).values_list(
+                "id", flat=True
+            )
+        )
+        cache.set(key, category_ids, PARTNER_GRAPH_CACHE_TIMEOUT)
+    return category_ids
+
+
+def get_requested_category_ids(category):
+    """
+    return ids of the category query parameter, no ids when it isn't an id.
+    """
+    try:
+        return {int(category)}
+    except (TypeError, ValueError):
+        return set()
+
+
+def _select(edges, category_ids):
+    selected = {}
+    for category_id, companies in edges.items():
+        if category_ids is None or category_id in category_ids:
+            selected.update(companies)
+    return selected
+
+
+def get_partner_ids(company_id, category_ids=None):
+    """
+    return ids of partner companies of the company in the categories, all
+    categories when category_ids is None.
+    """
+    return set(_select(get_partner_graph(company_id)["partners"], category_ids))
+
+
+def get_partner_companytype_ids(company_id):
+    return set(_select(get_partner_graph(company_id)["partners"], None).values())
+
+
+def get_client_companytype_ids(company_id):
+    return set(_select(get_partner_graph(company_id)["clients"], None).values())
+
+
+def is_partner(company_id, partner_id, category_ids=None):
+    """
+    return True when partner_id is a partner of company_id in one of the
+    categories.
+    """
+    return int(partner_id) in get_partner_ids(company_id, category_ids)
+
+
+def is_partner_companytype(company_id, companytype):
+    """
+    return True when the company type relates a partner to company_id.
+    """
+    if company_id is None:
+        return False
+    return companytype.pk in get_partner_companytype_ids(company_id)
+
+
+@receiver(post_save, sender=CompanyType)
+@receiver(post_delete, sender=CompanyType)
+def companytype_changed_receiver(sender, instance, **kwargs):
+    invalidate_partner_graph(instance.company_id, instance.partner_id)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed_receiver(sender, **kwargs):
+    cache.delete_many([get_category_ids_cache_key(kind) for kind in CATEGORY_FLAGS])
@@ -0,0 +1,60 @@
+"""Bulk loading of roles, permissions and login activities of a page."""
+from django.db.models import prefetch_related_objects
+from rolepermissions.roles import RolesManager
+
+from bat.company.models import Member
+from bat.users.models import UserLoginActivity
+
+RECENT_LOGIN_ACTIVITIES = 5
+
+
+def resolve_company_roles(companies, user_id):
+    """
+    return role names of the user by company id for all companies with
+    one query.
+    """
+    role_names = {role.get_name() for role in RolesManager.get_roles()}
+    roles = {company.id: [] for company in companies}
+    groups = (
+        Member.groups.through.objects.filter(
+            member__user_id=user_id, member__company_id__in=roles.keys()
+        )
+        .values_list("member__company_id", "group__name")
+        .order_by("group__name")
+    )
+    for company_id, name in groups:
+        if name in role_names:
+            roles[company_id].append(name)
+    return roles
+
+
+def get_recent_login_activities(user_ids, no_of_activities=RECENT_LOGIN_ACTIVITIES):
+    """
+    return the latest login activities by user id for all users with one
+    query ranking activities per user.
+    """
+    if not user_ids:
+        return {}
+    activities = {user_id: [] for user_id in user_ids}
+    ranked = UserLoginActivity.objects.raw(
+        "SELECT * FROM (SELECT *, ROW_NUMBER() OVER (PARTITION BY user_id "
+        "ORDER BY logged_in_at DESC) AS activity_rank FROM {0} "
+        "WHERE user_id = ANY(%s)) ranked WHERE activity_rank <= %s "
+        "ORDER BY user_id, logged_in_at DESC".format(
+            UserLoginActivity._meta.db_table
+        ),
+        [list(user_ids), no_of_activities],
+    )
+    for activity in ranked:
+        activities[activity.user_id].append(activity)
+    return activities
+
+
+def resolve_members(members):
+    """
+    load users, role groups and permissions of the members in place and
+    return their recent login activities by user id, the number of queries
+    doesn't depend on the number of members.
+    """
+    prefetch_related_objects(members, "user", "groups", "user_permissions")
+    return get_recent_login_activities({member.user_id for member in members})
@@ -8,7 +8,7 @@ from django.conf import settings
 from django.contrib.auth.models import Group, Permission
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import transaction
-from django.db.models import Sum
+from django.db.models import Manager, Sum
 from django.utils.translation import ugettext_lazy as _
 from djmoney.contrib.django_rest_framework import MoneyField
 from djmoney.money import Money
@@ -18,7 +18,9 @@ from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from rolepermissions.roles import assign_role, get_user_roles
 
+from bat.comments.serializers import CommentCountField
 from bat.company.file_serializers import FileSerializer
+from bat.company.ledger import record_inspection
 from bat.company.models import (
     Asset,
     AssetTransfer,
@@ -47,6 +49,8 @@ from bat.company.models import (
     PackingBox,
     Tax,
 )
+from bat.company.partners import invalidate_partner_graph, is_partner_companytype
+from bat.company.resolvers import resolve_company_roles, resolve_members
 from bat.company.utils import (
     get_list_of_permissions,
     get_list_of_roles,
@@ -55,6 +59,8 @@ from bat.company.utils import (
 from bat.globalutils.utils import get_cbm, get_status_object, set_field_errors
 from bat.product.constants import PRODUCT_PARENT_STATUS, PRODUCT_STATUS_DRAFT, PRODUCT_STATUS_DISCONTINUED
 from bat.serializersFields.serializers_fields import (
+    BulkPrimaryKeyRelatedField,
+    BulkRelatedListSerializer,
     CountrySerializerField,
     MoneySerializerField,
     QueryFieldsMixin,
@@ -98,6 +104,19 @@ class PermissionListField(serializers.ListField):
         return qs
 
 
+class CompanyListSerializer(serializers.ListSerializer):
+    """
+    resolve roles of the user in all listed companies at once.
+    """
+
+    def to_representation(self, data):
+        companies = list(data.all() if isinstance(data, Manager) else data)
+        self.context["company_roles"] = resolve_company_roles(
+            companies, self.context.get("user_id", None)
+        )
+        return super().to_representation(companies)
+
+
 class CompanySerializer(serializers.ModelSerializer):
     roles = serializers.SerializerMethodField()
     country = CountrySerializerField(required=False)
@@ -129,8 +148,11 @@ class CompanySerializer(serializers.ModelSerializer):
             "license_file",
         )
         read_only_fields = ("id", "is_active", "extra_data", "roles")
+        list_serializer_class = CompanyListSerializer
 
     def get_roles(self, obj):
+        if "company_roles" in self.context:
+            return self.context["company_roles"].get(obj.id, [])
         user_id = self.context.get("user_id", None)
         member = get_member(
             company_id=obj.id, user_id=user_id, raise_exception=False
@@ -139,6 +161,18 @@ class CompanySerializer(serializers.ModelSerializer):
         return [role.get_name() for role in roles]
 
 
+class MemberListSerializer(serializers.ListSerializer):
+    """
+    load users, roles, permissions and login activities of all listed
+    members at once.
+    """
+
+    def to_representation(self, data):
+        members = list(data.all() if isinstance(data, Manager) else data)
+        self.context["login_activities"] = resolve_members(members)
+        return super().to_representation(members)
+
+
 class MemberSerializer(QueryFieldsMixin, serializers.ModelSerializer):
     roles = GroupsListField(source="groups")
     user_permissions = PermissionListField()
@@ -146,12 +180,15 @@ class MemberSerializer(QueryFieldsMixin, serializers.ModelSerializer):
     login_activities = serializers.SerializerMethodField()
 
     def get_login_activities(self, obj):
-        return UserLoginActivitySerializer(
-            obj.user.get_recent_logged_in_activities(), many=True
-        ).data
+        if "login_activities" in self.context:
+            activities = self.context["login_activities"].get(obj.user_id, [])
+        else:
+            activities = obj.user.get_recent_logged_in_activities()
+        return UserLoginActivitySerializer(activities, many=True).data
 
     class Meta:
         model = Member
+        list_serializer_class = MemberListSerializer
         fields = (
             "id",
             "roles",
@@ -682,6 +719,7 @@ class CompanyContractSerializer(serializers.ModelSerializer):
 
     files = FileSerializer(many=True, required=False)
     status = StatusField(default=PRODUCT_STATUS_DRAFT)
+    comment_count = CommentCountField()
 
     class Meta:
         """Define field that we wanna show in the Json."""
@@ -699,6 +737,7 @@ class CompanyContractSerializer(serializers.ModelSerializer):
             "is_active",
             "status",
             "extra_data",
+            "comment_count",
         )
         read_only_fields = ("id", "files", "is_active", "company_member")
 
@@ -712,7 +751,7 @@ class CompanyContractSerializer(serializers.ModelSerializer):
         paymentterms = attrs.get("paymentterms", None)
         errors = {}
         if companytype:
-            if str(companytype.company.id) != str(company_id):
+            if not is_partner_companytype(company_id, companytype):
                 errors = set_field_errors(
                     errors, "companytype", _("Invalid company type selected.")
                 )
@@ -769,7 +808,7 @@ class CompanyCredentialSerializer(serializers.ModelSerializer):
         companytype = attrs.get("companytype", None)
         errors = {}
         if companytype:
-            if str(companytype.company.id) != str(company_id):
+            if not is_partner_companytype(company_id, companytype):
                 errors = set_field_errors(
                     errors, "companytype", _("Invalid company type selected.")
                 )
@@ -941,7 +980,7 @@ class CompanyProductSerializer(serializers.ModelSerializer):
                     errors, "product", _("Selected product is a component.")
                 )
         if companytype:
-            if str(companytype.company.id) != str(company_id):
+            if not is_partner_companytype(company_id, companytype):
                 errors = set_field_errors(
                     errors, "companytype", _("Invalid company type selected.")
                 )
@@ -961,6 +1000,15 @@ class CompanyProductSerializer(serializers.ModelSerializer):
 class CompanyOrderProductSerializer(serializers.ModelSerializer):
     """Serializer for Company Order Product."""
 
+    companyproduct = BulkPrimaryKeyRelatedField(
+        queryset=CompanyProduct.objects.all()
+    )
+    componentprice = BulkPrimaryKeyRelatedField(
+        queryset=ComponentPrice.objects.all(), required=False, allow_null=True
+    )
+    companypaymentterms = BulkPrimaryKeyRelatedField(
+        queryset=CompanyPaymentTerms.objects.all()
+    )
     price = MoneySerializerField(required=False)
     amount = MoneySerializerField(required=False)
 
@@ -968,6 +1016,7 @@ class CompanyOrderProductSerializer(serializers.ModelSerializer):
         """Define field that we wanna show in the Json."""
 
         model = CompanyOrderProduct
+        list_serializer_class = BulkRelatedListSerializer
         fields = (
             "id",
             "companyorder",
@@ -1006,6 +1055,7 @@ class CompanyOrderSerializer(serializers.ModelSerializer):
     deposit_amount = MoneySerializerField(default=0)
     files = FileSerializer(many=True, required=False)
     status = StatusField(default=PRODUCT_STATUS_DRAFT)
+    comment_count = CommentCountField()
 
     class Meta:
         """Define field that we wanna show in the Json."""
@@ -1030,6 +1080,7 @@ class CompanyOrderSerializer(serializers.ModelSerializer):
             "files",
             "status",
             "orderproducts",
+            "comment_count",
         )
         read_only_fields = (
             "id",
@@ -1057,37 +1108,45 @@ class CompanyOrderSerializer(serializers.ModelSerializer):
         companytype = attrs.get("companytype", None)
         orderproducts = attrs.get("orderproducts", [])
         errors = {}
-        discontinued_products_id = list(
-            CompanyProduct.objects.filter(
-                product__productparent__status_id=get_status(
-                    PRODUCT_PARENT_STATUS, PRODUCT_STATUS_DISCONTINUED
-                ).id,
-                companytype__company_id=company_id,
-            ).values_list("id", flat=True)
-        )
         if companytype:
-            if str(companytype.company.id) != str(company_id):
+            if not is_partner_companytype(company_id, companytype):
                 errors = set_field_errors(
                     errors, "companytype", _("Invalid company type selected.")
                 )
         if len(orderproducts) <= 0:
             msg = _("At Least one product required to place an order.")
             raise serializers.ValidationError({"orderproducts": msg})
-        else:
-            for orderproduct in orderproducts:
-                if (
+        discontinued_products_id = set(
+            CompanyProduct.objects.filter(
+                id__in=[
                     orderproduct["companyproduct"].id
-                    in discontinued_products_id
-                ):
-                    errors = set_field_errors(
-                        errors,
-                        "orderproducts",
-                        _(
-                            "Selected product "
-                            + str(orderproduct["companyproduct"].id)
-                            + " is discontinued."
-                        ),
-                    )
+                    for orderproduct in orderproducts
+                ],
+                product__status__name=PRODUCT_STATUS_DISCONTINUED,
+                product__status__parent__name=PRODUCT_PARENT_STATUS,
+            ).values_list("id", flat=True)
+        )
+        for orderproduct in orderproducts:
+            if orderproduct["companyproduct"].id in discontinued_products_id:
+                errors = set_field_errors(
+                    errors,
+                    "orderproducts",
+                    _(
+                        "Selected product "
+                        + str(orderproduct["companyproduct"].id)
+                        + " is discontinued."
+                    ),
+                )
+            if orderproduct.get("componentprice", None) is None:
+                errors = set_field_errors(
+                    errors,
+                    "orderproducts",
+                    _(
+                        "Price of selected product "
+                        + str(orderproduct["companyproduct"].id)
+                        + " is required."
+                    ),
+                )
         if errors:
             raise serializers.ValidationError(errors)
 
@@ -1112,52 +1171,10 @@ class CompanyOrderSerializer(serializers.ModelSerializer):
         with transaction.atomic():
             data = validated_data.copy()
             data["status"] = get_status_object(validated_data)
-            orderproducts = data.get("orderproducts", None)
-            data.pop("orderproducts")
-            # save order
-            companyorder = CompanyOrder.objects.create(**data)
-
-            # save order products
-            quantity = companyorder.quantity or 0
-            total_amount = 0
-            deposit_amount = 0
-            currency = member.company.currency
-            for orderproduct in orderproducts or []:
-                componentprice_obj = orderproduct.get("componentprice", None)
-                currency = componentprice_obj.price.currency
-                product_quantity = orderproduct.get("quantity", 0)
-                quantity += product_quantity
-                amount = Decimal(componentprice_obj.price.amount) * Decimal(
-                    product_quantity
-                )
-
-                if orderproduct.get("companypaymentterms", None).deposit:
-                    product_deposit_amount = (
-                        Decimal(
-                            orderproduct.get(
-                                "companypaymentterms", None
-                            ).deposit
-                        )
-                        * Decimal(amount)
-                    ) / Decimal(100)
-                else:
-                    product_deposit_amount = 0
-                deposit_amount += product_deposit_amount
-                total_amount += amount
-                orderproduct.pop("price", None)
-                orderproduct.pop("amount", None)
-                CompanyOrderProduct.objects.create(
-                    companyorder=companyorder,
-                    price=Money(componentprice_obj.price.amount, currency),
-                    amount=Money(amount, currency),
-                    remaining_quantity=product_quantity,
-                    **orderproduct,
-                )
-            companyorder.sub_amount = Money(total_amount, currency)
-            companyorder.total_amount = Money(total_amount, currency)
-            companyorder.deposit_amount = Money(deposit_amount, currency)
-            companyorder.quantity = quantity
-            companyorder.save()
+            orderproducts = data.pop("orderproducts", None) or []
+            companyorder = CompanyOrder.objects.place_order(
+                data, orderproducts, member.company.currency
+            )
             companyorder.save_pdf_file()
         return companyorder
 
@@ -1238,6 +1255,15 @@ class CompanyOrderDeliverySerializer(serializers.ModelSerializer):
                     "companyorder",
                     _("There is no bank registered for selected order."),
                 )
+            for orderdeliveryproduct in orderdeliveryproducts:
+                orderproduct = orderdeliveryproduct.get("companyorderproduct")
+                if orderproduct.companyorder_id != companyorder.id:
+                    errors = set_field_errors(
+                        errors,
+                        "orderdeliveryproducts",
+                        _("Product doesn't belong to selected order."),
+                    )
+                    break
         if len(orderdeliveryproducts) <= 0:
             msg = _(
                 "At Least one product required to create an order delivery."
@@ -1263,44 +1289,12 @@ class CompanyOrderDeliverySerializer(serializers.ModelSerializer):
             # save order
             companyorderdelivery = CompanyOrderDelivery.objects.create(**data)
 
-            # save order products
-            quantity = companyorderdelivery.quantity or 0
-            total_amount = 0
-            currency = member.company.currency
-            for orderdeliveryproduct in orderdeliveryproducts or []:
-                orderproduct = orderdeliveryproduct.get(
-                    "companyorderproduct", None
-                )
-                currency = orderproduct.price.currency
-                orderproduct_quantity = orderdeliveryproduct.pop("quantity", 0)
-                quantity += orderproduct_quantity
-                remaining_quantity = (
-                    orderproduct.remaining_quantity - orderproduct_quantity
-                )
-                if remaining_quantity < 0:
-                    remaining_quantity = 0
-                orderproduct.remaining_quantity = remaining_quantity
-                shipped_quantity = (
-                    orderproduct.shipped_quantity + orderproduct_quantity
-                )
-                if shipped_quantity < 0:
-                    shipped_quantity = 0
-                orderproduct.shipped_quantity = shipped_quantity
-                orderproduct.save()
-                amount = Decimal(orderproduct.price.amount) * Decimal(
-                    orderproduct_quantity
-                )
-
-                total_amount += amount
-                CompanyOrderDeliveryProduct.objects.create(
-                    companyorderdelivery=companyorderdelivery,
-                    amount=Money(amount, currency),
-                    quantity=orderproduct_quantity,
-                    **orderdeliveryproduct,
-                )
-            companyorderdelivery.amount = Money(total_amount, currency)
-            companyorderdelivery.quantity = quantity
-            companyorderdelivery.save()
+            # save order products and update shipped quantities
+            CompanyOrderDelivery.objects.post_products(
+                companyorderdelivery,
+                orderdeliveryproducts or [],
+                member.company.currency,
+            )
             # create company order payment object
             company_order_payment_data = {}
             company_order_payment_data[
@@ -1435,7 +1429,9 @@ class CompanyOrderInspectionSerializer(serializers.ModelSerializer):
         )
         validated_data["inspector"] = member
         validated_data["status"] = get_status_object(validated_data)
-        return super().create(validated_data)
+        companyorderinspection = super().create(validated_data)
+        record_inspection(companyorderinspection)
+        return companyorderinspection
 
     def update(self, instance, validated_data):
         validated_data["status"] = get_status_object(validated_data)
@@ -1748,6 +1744,8 @@ class CreateVendorCompanySerializer(VendorCompanySerializer):
                 )
 
         CompanyType.objects.bulk_create(companytypes)
+        # bulk_create sends no post_save
+        invalidate_partner_graph(company_id, vendor.id)
 
         member, _c = Member.objects.get_or_create(
             job_title="Admin",
@@ -0,0 +1,106 @@
+"""Task that can run by celery will be placed here."""
+from celery.utils.log import get_task_logger
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+
+from bat.company.forecast import forecast_company_inventory
+from bat.company.ledger import APPLY_BATCH_SIZE, apply_movements, take_snapshots
+from bat.company.models import Company, File
+from bat.globalutils.documents import (
+    mark_done,
+    mark_queued,
+    render_html,
+    render_pdf,
+)
+from config.celery import app
+
+logger = get_task_logger(__name__)
+
+
+def get_file_hash_key(file_id):
+    return "pdf_file_hash_{0}".format(file_id)
+
+
+def queue_pdf_file(file_id, template_path, data, file_name):
+    """
+    queue rendering of pdf for the File row once the transaction commits
+    """
+
+    def _enqueue():
+        mark_queued()
+        render_pdf_file.delay(file_id, template_path, data, file_name)
+
+    transaction.on_commit(_enqueue)
+
+
+@app.task
+def render_pdf_file(file_id, template_path, data, file_name):
+    """
+    render pdf from html template and store it on the File row.
+
+    Rendering is skipped when the file already holds a pdf of the same
+    html content, identical content rendered for other files comes from
+    the render cache.
+    """
+    try:
+        f = File.objects.filter(id=file_id).first()
+        if f is None:
+            logger.warning("file %s removed before pdf rendering", file_id)
+            return
+        html, content_hash = render_html(data, template_path)
+        hash_key = get_file_hash_key(file_id)
+        if f.file and cache.get(hash_key) == content_hash:
+            logger.info("pdf of file %s is unchanged", file_id)
+            return
+        pdf = render_pdf(html, content_hash)
+        if f.file:
+            f.file.delete(save=False)
+        f.file.save(file_name + ".pdf", ContentFile(pdf), save=False)
+        f.update_date = timezone.now()
+        f.save(update_fields=["file", "update_date"])
+        cache.set(hash_key, content_hash, None)
+    finally:
+        mark_done()
+
+
+@app.task
+def forecast_inventory(company_id):
+    """compute weekly inventory predictions of the company products."""
+    company = Company.objects.get(id=company_id)
+    count = forecast_company_inventory(company)
+    logger.info("company %s: %s inventory predictions saved", company_id, count)
+
+
+@app.task
+def forecast_all_inventories():
+    """queue inventory forecast of every active company."""
+    for company_id in Company.objects.filter(is_active=True).values_list(
+        "id", flat=True
+    ):
+        forecast_inventory.delay(company_id)
+
+
+@app.task
+def apply_inventory_movements():
+    """fold pending inventory movements into inventory totals."""
+    total = 0
+    while True:
+        count = apply_movements()
+        total += count
+        if count < APPLY_BATCH_SIZE:
+            break
+    logger.info("%s inventory movements applied", total)
+
+
+@app.task
+def snapshot_inventory():
+    """snapshot inventory totals changed by folded movements."""
+    total = 0
+    while True:
+        count = take_snapshots()
+        total += count
+        if count < APPLY_BATCH_SIZE:
+            break
+    logger.info("%s inventory movements snapshotted", total)
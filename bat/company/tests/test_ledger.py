@@ -0,0 +1,228 @@
+import datetime
+
+import pytest
+from django.utils import timezone
+
+from bat.company.constants import (
+    INVENTORY_IN_STOCK,
+    INVENTORY_IN_TRANSIT,
+    INVENTORY_READY_TO_SHIP,
+    INVENTORY_SHIPPED,
+)
+from bat.company.ledger import (
+    append_movements,
+    apply_movements,
+    get_inventory,
+    get_inventory_at,
+    record_amazon_order_items,
+    record_inspection,
+    take_snapshots,
+)
+from bat.company.models import (
+    CompanyInventory,
+    CompanyInventoryDetail,
+    CompanyOrderDelivery,
+    CompanyOrderInspection,
+    CompanyProduct,
+    InventoryMovement,
+    InventorySnapshot,
+)
+from bat.company.tests.test_models import create_delivery, create_order, get_lines
+from bat.market.models import AmazonAccounts
+from bat.users.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+def create_product(user, lines=1):
+    order = create_order(user, lines)
+    return order, CompanyProduct.objects.filter(companytype=order.companytype).first()
+
+
+def get_balances(**filters):
+    """return sum of movement quantities by type."""
+    balances = {}
+    for movement in InventoryMovement.objects.filter(**filters):
+        balances[movement.type] = balances.get(movement.type, 0) + movement.quantity
+    return balances
+
+
+class TestApplyMovements:
+    def test_creates_inventory_and_details(self, user: User):
+        _order, companyproduct = create_product(user)
+        append_movements(
+            [
+                (companyproduct.id, INVENTORY_IN_STOCK, 5, None),
+                (companyproduct.id, INVENTORY_IN_TRANSIT, 3, None),
+                (companyproduct.id, INVENTORY_IN_STOCK, 2, None),
+            ]
+        )
+
+        assert apply_movements() == 3
+
+        inventory = CompanyInventory.objects.get(companyproduct=companyproduct)
+        assert inventory.quantity == 7
+        assert get_inventory(companyproduct.id) == {
+            INVENTORY_IN_STOCK: 7,
+            INVENTORY_IN_TRANSIT: 3,
+        }
+        assert not InventoryMovement.objects.filter(is_processed=False).exists()
+
+    def test_adds_to_existing_totals(self, user: User):
+        _order, companyproduct = create_product(user)
+        append_movements([(companyproduct.id, INVENTORY_IN_STOCK, 5, None)])
+        apply_movements()
+        append_movements(
+            [
+                (companyproduct.id, INVENTORY_IN_STOCK, -2, None),
+                (companyproduct.id, INVENTORY_SHIPPED, 2, None),
+            ]
+        )
+
+        assert apply_movements() == 2
+
+        inventory = CompanyInventory.objects.get(companyproduct=companyproduct)
+        assert inventory.quantity == 3
+        assert CompanyInventoryDetail.objects.filter(
+            companyinventory=inventory
+        ).count() == 2
+        assert get_inventory(companyproduct.id) == {
+            INVENTORY_IN_STOCK: 3,
+            INVENTORY_SHIPPED: 2,
+        }
+
+    def test_nothing_pending(self):
+        assert apply_movements() == 0
+
+
+class TestSnapshots:
+    def test_inventory_at_before_and_after_snapshot(self, user: User):
+        _order, companyproduct = create_product(user)
+        now = timezone.now()
+        hour = datetime.timedelta(hours=1)
+        append_movements([(companyproduct.id, INVENTORY_IN_STOCK, 5, None)])
+        InventoryMovement.objects.update(create_date=now - 3 * hour)
+        apply_movements()
+        assert take_snapshots() == 1
+        InventorySnapshot.objects.update(create_date=now - 2 * hour)
+        append_movements([(companyproduct.id, INVENTORY_IN_STOCK, 3, None)])
+        InventoryMovement.objects.filter(snapshot__isnull=True).update(
+            create_date=now - hour
+        )
+        apply_movements()
+
+        assert get_inventory_at(companyproduct.id, now - 4 * hour) == {}
+        # after the snapshot, before the second movement
+        assert get_inventory_at(companyproduct.id, now - 1.5 * hour) == {
+            INVENTORY_IN_STOCK: 5
+        }
+        assert get_inventory_at(companyproduct.id, now) == {INVENTORY_IN_STOCK: 8}
+
+        # the second snapshot adds to the first one
+        assert take_snapshots() == 1
+        assert get_inventory_at(companyproduct.id, timezone.now()) == {
+            INVENTORY_IN_STOCK: 8
+        }
+        assert list(
+            InventorySnapshot.objects.order_by("id").values_list("quantity", flat=True)
+        ) == [5, 8]
+
+    def test_late_movement_goes_into_next_snapshot(self, user: User):
+        _order, companyproduct = create_product(user)
+        # a movement whose id is taken before a later one commits
+        late_id = InventoryMovement.objects.create(
+            companyproduct=companyproduct, type=INVENTORY_IN_STOCK, quantity=0
+        ).id
+        InventoryMovement.objects.filter(id=late_id).delete()
+        append_movements([(companyproduct.id, INVENTORY_IN_STOCK, 5, None)])
+        apply_movements()
+        take_snapshots()
+
+        InventoryMovement.objects.create(
+            id=late_id,
+            companyproduct=companyproduct,
+            type=INVENTORY_IN_STOCK,
+            quantity=3,
+        )
+        apply_movements()
+
+        assert take_snapshots() == 1
+        assert InventorySnapshot.objects.order_by("-id").first().quantity == 8
+        assert get_inventory_at(companyproduct.id, timezone.now()) == {
+            INVENTORY_IN_STOCK: 8
+        }
+
+    def test_pending_movements_are_not_snapshotted(self, user: User):
+        _order, companyproduct = create_product(user)
+        append_movements([(companyproduct.id, INVENTORY_IN_STOCK, 5, None)])
+
+        assert take_snapshots() == 0
+        assert get_inventory_at(companyproduct.id, timezone.now()) == {
+            INVENTORY_IN_STOCK: 5
+        }
+
+
+class TestRecordMovements:
+    def test_record_delivery(self, user: User):
+        order, _companyproduct = create_product(user, lines=2)
+        delivery = create_delivery(order)
+
+        CompanyOrderDelivery.objects.post_products(delivery, get_lines(order, 3), "USD")
+
+        assert InventoryMovement.objects.filter(object_id=delivery.id).count() == 4
+        for companyproduct in CompanyProduct.objects.filter(
+            companytype=order.companytype
+        ):
+            assert get_balances(
+                companyproduct=companyproduct, companyorder=order
+            ) == {INVENTORY_READY_TO_SHIP: -3, INVENTORY_IN_TRANSIT: 3}
+
+    def test_record_inspection(self, user: User):
+        order, companyproduct = create_product(user)
+        delivery = create_delivery(order)
+        CompanyOrderDelivery.objects.post_products(delivery, get_lines(order, 3), "USD")
+        inspection = CompanyOrderInspection.objects.create(
+            companyorder=order, inspector=order.buyer_member, status=order.status
+        )
+
+        record_inspection(inspection)
+
+        # the 7 undelivered are ready to ship, the 3 in transit are in stock
+        assert get_balances(companyproduct=companyproduct) == {
+            INVENTORY_READY_TO_SHIP: 7,
+            INVENTORY_IN_TRANSIT: 0,
+            INVENTORY_IN_STOCK: 3,
+        }
+
+        # a second inspection moves nothing
+        assert record_inspection(inspection) == []
+
+    def test_record_amazon_order_items(self, user: User):
+        order, companyproduct = create_product(user, lines=2)
+        companyproduct.asin = "B000000001"
+        companyproduct.save()
+        other = CompanyProduct.objects.exclude(id=companyproduct.id).get(
+            companytype=order.companytype
+        )
+        other.sku = "SKU-2"
+        other.save()
+        amazonaccount = AmazonAccounts(company=order.companytype.company)
+
+        record_amazon_order_items(
+            amazonaccount,
+            [
+                ("B000000001", "", 2),
+                ("B000000001", "", 1),
+                ("B000000009", "SKU-2", 4),
+                ("B000000009", "SKU-9", 5),
+            ],
+        )
+
+        assert get_balances(companyproduct=companyproduct) == {
+            INVENTORY_IN_STOCK: -3,
+            INVENTORY_SHIPPED: 3,
+        }
+        assert get_balances(companyproduct=other) == {
+            INVENTORY_IN_STOCK: -4,
+            INVENTORY_SHIPPED: 4,
+        }
@@ -0,0 +1,175 @@
+import threading
+
+import pytest
+from django.db import connection
+from djmoney.money import Money
+
+from bat.company import tasks
+from bat.company.models import (
+    Company,
+    CompanyOrder,
+    CompanyOrderDelivery,
+    CompanyOrderProduct,
+    CompanyPaymentTerms,
+    CompanyProduct,
+    CompanyType,
+    Member,
+)
+from bat.product.models import Product
+from bat.setting.models import Category, Status
+from bat.users.models import User
+from bat.users.tests.factories import UserFactory
+
+ZERO = Money(0, "USD")
+
+
+def create_member(name, user):
+    company = Company.objects.create(name=name, email="info@example.com", country="SE")
+    return Member.objects.create(
+        job_title="Admin",
+        user=user,
+        company=company,
+        invited_by=user,
+        is_admin=True,
+        invitation_accepted=True,
+    )
+
+
+def create_order(user, lines, quantity=10):
+    """
+    return an order of the user's company from a vendor with the number of
+    lines, each of the quantity.
+    """
+    member = create_member("company", user)
+    vendor_member = create_member("vendor", UserFactory())
+    company = member.company
+    status = Status.objects.create(name="Draft", user=user)
+    category = Category.objects.create(name="vendor", user=user, is_vendor_category=True)
+    companytype = CompanyType.objects.create(
+        partner=vendor_member.company, company=company, category=category
+    )
+    paymentterms = CompanyPaymentTerms.objects.create(
+        company=company, title="terms", remaining=100
+    )
+    order = CompanyOrder.objects.create(
+        batch_id="order",
+        companytype=companytype,
+        buyer_member=member,
+        seller_member=vendor_member,
+        status=status,
+        sub_amount=ZERO,
+        vat_amount=ZERO,
+        tax_amount=ZERO,
+        total_amount=ZERO,
+        return_amount=ZERO,
+        deposit_amount=ZERO,
+    )
+    for i in range(lines):
+        product = Product.objects.create(
+            company=company, title="product {0}".format(i), status=status
+        )
+        companyproduct = CompanyProduct.objects.create(
+            product=product,
+            companytype=companytype,
+            title=product.title,
+            price=Money(10, "USD"),
+            status=status,
+        )
+        CompanyOrderProduct.objects.create(
+            companyorder=order,
+            companyproduct=companyproduct,
+            quantity=quantity,
+            remaining_quantity=quantity,
+            price=Money(10, "USD"),
+            amount=Money(10 * quantity, "USD"),
+            companypaymentterms=paymentterms,
+        )
+    return order
+
+
+def create_delivery(order):
+    return CompanyOrderDelivery.objects.create(
+        batch_id="delivery",
+        companyorder=order,
+        quantity=0,
+        amount=ZERO,
+        status=order.status,
+    )
+
+
+def get_lines(order, quantity):
+    return [
+        {"companyorderproduct": orderproduct, "quantity": quantity}
+        for orderproduct in CompanyOrderProduct.objects.filter(companyorder=order)
+    ]
+
+
+class TestCompanyOrderDeliveryManager:
+    @pytest.mark.django_db
+    def test_post_products(self, user: User):
+        order = create_order(user, 2)
+        delivery = create_delivery(order)
+
+        remaining = CompanyOrderDelivery.objects.post_products(
+            delivery, get_lines(order, 3), "USD"
+        )
+
+        assert set(remaining.values()) == {7}
+        assert delivery.quantity == 6
+        assert delivery.amount == Money(60, "USD")
+        assert set(
+            CompanyOrderProduct.objects.filter(companyorder=order).values_list(
+                "remaining_quantity", "shipped_quantity"
+            )
+        ) == {(7, 3)}
+
+    @pytest.mark.django_db
+    def test_query_count_independent_of_lines(self, query_budget):
+        counts = []
+        for lines in (1, 20):
+            order = create_order(UserFactory(), lines)
+            delivery = create_delivery(order)
+            order_lines = get_lines(order, 1)
+
+            # lock, update, delivery products, movements and delivery
+            with query_budget(8) as context:
+                CompanyOrderDelivery.objects.post_products(delivery, order_lines, "USD")
+            counts.append(len(context.captured_queries))
+
+        assert counts[0] == counts[1]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_parallel_deliveries(self, user: User, monkeypatch):
+        # movements are folded by a worker, not by this test
+        monkeypatch.setattr(tasks.apply_inventory_movements, "delay", lambda: None)
+        threads = 4
+        order = create_order(user, 2)
+        deliveries = [create_delivery(order) for _i in range(threads)]
+        barrier = threading.Barrier(threads, timeout=30)
+        errors = []
+
+        def deliver(delivery):
+            try:
+                lines = get_lines(order, 2)
+                barrier.wait()
+                CompanyOrderDelivery.objects.post_products(delivery, lines, "USD")
+            except Exception as error:  # reported by the main thread
+                errors.append(error)
+            finally:
+                connection.close()
+
+        workers = [
+            threading.Thread(target=deliver, args=(delivery,)) for delivery in deliveries
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        assert errors == []
+        # every delivery moved 2 of each line, none is lost
+        assert set(
+            CompanyOrderProduct.objects.filter(companyorder=order).values_list(
+                "remaining_quantity", "shipped_quantity"
+            )
+        ) == {(2, 8)}
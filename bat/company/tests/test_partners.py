@@ -0,0 +1,46 @@
+import pytest
+
+from bat.company.models import Company, CompanyType
+from bat.company.partners import (
+    VENDOR_CATEGORIES,
+    get_category_ids,
+    get_partner_ids,
+    is_partner,
+)
+from bat.setting.models import Category
+from bat.users.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+def create_partner(company, category, name):
+    partner = Company.objects.create(name=name, email="info@example.com", country="SE")
+    CompanyType.objects.create(partner=partner, company=company, category=category)
+    return partner
+
+
+def test_partner_graph_is_cached(user: User, query_budget):
+    company = Company.objects.create(name="company", email="info@example.com", country="SE")
+    vendor = Category.objects.create(name="vendor", user=user, is_vendor_category=True)
+    sales_channel = Category.objects.create(
+        name="sales channel", user=user, is_sales_channel_category=True
+    )
+    supplier = create_partner(company, vendor, "supplier")
+    create_partner(company, sales_channel, "amazon")
+
+    assert get_partner_ids(company.id, get_category_ids(VENDOR_CATEGORIES)) == {
+        supplier.id
+    }
+    with query_budget(0):
+        assert is_partner(company.id, supplier.id, get_category_ids(VENDOR_CATEGORIES))
+
+
+def test_partner_graph_invalidated_on_company_type_change(user: User):
+    company = Company.objects.create(name="company", email="info@example.com", country="SE")
+    vendor = Category.objects.create(name="vendor", user=user, is_vendor_category=True)
+    assert get_partner_ids(company.id) == set()
+
+    supplier = create_partner(company, vendor, "supplier")
+
+    assert get_partner_ids(company.id) == {supplier.id}
+    assert not is_partner(supplier.id, company.id)
@@ -0,0 +1,151 @@
+import pytest
+from django.urls import resolve, reverse
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rolepermissions.roles import assign_role
+
+from bat.comments.models import Comment
+from bat.company.models import (
+    Company,
+    CompanyContract,
+    CompanyPaymentTerms,
+    CompanyType,
+    Member,
+)
+from bat.company.views.setting import CompanyViewSet, MemberViewSet
+from bat.setting.models import Category, Status
+from bat.users.models import User, UserLoginActivity
+from bat.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+PAGE = 20
+
+
+def create_company(name, user):
+    company = Company.objects.create(name=name, email="info@example.com", country="SE")
+    member = Member.objects.create(
+        job_title="Admin",
+        user=user,
+        company=company,
+        invited_by=user,
+        is_admin=True,
+        invitation_accepted=True,
+    )
+    assign_role(member, "company_admin")
+    return company, member
+
+
+def create_contract(company, member):
+    partner, partner_member = create_company("partner", UserFactory())
+    category = Category.objects.create(
+        name="vendor", user=member.user, is_vendor_category=True
+    )
+    return CompanyContract.objects.create(
+        companytype=CompanyType.objects.create(
+            partner=partner, company=company, category=category
+        ),
+        title="contract",
+        partner_member=partner_member,
+        company_member=member,
+        paymentterms=CompanyPaymentTerms.objects.create(
+            company=company, title="terms", remaining=100
+        ),
+        status=Status.objects.create(name="Draft", user=member.user),
+    )
+
+
+class TestCompanyViewSet:
+    def test_list_query_budget(self, user: User, query_budget):
+        for i in range(PAGE):
+            create_company("company {0}".format(i), user)
+        request = APIRequestFactory().get("/fake-url/")
+        force_authenticate(request, user=user)
+        view = CompanyViewSet.as_view({"get": "list"})
+
+        # count, companies and roles of all companies
+        with query_budget(3):
+            response = view(request)
+
+        assert len(response.data["results"]) == PAGE
+        assert all(
+            company["roles"] == ["company_admin"]
+            for company in response.data["results"]
+        )
+
+
+class TestMemberViewSet:
+    def test_list_query_budget(self, user: User, query_budget):
+        company, _member = create_company("company", user)
+        for _i in range(PAGE - 1):
+            staff = UserFactory()
+            Member.objects.create(
+                job_title="Staff", user=staff, company=company, invited_by=user
+            )
+            for _j in range(7):
+                UserLoginActivity.objects.create(user=staff, ip="127.0.0.1")
+        url = reverse("api:company:company-members-list", kwargs={"company_pk": company.pk})
+        request = APIRequestFactory().get(url)
+        request.resolver_match = resolve(url)
+        force_authenticate(request, user=user)
+        view = MemberViewSet.as_view({"get": "list"})
+
+        # permission check (member, groups, permissions), member and company
+        # of the filter, count, members and groups, permissions and login
+        # activities of all members
+        with query_budget(10):
+            response = view(request, company_pk=company.pk)
+
+        assert response.status_code == 200
+        members = response.data["results"]
+        assert len(members) == PAGE
+        staff_activities = [
+            len(member["login_activities"])
+            for member in members
+            if member["job_title"] == "Staff"
+        ]
+        # the 5 latest of 7 activities
+        assert staff_activities == [5] * (PAGE - 1)
+
+
+class TestCompanyContractCommentsViewSet:
+    def get_thread_url(self, company, contract):
+        return reverse(
+            "api:company:company-contract-comments-thread",
+            kwargs={"company_pk": company.pk, "object_pk": contract.pk},
+        )
+
+    def test_thread(self, user: User):
+        company, member = create_company("company", user)
+        contract = create_contract(company, member)
+        comment = Comment.objects.create(
+            user=user, content_object=contract, content="comment"
+        )
+        Comment.objects.create(
+            user=user, content_object=contract, content="reply", parent=comment
+        )
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        response = client.get(self.get_thread_url(company, contract))
+
+        assert response.status_code == 200
+        assert [comment["content"] for comment in response.data] == ["comment"]
+        assert response.data[0]["replies"][0]["content"] == "reply"
+
+    def test_thread_of_other_company(self, user: User):
+        company, _member = create_company("company", user)
+        other_user = UserFactory()
+        other_company, other_member = create_company("other company", other_user)
+        contract = create_contract(other_company, other_member)
+        Comment.objects.create(
+            user=other_user, content_object=contract, content="secret"
+        )
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        # the contract isn't one of the member's company
+        response = client.get(self.get_thread_url(company, contract))
+        assert response.status_code == 404
+        # the user isn't a member of the contract's company
+        response = client.get(self.get_thread_url(other_company, contract))
+        assert response.status_code == 404
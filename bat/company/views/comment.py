@@ -8,7 +8,8 @@ class CompanyContractCommentsViewSet(BaseCommentViewSet):
     """
     allow_create_permission_list = ["comment_company_contract"]
     allow_list_permission_list = ["view_company_contract"]
+    parent_company_lookup = "companytype__company_id"
 
     def get_content_type(self):
-        return ContentType.objects.get(
-            app_label='company', model='companycontract')
+        return ContentType.objects.get_by_natural_key(
+            'company', 'companycontract')
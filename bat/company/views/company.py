@@ -28,6 +28,10 @@ from bat.company.models import (
     ComponentGoldenSample,
     ComponentPrice,
 )
+from bat.company.partners import (
+    get_client_companytype_ids,
+    get_partner_companytype_ids,
+)
 from bat.mixins.mixins import ArchiveMixin, RestoreMixin
 
 
@@ -365,7 +369,7 @@ class PartnerCompanyViewSet(
     def filter_queryset(self, queryset):
         queryset = super().filter_queryset(queryset)
         company_id = self.kwargs.get("company_pk", None)
-        queryset = queryset.filter(company_id=company_id)
+        queryset = queryset.filter(pk__in=get_partner_companytype_ids(company_id))
         return queryset
 
 
@@ -393,5 +397,5 @@ class ClientCompanyViewSet(
     def filter_queryset(self, queryset):
         queryset = super().filter_queryset(queryset)
         company_id = self.kwargs.get("company_pk", None)
-        queryset = queryset.filter(partner_id=company_id)
+        queryset = queryset.filter(pk__in=get_client_companytype_ids(company_id))
         return queryset
@@ -27,16 +27,21 @@ from bat.company.models import (
     Bank,
     Company,
     CompanyPaymentTerms,
-    CompanyType,
     HsCode,
     Location,
     Member,
     PackingBox,
     Tax,
 )
+from bat.company.partners import (
+    SALES_CHANNEL_CATEGORIES,
+    VENDOR_CATEGORIES,
+    get_category_ids,
+    get_partner_ids,
+    get_requested_category_ids,
+)
 from bat.company.utils import get_member, set_default_company_payment_terms
 from bat.mixins.mixins import ArchiveMixin, RestoreMixin
-from bat.setting.models import Category
 from bat.subscription.utils import set_default_subscription_plan_on_company
 from bat.users.serializers import InvitationSerializer
 
@@ -326,7 +331,7 @@ class MemberViewSet(
     viewsets.GenericViewSet,
 ):
     serializer_class = serializers.MemberSerializer
-    queryset = Member.objects.all()
+    queryset = Member.objects.select_related("user")
     permission_classes = (IsAuthenticated, DRYPermissions)
     filter_backends = [DjangoFilterBackend, SearchFilter]
     filterset_fields = ["is_active", "is_admin", "invitation_accepted"]
@@ -615,16 +620,12 @@ class VendorCompanyViewSet(
 
         category = self.request.GET.get("category", False)
         if category:
-            vendor_categories = [category]
+            vendor_categories = get_requested_category_ids(category)
         else:
             # get vendor category
-            vendor_categories = Category.objects.vendor_categories().values_list(
-                "id", flat=True
-            )
+            vendor_categories = get_category_ids(VENDOR_CATEGORIES)
 
-        vendor_companies = CompanyType.objects.filter(
-            category__id__in=vendor_categories, company_id=company_id
-        ).values_list("partner", flat=True)
+        vendor_companies = get_partner_ids(company_id, vendor_categories)
 
         queryset = queryset.filter(pk__in=vendor_companies)
         return queryset
@@ -677,16 +678,12 @@ class SalesChannelCompanyViewSet(
 
         category = self.request.GET.get("category", False)
         if category:
-            sales_categories = [category]
+            sales_categories = get_requested_category_ids(category)
         else:
             # get categories
-            sales_categories = Category.objects.sales_channel_categories().values_list(
-                "id", flat=True
-            )
+            sales_categories = get_category_ids(SALES_CHANNEL_CATEGORIES)
 
-        companies = CompanyType.objects.filter(
-            category__id__in=sales_categories, company_id=company_id
-        ).values_list("partner", flat=True)
+        companies = get_partner_ids(company_id, sales_categories)
 
         queryset = queryset.filter(pk__in=companies)
         return queryset
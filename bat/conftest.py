@@ -1,4 +1,8 @@
+from contextlib import contextmanager
+
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from bat.users.models import User
 from bat.users.tests.factories import UserFactory
@@ -12,3 +16,26 @@ def media_storage(settings, tmpdir):
 @pytest.fixture
 def user() -> User:
     return UserFactory()
+
+
+@pytest.fixture
+def query_budget(db):
+    """
+    Assert the number of queries run inside the block, e.g.
+
+        with query_budget(4):
+            api_client.get(url)
+    """
+
+    @contextmanager
+    def _budget(max_queries):
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        executed = len(context.captured_queries)
+        assert executed <= max_queries, "{0} queries, budget {1}:\n{2}".format(
+            executed,
+            max_queries,
+            "\n".join(query["sql"] for query in context.captured_queries),
+        )
+
+    return _budget
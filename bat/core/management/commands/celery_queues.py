@@ -0,0 +1,66 @@
+"""Print the depth and age of the celery queues."""
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from config.celery import SENT_AT_HEADER, WORKER_QUEUES, app
+
+
+def get_queue_stats():
+    """
+    return {queue: {"depth": .., "oldest_age": ..}} of the redis broker,
+    messages of all priorities counted. oldest_age is None for an empty
+    queue or messages published without the sent_at header.
+    """
+    stats = {}
+    now = time.time()
+    with app.connection_for_read() as connection:
+        channel = connection.default_channel
+        client = channel.client
+        for queue in WORKER_QUEUES:
+            depth = 0
+            sent_at = []
+            for priority in channel.priority_steps:
+                key = channel._q_for_pri(queue, priority)
+                depth += client.llen(key)
+                # messages are pushed on the left and consumed from the right
+                oldest = client.lindex(key, -1)
+                if oldest is not None:
+                    headers = json.loads(oldest).get("headers") or {}
+                    if SENT_AT_HEADER in headers:
+                        sent_at.append(headers[SENT_AT_HEADER])
+            stats[queue] = {
+                "depth": depth,
+                "oldest_age": now - min(sent_at) if sent_at else None,
+            }
+        stats["unacked"] = {"depth": client.hlen(channel.unacked_key), "oldest_age": None}
+    return stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Print the number of waiting tasks and the age of the oldest task "
+        "of every celery queue, and of delivered but unacknowledged tasks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--watch", type=float, default=0, help="repeat every n seconds"
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            for queue, stat in get_queue_stats().items():
+                age = stat["oldest_age"]
+                self.stdout.write(
+                    "{0:<14} depth={1:<8} oldest={2}".format(
+                        queue,
+                        stat["depth"],
+                        "-" if age is None else "{0:.0f}s".format(age),
+                    )
+                )
+            if not options["watch"]:
+                return
+            self.stdout.write("")
+            time.sleep(options["watch"])
@@ -3,7 +3,12 @@ from django.urls import path, include
 
 from rest_framework_nested.routers import DefaultRouter
 
-from bat.core.views import CurrencyChoicesViewSet
+from bat.core.views import (
+    AmazonTokenMetricsViewSet,
+    CurrencyChoicesViewSet,
+    DocumentMetricsViewSet,
+    RequestProfileViewSet,
+)
 
 app_name = "core"
 
@@ -12,6 +17,17 @@ router = DefaultRouter()
 router.register(
     "currency-choices", CurrencyChoicesViewSet, basename="currency-choices"
 )
+router.register(
+    "document-metrics", DocumentMetricsViewSet, basename="document-metrics"
+)
+router.register(
+    "amazon-token-metrics",
+    AmazonTokenMetricsViewSet,
+    basename="amazon-token-metrics",
+)
+router.register(
+    "request-profiles", RequestProfileViewSet, basename="request-profiles"
+)
 
 urlpatterns = [
     path("", include(router.urls))
@@ -1,9 +1,13 @@
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status, viewsets
 
 from djmoney.settings import CURRENCY_CHOICES
 
+from bat.globalutils.documents import get_render_metrics
+from bat.globalutils.profiling import get_profiles
+from bat.market.amazon_sp_api.auth_access_token_client import get_token_metrics
+
 
 class CurrencyChoicesViewSet(viewsets.ViewSet):
 
@@ -18,3 +22,33 @@ class CurrencyChoicesViewSet(viewsets.ViewSet):
                 "name": name
             })
         return Response(currency_choices, status=status.HTTP_200_OK)
+
+
+class DocumentMetricsViewSet(viewsets.ViewSet):
+    permission_classes = (IsAdminUser,)
+
+    def list(self, request):
+        """
+        queue depth and render time metrics of pdf document rendering
+        """
+        return Response(get_render_metrics(), status=status.HTTP_200_OK)
+
+
+class AmazonTokenMetricsViewSet(viewsets.ViewSet):
+    permission_classes = (IsAdminUser,)
+
+    def list(self, request):
+        """
+        amazon access token refreshes per hour and token cache hit ratio
+        """
+        return Response(get_token_metrics(), status=status.HTTP_200_OK)
+
+
+class RequestProfileViewSet(viewsets.ViewSet):
+    permission_classes = (IsAdminUser,)
+
+    def list(self, request):
+        """
+        latest request profiles recorded by this server process
+        """
+        return Response(get_profiles(), status=status.HTTP_200_OK)
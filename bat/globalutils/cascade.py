@@ -0,0 +1,61 @@
+"""Set based archive/restore of model instances and their related objects."""
+from django.contrib.contenttypes.fields import GenericRelation
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+
+# Sent once per cascade with the parent model as sender, the list of parent
+# ids in ``ids`` and the new ``is_active`` value of their related objects.
+archive_cascaded = Signal()
+
+
+def get_cascade_relations(model):
+    """
+    Resolve relation names listed in ``model.archive_cascade``.
+
+    Return a list of (related model, lookup to parent ids, extra filters) so
+    every relation can be updated with a single query.
+    """
+    relations = []
+    for name in getattr(model, "archive_cascade", []):
+        field = model._meta.get_field(name)
+        if isinstance(field, GenericRelation):
+            lookup = field.object_id_field_name + "__in"
+            extra_filters = {
+                field.content_type_field_name: ContentType.objects.get_for_model(
+                    model
+                )
+            }
+        else:
+            lookup = field.field.name + "__in"
+            extra_filters = {}
+        relations.append((field.related_model, lookup, extra_filters))
+    return relations
+
+
+def cascade_is_active(model, ids, is_active):
+    """
+    Set is_active on all related objects of the given parent ids.
+
+    Run one UPDATE per relation declared in ``model.archive_cascade`` and
+    send ``archive_cascaded`` once for the whole set of ids.
+    """
+    ids = list(ids)
+    if not ids:
+        return
+    now = timezone.now()
+    with transaction.atomic():
+        for related_model, lookup, extra_filters in get_cascade_relations(
+            model
+        ):
+            values = {"is_active": is_active}
+            if any(
+                f.name == "update_date" for f in related_model._meta.fields
+            ):
+                values["update_date"] = now
+            related_model.objects.filter(
+                **{lookup: ids}, **extra_filters
+            ).update(**values)
+        archive_cascaded.send(sender=model, ids=ids, is_active=is_active)
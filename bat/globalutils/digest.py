@@ -0,0 +1,23 @@
+"""Content digests of imported rows, used to skip unchanged rows."""
+import hashlib
+import json
+
+from django.db import models
+from djmoney.money import Money
+
+
+def _digest_value(value):
+    if isinstance(value, Money):
+        return [str(value.amount), str(value.currency)]
+    if isinstance(value, models.Model):
+        return value.pk
+    return str(value)
+
+
+def get_row_digest(row):
+    """
+    return sha256 hex digest of a parsed report row, nested lists and dicts,
+    money and model instances included. Key order doesn't matter.
+    """
+    content = json.dumps(row, sort_keys=True, default=_digest_value)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
@@ -0,0 +1,92 @@
+"""Rendering of PDF documents from html templates with a render cache."""
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from weasyprint import HTML
+
+PDF_TEMPLATES_PATH = "pdf-templates/"
+# rendered pdf bytes are kept this long, keyed by the html content hash
+RENDER_CACHE_TIMEOUT = 60 * 60 * 24
+RENDER_CACHE_MAX_SIZE = 5 * 1024 * 1024
+
+QUEUE_DEPTH_KEY = "documents_queue_depth"
+RENDER_COUNT_KEY = "documents_render_count"
+RENDER_TIME_KEY = "documents_render_time_ms"
+RENDER_CACHE_HITS_KEY = "documents_render_cache_hits"
+LAST_RENDER_TIME_KEY = "documents_last_render_time_ms"
+
+
+def _incr(key, delta=1):
+    cache.add(key, 0, None)
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        cache.set(key, delta, None)
+        return delta
+
+
+def render_html(data, template_path):
+    """
+    return html of the pdf template and its content hash
+    """
+    html = render_to_string(PDF_TEMPLATES_PATH + template_path, data)
+    return html, hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+
+def render_pdf(html, content_hash):
+    """
+    return pdf bytes for the html, reusing a cached render of same content
+    """
+    key = "pdf_render_" + content_hash
+    pdf = cache.get(key)
+    if pdf is not None:
+        _incr(RENDER_CACHE_HITS_KEY)
+        return pdf
+
+    start = time.perf_counter()
+    pdf = HTML(string=html).write_pdf()
+    render_ms = int((time.perf_counter() - start) * 1000)
+
+    _incr(RENDER_COUNT_KEY)
+    _incr(RENDER_TIME_KEY, render_ms)
+    cache.set(LAST_RENDER_TIME_KEY, render_ms, None)
+    if len(pdf) <= RENDER_CACHE_MAX_SIZE:
+        cache.set(key, pdf, RENDER_CACHE_TIMEOUT)
+    return pdf
+
+
+def mark_queued():
+    _incr(QUEUE_DEPTH_KEY)
+
+
+def mark_done():
+    if _incr(QUEUE_DEPTH_KEY, -1) < 0:
+        cache.set(QUEUE_DEPTH_KEY, 0, None)
+
+
+def get_render_metrics():
+    """
+    return queue depth and render time metrics of the pdf pipeline
+    """
+    values = cache.get_many(
+        [
+            QUEUE_DEPTH_KEY,
+            RENDER_COUNT_KEY,
+            RENDER_TIME_KEY,
+            RENDER_CACHE_HITS_KEY,
+            LAST_RENDER_TIME_KEY,
+        ]
+    )
+    render_count = values.get(RENDER_COUNT_KEY, 0)
+    render_time = values.get(RENDER_TIME_KEY, 0)
+    return {
+        "queue_depth": values.get(QUEUE_DEPTH_KEY, 0),
+        "render_count": render_count,
+        "render_cache_hits": values.get(RENDER_CACHE_HITS_KEY, 0),
+        "average_render_time_ms": (
+            render_time / render_count if render_count else 0
+        ),
+        "last_render_time_ms": values.get(LAST_RENDER_TIME_KEY, 0),
+    }
@@ -0,0 +1,173 @@
+"""Pagination classes for large, append mostly tables."""
+import base64
+import hashlib
+import json
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import ugettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def get_table_estimate(model):
+    """
+    return planner row estimate of the model table from pg_class
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+class KeysetPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination with an opt in keyset mode.
+
+    Requests without ``cursor`` behave like LimitOffsetPagination. Sending
+    ``cursor`` (empty for the first page) pages on (create_date, id) in
+    descending order, so deep pages cost the same as the first one. In
+    keyset mode the count of big tables comes from pg_class or from a
+    cached exact count instead of a COUNT(*) on every page.
+    """
+
+    cursor_query_param = "cursor"
+    ordering = ("-create_date", "-id")
+    # tables with more rows than this get an approximate count
+    approximate_count_threshold = 100000
+    count_cache_timeout = 60 * 10
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_keyset = self.cursor_query_param in request.query_params
+        if not self.use_keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.count, self.count_is_estimate = self.get_keyset_count(queryset)
+        cursor = self.decode_cursor(
+            request.query_params.get(self.cursor_query_param)
+        )
+        reverse = bool(cursor and cursor.get("r"))
+
+        if cursor:
+            create_date, pk = cursor["d"], cursor["i"]
+            if reverse:
+                queryset = queryset.filter(
+                    Q(create_date__gt=create_date)
+                    | Q(create_date=create_date, id__gt=pk)
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(create_date__lt=create_date)
+                    | Q(create_date=create_date, id__lt=pk)
+                )
+        if reverse:
+            queryset = queryset.order_by("create_date", "id")
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        results = list(queryset[: self.limit + 1])
+        has_more = len(results) > self.limit
+        results = results[: self.limit]
+        if reverse:
+            results.reverse()
+
+        self.next_cursor = None
+        self.previous_cursor = None
+        if results:
+            first, last = results[0], results[-1]
+            if has_more or reverse:
+                self.next_cursor = self.encode_cursor(last, reverse=False)
+            if cursor and (has_more or not reverse):
+                self.previous_cursor = self.encode_cursor(first, reverse=True)
+        return results
+
+    def get_paginated_response(self, data):
+        if not self.use_keyset:
+            return super().get_paginated_response(data)
+        return Response(
+            OrderedDict(
+                [
+                    ("count", self.count),
+                    ("count_is_estimate", self.count_is_estimate),
+                    ("next", self.get_cursor_link(self.next_cursor)),
+                    ("previous", self.get_cursor_link(self.previous_cursor)),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_keyset_count(self, queryset):
+        """
+        return (count, is_estimate) for the queryset.
+
+        Small tables are counted exactly. For big tables an unfiltered
+        queryset uses pg_class.reltuples and a filtered one uses an exact
+        count cached for ``count_cache_timeout`` seconds.
+        """
+        table_estimate = get_table_estimate(queryset.model)
+        if table_estimate < self.approximate_count_threshold:
+            return queryset.count(), False
+        if not queryset.query.where:
+            return table_estimate, True
+        sql, params = queryset.order_by().query.sql_with_params()
+        key = "keyset_count_" + hashlib.md5(
+            (sql + repr(params)).encode("utf-8")
+        ).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, self.count_cache_timeout)
+        return count, True
+
+    def encode_cursor(self, obj, reverse):
+        data = {"d": obj.create_date.isoformat(), "i": obj.id}
+        if reverse:
+            data["r"] = 1
+        return base64.urlsafe_b64encode(
+            json.dumps(data).encode("utf-8")
+        ).decode("ascii")
+
+    def decode_cursor(self, encoded):
+        if not encoded:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+            create_date = parse_datetime(data["d"])
+            pk = int(data["i"])
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(_("Invalid cursor"))
+        if create_date is None:
+            raise NotFound(_("Invalid cursor"))
+        return {"d": create_date, "i": pk, "r": data.get("r")}
+
+    def get_cursor_link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.offset_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        parameters.append(
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Opt in keyset pagination cursor, empty for the first page.",
+                "schema": {"type": "string"},
+            }
+        )
+        return parameters
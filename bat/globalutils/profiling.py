@@ -0,0 +1,168 @@
+"""Per request query, cache and serializer instrumentation."""
+import contextvars
+import re
+import threading
+import time
+from collections import Counter, deque
+
+from django.conf import settings
+
+FINGERPRINT_NUMBERS = re.compile(r"\b\d+\b")
+FINGERPRINT_STRINGS = re.compile(r"'(?:[^']|'')*'")
+FINGERPRINT_LISTS = re.compile(r"\((?:\s*%s\s*,)+\s*%s\s*\)|\((?:\s*\?\s*,)+\s*\?\s*\)")
+DUPLICATES_REPORTED = 5
+
+_current = contextvars.ContextVar("request_profile", default=None)
+_buffer = None
+_buffer_lock = threading.Lock()
+_patched = False
+
+
+def get_buffer():
+    global _buffer
+    if _buffer is None:
+        _buffer = deque(maxlen=settings.REQUEST_PROFILING_BUFFER_SIZE)
+    return _buffer
+
+
+def get_profiles():
+    """
+    return recorded request profiles of this process, newest first
+    """
+    with _buffer_lock:
+        return list(reversed(get_buffer()))
+
+
+def fingerprint(sql):
+    """
+    return sql with literals and IN lists normalized, so the same query
+    with other parameters has the same fingerprint
+    """
+    sql = FINGERPRINT_STRINGS.sub("?", sql)
+    sql = FINGERPRINT_NUMBERS.sub("?", sql)
+    return FINGERPRINT_LISTS.sub("(...)", sql)
+
+
+class RequestProfile:
+    """Counters of one request, filled by the wrappers below."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.fingerprints = Counter()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - start
+            self.queries += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def as_dict(self, request, response):
+        duplicates = [
+            {"sql": sql, "count": count}
+            for sql, count in self.fingerprints.most_common(DUPLICATES_REPORTED)
+            if count > 1
+        ]
+        resolver_match = getattr(request, "resolver_match", None)
+        return {
+            "view": resolver_match.view_name if resolver_match else None,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "total_ms": round((time.perf_counter() - self.start) * 1000, 2),
+            "queries": self.queries,
+            "sql_ms": round(self.sql_time * 1000, 2),
+            "duplicate_queries": duplicates,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "serializer_ms": round(self.serializer_time * 1000, 2),
+            "response_size": (
+                None if response.streaming else len(response.content)
+            ),
+        }
+
+
+def get_server_timing(data):
+    return (
+        'db;dur={sql_ms};desc="{queries} queries", '
+        'cache;desc="{cache_hits} hits {cache_misses} misses", '
+        "ser;dur={serializer_ms}, total;dur={total_ms}".format(**data)
+    )
+
+
+def start_profile():
+    profile = RequestProfile()
+    return profile, _current.set(profile)
+
+
+def finish_profile(token, request, response):
+    profile = _current.get()
+    _current.reset(token)
+    data = profile.as_dict(request, response)
+    with _buffer_lock:
+        get_buffer().append(data)
+    return data
+
+
+def _wrap_cache_read(method, multiple):
+    def wrapper(self, *args, **kwargs):
+        value = method(self, *args, **kwargs)
+        profile = _current.get()
+        if profile is not None:
+            if multiple:
+                keys = args[0] if args else kwargs.get("keys", [])
+                profile.cache_hits += len(value)
+                profile.cache_misses += len(keys) - len(value)
+            elif value is (args[1] if len(args) > 1 else kwargs.get("default")):
+                profile.cache_misses += 1
+            else:
+                profile.cache_hits += 1
+        return value
+
+    return wrapper
+
+
+def _wrap_serializer_data(prop):
+    def getter(self):
+        profile = _current.get()
+        if profile is None or profile.serializer_depth:
+            return prop.fget(self)
+        profile.serializer_depth += 1
+        start = time.perf_counter()
+        try:
+            return prop.fget(self)
+        finally:
+            profile.serializer_time += time.perf_counter() - start
+            profile.serializer_depth -= 1
+
+    return property(getter)
+
+
+def install():
+    """
+    wrap cache reads and serializer data once per process, only called when
+    profiling is enabled so disabled processes run the original code.
+    """
+    global _patched
+    if _patched:
+        return
+    from django.core.cache import caches
+    from rest_framework import serializers
+
+    for alias in settings.CACHES:
+        cache_class = type(caches[alias])
+        if not getattr(cache_class, "_profiling_wrapped", False):
+            cache_class.get = _wrap_cache_read(cache_class.get, False)
+            cache_class.get_many = _wrap_cache_read(cache_class.get_many, True)
+            cache_class._profiling_wrapped = True
+    for serializer_class in (serializers.Serializer, serializers.ListSerializer):
+        serializer_class.data = _wrap_serializer_data(serializer_class.data)
+    _patched = True
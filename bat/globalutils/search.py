@@ -0,0 +1,84 @@
+"""Full text and trigram search for list endpoints backed by Postgres."""
+import re
+
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramSimilarity,
+)
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Greatest
+from rest_framework.filters import SearchFilter
+
+SEARCH_CONFIG = "simple"
+SEARCH_VECTOR_FIELD = "search_vector"
+
+
+def get_search_query(text):
+    """
+    Build a prefix matching tsquery from user input.
+
+    Every word becomes ``word:*`` and words are AND'ed, so "blue bot"
+    matches "blue bottle". Return None when nothing searchable is left.
+    """
+    words = re.findall(r"\w+", text.lower())
+    if not words:
+        return None
+    return SearchQuery(
+        " & ".join(word + ":*" for word in words),
+        search_type="raw",
+        config=SEARCH_CONFIG,
+    )
+
+
+def search_queryset(queryset, text, trigram_fields):
+    """
+    Filter and annotate queryset with ``search_rank`` for the given text.
+
+    Rows match on the weighted search vector (prefix match) or on trigram
+    similarity of ``trigram_fields`` (typo tolerant). Both conditions are
+    served by GIN indexes.
+    """
+    query = get_search_query(text)
+    if query is None:
+        return queryset
+    condition = Q(**{SEARCH_VECTOR_FIELD: query})
+    similarities = []
+    for field in trigram_fields:
+        condition |= Q(**{field + "__trigram_similar": text})
+        similarities.append(TrigramSimilarity(field, text))
+    rank = SearchRank(F(SEARCH_VECTOR_FIELD), query)
+    if similarities:
+        rank = Greatest(
+            rank, *similarities, output_field=FloatField()
+        )
+    return queryset.filter(condition).annotate(search_rank=rank)
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    Search filter using the ``search_vector`` column of the model.
+
+    Results are ordered by rank, an ``ordering`` query parameter handled
+    by OrderingFilter later in the chain still takes precedence. Views set
+    ``search_trigram_fields`` for short columns that should tolerate typos
+    (titles, skus). Models without a search vector fall back to the plain
+    SearchFilter behaviour over ``search_fields``.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        model_fields = [f.name for f in queryset.model._meta.get_fields()]
+        if SEARCH_VECTOR_FIELD not in model_fields:
+            return super().filter_queryset(request, queryset, view)
+
+        search_terms = self.get_search_terms(request)
+        if not search_terms:
+            return queryset
+        queryset = search_queryset(
+            queryset,
+            " ".join(search_terms),
+            getattr(view, "search_trigram_fields", []),
+        )
+        if "search_rank" in queryset.query.annotations:
+            queryset = queryset.order_by("-search_rank", "-pk")
+        return queryset
@@ -0,0 +1,25 @@
+"""Helpers for files kept in the default (S3 in production) storage."""
+S3_DELETE_BATCH_SIZE = 1000
+
+
+def delete_files(storage, names):
+    """
+    delete files from the storage, S3 buckets get one delete_objects call
+    per 1000 keys instead of a request per file.
+    """
+    names = [name for name in names if name]
+    if not names:
+        return
+    bucket = getattr(storage, "bucket", None)
+    if bucket is None:
+        for name in names:
+            storage.delete(name)
+        return
+    keys = [storage._normalize_name(storage._clean_name(name)) for name in names]
+    for i in range(0, len(keys), S3_DELETE_BATCH_SIZE):
+        bucket.delete_objects(
+            Delete={
+                "Objects": [{"Key": key} for key in keys[i: i + S3_DELETE_BATCH_SIZE]],
+                "Quiet": True,
+            }
+        )
@@ -1,71 +1,135 @@
-# import pytz
+import hashlib
 import logging
-from datetime import datetime, timedelta
+import time
+import uuid
+from datetime import timedelta
 
+from django.core.cache import cache
 from django.utils import timezone
 
 from sp_api.auth.access_token_client import AccessTokenClient
 from sp_api.auth.access_token_response import AccessTokenResponse
-from cachetools import TTLCache
-
 
 from bat.market.models import AmazonAccountCredentails
 
-cache = TTLCache(maxsize=10, ttl=3600)
-grantless_cache = TTLCache(maxsize=10, ttl=3600)
 logger = logging.getLogger(__name__)
-# utc = pytz.UTC
+
+# tokens are refreshed this many seconds before they expire
+TOKEN_EARLY_REFRESH_SECONDS = 300
+TOKEN_LOCK_TIMEOUT = 30
+# time a worker waits for another worker refreshing the same credential
+TOKEN_WAIT_SECONDS = 10
+TOKEN_WAIT_INTERVAL = 0.2
+METRICS_HOURS = 24
+
+TOKEN_HITS_KEY = "lwa_token_cache_hits"
+TOKEN_MISSES_KEY = "lwa_token_cache_misses"
+
+
+def _incr(key, timeout=None):
+    cache.add(key, 0, timeout)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout)
+        return 1
+
+
+def _refreshes_key(hour):
+    return "lwa_token_refreshes_{0}".format(hour.strftime("%Y%m%d%H"))
+
+
+def get_token_metrics():
+    """
+    return token refreshes by hour of the last day and the token cache hit
+    ratio of all workers
+    """
+    now = timezone.now().replace(minute=0, second=0, microsecond=0)
+    hours = [now - timedelta(hours=h) for h in range(METRICS_HOURS)]
+    values = cache.get_many(
+        [TOKEN_HITS_KEY, TOKEN_MISSES_KEY] + [_refreshes_key(h) for h in hours]
+    )
+    hits = values.get(TOKEN_HITS_KEY, 0)
+    misses = values.get(TOKEN_MISSES_KEY, 0)
+    return {
+        "refreshes_per_hour": [
+            {"hour": hour, "refreshes": values.get(_refreshes_key(hour), 0)}
+            for hour in hours
+        ],
+        "cache_hits": hits,
+        "cache_misses": misses,
+        "cache_hit_ratio": hits / (hits + misses) if hits + misses else 0,
+    }
 
 
 class AuthAccessTokenClient(AccessTokenClient):
+    """
+    access token client that shares tokens of a credential between all
+    workers through the cache, only one worker refreshes a credential at a
+    time while the others wait for its token.
+    """
+
+    def _get_token_keys(self):
+        digest = hashlib.sha256(self.cred.refresh_token.encode()).hexdigest()
+        return "lwa_token_" + digest, "lwa_token_lock_" + digest
+
+    @staticmethod
+    def _is_fresh(stored, early=TOKEN_EARLY_REFRESH_SECONDS):
+        return stored is not None and stored["expires_at"] - time.time() > early
+
+    def _refresh(self, token_key):
+        request_url = self.scheme + self.host + self.path
+        access_token = self._request(request_url, self.data, self.headers)
+        expires_in = access_token.get("expires_in")
+        cache.set(
+            token_key,
+            {"token": access_token, "expires_at": time.time() + expires_in},
+            expires_in,
+        )
+        AmazonAccountCredentails.objects.filter(
+            refresh_token=self.cred.refresh_token
+        ).update(
+            access_token=access_token.get("access_token"),
+            refresh_token=(
+                access_token.get("refresh_token") or self.cred.refresh_token
+            ),
+            expires_at=timezone.now() + timedelta(seconds=expires_in),
+        )
+        _incr(_refreshes_key(timezone.now()), 60 * 60 * (METRICS_HOURS + 1))
+        logger.debug("token refreshed")
+        return access_token
+
     def get_auth(self) -> AccessTokenResponse:
         """
         Get's the access token
         :return:AccessTokenResponse
         """
-#
-
-        global cache
+        token_key, lock_key = self._get_token_keys()
+        stored = cache.get(token_key)
+        if self._is_fresh(stored):
+            _incr(TOKEN_HITS_KEY)
+            return AccessTokenResponse(**stored["token"])
+        _incr(TOKEN_MISSES_KEY)
 
-        cache_key = self._get_cache_key()
+        owner = uuid.uuid4().hex
+        deadline = time.monotonic() + TOKEN_WAIT_SECONDS
+        while not cache.add(lock_key, owner, TOKEN_LOCK_TIMEOUT):
+            # another worker refreshes, a token that isn't expired yet is
+            # still usable meanwhile
+            if self._is_fresh(stored, early=0):
+                return AccessTokenResponse(**stored["token"])
+            if time.monotonic() > deadline:
+                logger.warning("token refresh lock timed out, refreshing")
+                return AccessTokenResponse(**self._refresh(token_key))
+            time.sleep(TOKEN_WAIT_INTERVAL)
+            stored = cache.get(token_key)
+            if self._is_fresh(stored):
+                return AccessTokenResponse(**stored["token"])
         try:
-            access_token = cache[cache_key]
-            logger.debug('from cache')
-        except KeyError:
-            account_credentails = AmazonAccountCredentails.objects.get(
-                refresh_token=self.cred.refresh_token)
-
-            request_url = self.scheme + self.host + self.path
-            access_token = self._request(request_url, self.data, self.headers)
-
-            #
-
-            account_credentails.access_token = access_token.get("access_token")
-            account_credentails.refresh_token = access_token.get("refresh_token")
-            account_credentails.expires_at = timezone.now() + timedelta(seconds=access_token.get("expires_in"))
-            account_credentails.save()
-            #
-
-            logger.debug('token refreshed')
-            cache = TTLCache(maxsize=10, ttl=3600)
-            cache[cache_key] = access_token
-
-#
-        # access_token = {}
-        # account_credentails = AmazonAccountCredentails.objects.get(
-        #     refresh_token=self.cred.refresh_token)
-        # access_token["access_token"] = account_credentails.access_token
-        # access_token["refresh_token"] = account_credentails.refresh_token
-        # access_token["expires_in"] = 3600
-        # access_token["token_type"] = "bearer"
-        # logger.debug('access_token from db')
-        # expires_time = account_credentails.expires_at.replace(tzinfo=utc)
-        # if expires_time < datetime.now(tz=utc):
-        #     request_url = self.scheme + self.host + self.path
-        #     access_token = self._request(request_url, self.data, self.headers)
-        #     account_credentails.access_token = access_token.get("access_token")
-        #     account_credentails.refresh_token = access_token.get("refresh_token")
-        #     account_credentails.expires_at = datetime.now() + timedelta(seconds=access_token.get("expires_in"))
-        #     account_credentails.save()
-        #     logger.debug('token refreshed')
-        return AccessTokenResponse(**access_token)
+            stored = cache.get(token_key)
+            if self._is_fresh(stored):
+                return AccessTokenResponse(**stored["token"])
+            return AccessTokenResponse(**self._refresh(token_key))
+        finally:
+            if cache.get(lock_key) == owner:
+                cache.delete(lock_key)
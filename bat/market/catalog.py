@@ -0,0 +1,215 @@
+"""Enrichment of amazon products with catalog attributes shared by asin."""
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from sp_api.base import Marketplaces
+
+from bat.market.amazon_sp_api.amazon_sp_api import Catalog
+from bat.market.constants import MARKETPLACE_CODES
+from bat.market.models import AmazonAccounts, AmazonProduct
+
+logger = logging.getLogger(__name__)
+
+# catalog attributes rarely change, every asin is fetched once a week at most
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+CATALOG_CONCURRENCY = 4
+# getCatalogItem requests per second of all workers in a region
+CATALOG_RATE_PER_SECOND = 2
+CATALOG_BATCH_SIZE = 500
+
+
+def get_catalog_cache_key(marketplace_id, asin):
+    return "catalog_item_{0}_{1}".format(marketplace_id, asin)
+
+
+def wait_for_rate_limit(name, rate):
+    """
+    block until a request is allowed by the per second window of name,
+    the window is counted in the cache so it is shared by all workers.
+    """
+    while True:
+        now = time.time()
+        key = "sp_api_rate_{0}_{1}".format(name, int(now))
+        cache.add(key, 0, 2)
+        try:
+            count = cache.incr(key)
+        except ValueError:
+            count = 1
+        if count <= rate:
+            return
+        time.sleep(1 - (now % 1))
+
+
+def parse_catalog_item(payload):
+    """
+    return product attributes from a getCatalogItem payload
+    """
+    attribute_sets = payload.get("AttributeSets") or [{}]
+    attributes = attribute_sets[0]
+    image = attributes.get("SmallImage") or {}
+    return {
+        "title": attributes.get("Title", ""),
+        "type": attributes.get("ProductTypeName", ""),
+        "bullet_points": "\n".join(attributes.get("Feature") or []),
+        "image_url": image.get("URL", ""),
+    }
+
+
+def get_credentials(credentails):
+    return {
+        "refresh_token": credentails.refresh_token,
+        "lwa_app_id": settings.LWA_CLIENT_ID,
+        "lwa_client_secret": settings.LWA_CLIENT_SECRET,
+        "aws_access_key": settings.SP_AWS_ACCESS_KEY_ID,
+        "aws_secret_key": settings.SP_AWS_SECRET_ACCESS_KEY,
+        "role_arn": settings.ROLE_ARN,
+    }
+
+
+def get_catalog_fetcher(marketplace, credentails):
+    """
+    return a function fetching the catalog payload of an asin. With
+    AMAZON_CATALOG_FIXTURES_DIR set, recorded <asin>.json payloads are read
+    instead of calling the api.
+    """
+    fixtures_dir = settings.AMAZON_CATALOG_FIXTURES_DIR
+    if fixtures_dir:
+
+        def _fetch_fixture(asin):
+            path = os.path.join(fixtures_dir, asin + ".json")
+            if not os.path.exists(path):
+                return None
+            with open(path) as fixture:
+                return json.load(fixture)
+
+        return _fetch_fixture
+
+    client = Catalog(
+        marketplace=Marketplaces[MARKETPLACE_CODES.get(marketplace.marketplaceId)],
+        refresh_token=credentails.refresh_token,
+        credentials=get_credentials(credentails),
+    )
+
+    def _fetch(asin):
+        wait_for_rate_limit(
+            "catalog_" + marketplace.region, CATALOG_RATE_PER_SECOND
+        )
+        return client.get_item(asin, MarketplaceId=marketplace.marketplaceId).payload
+
+    return _fetch
+
+
+def get_catalog_items(marketplace, asins, fetch):
+    """
+    return {asin: attributes} of the asins, cached ones are read with one
+    cache call and the others fetched in parallel threads. Unknown asins are
+    cached as empty attributes so they aren't fetched again before the TTL.
+    """
+    keys = {asin: get_catalog_cache_key(marketplace.marketplaceId, asin) for asin in asins}
+    cached = cache.get_many(keys.values())
+    items = {asin: cached[key] for asin, key in keys.items() if key in cached}
+    missing = [asin for asin in keys if asin not in items]
+
+    def _fetch(asin):
+        try:
+            payload = fetch(asin)
+        except Exception:
+            # retried on the next run
+            logger.exception("catalog item %s not fetched", asin)
+            return asin, None
+        return asin, parse_catalog_item(payload) if payload else {}
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=CATALOG_CONCURRENCY) as pool:
+            fetched = {
+                asin: attributes
+                for asin, attributes in pool.map(_fetch, missing)
+                if attributes is not None
+            }
+        cache.set_many(
+            {keys[asin]: attributes for asin, attributes in fetched.items()},
+            CATALOG_CACHE_TIMEOUT,
+        )
+        items.update(fetched)
+    return items
+
+
+def get_asins_to_enrich():
+    """
+    return {marketplace id: (marketplace, credentails, asins)} of products
+    without type or bullet points, every asin once per marketplace however
+    many accounts sell it.
+    """
+    credentails = {}
+    for account in AmazonAccounts.objects.filter(
+        credentails__isnull=False
+    ).select_related("marketplace", "credentails"):
+        credentails.setdefault(
+            account.marketplace.marketplaceId,
+            (account.marketplace, account.credentails),
+        )
+    pending = {}
+    for marketplace_id, asin in (
+        AmazonProduct.objects.filter(
+            amazonaccounts__marketplace__marketplaceId__in=credentails.keys(),
+            type="",
+            bullet_points="",
+        )
+        .exclude(asin="")
+        .values_list("amazonaccounts__marketplace__marketplaceId", "asin")
+        .distinct()
+    ):
+        pending.setdefault(marketplace_id, set()).add(asin)
+    return {
+        marketplace_id: credentails[marketplace_id] + (sorted(asins),)
+        for marketplace_id, asins in pending.items()
+    }
+
+
+def apply_catalog_items(marketplace, items):
+    """
+    fill empty type, bullet points and image url of the products of the
+    marketplace from catalog attributes. return number of updated products.
+    """
+    products = list(
+        AmazonProduct.objects.filter(
+            amazonaccounts__marketplace=marketplace,
+            asin__in=[asin for asin, attributes in items.items() if attributes],
+            type="",
+            bullet_points="",
+        )
+    )
+    for product in products:
+        attributes = items[product.asin]
+        product.type = attributes["type"][:200]
+        product.bullet_points = attributes["bullet_points"]
+        if attributes["image_url"]:
+            product.extra_data = dict(
+                product.extra_data or {}, image_url=attributes["image_url"]
+            )
+    with transaction.atomic():
+        AmazonProduct.objects.bulk_update(
+            products, ["type", "bullet_points", "extra_data"], batch_size=CATALOG_BATCH_SIZE
+        )
+    return len(products)
+
+
+def enrich_catalog(batch_size=CATALOG_BATCH_SIZE):
+    """
+    fetch catalog attributes of all products missing them, return number
+    of updated products by marketplace id.
+    """
+    updated = {}
+    for marketplace_id, (marketplace, credentails, asins) in get_asins_to_enrich().items():
+        fetch = get_catalog_fetcher(marketplace, credentails)
+        updated[marketplace_id] = 0
+        for start in range(0, len(asins), batch_size):
+            items = get_catalog_items(marketplace, asins[start:start + batch_size], fetch)
+            updated[marketplace_id] += apply_catalog_items(marketplace, items)
+    return updated
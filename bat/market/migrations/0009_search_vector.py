@@ -0,0 +1,99 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+PRODUCT_VECTOR_SQL = """
+    setweight(to_tsvector('simple', coalesce({row}.title, '') || ' ' || coalesce({row}.sku, '') || ' ' || coalesce({row}.asin, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce({row}.ean, '') || ' ' || coalesce({row}.type, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce({row}.bullet_points, '')), 'C') ||
+    setweight(to_tsvector('simple', coalesce({row}.description, '')), 'D')
+"""
+
+ORDER_VECTOR_SQL = """
+    setweight(to_tsvector('simple', coalesce({row}.order_id, '') || ' ' || coalesce({row}.order_seller_id, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce({row}.buyer_email, '') || ' ' || coalesce({row}.sales_channel, '')), 'B')
+"""
+
+TRIGGER_SQL = """
+CREATE FUNCTION {table}_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := {vector};
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER {table}_search_vector_trigger
+BEFORE INSERT OR UPDATE OF {columns}
+ON {table} FOR EACH ROW EXECUTE PROCEDURE {table}_search_vector_update();
+
+UPDATE {table} SET search_vector = {backfill};
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS {table}_search_vector_trigger ON {table};
+DROP FUNCTION IF EXISTS {table}_search_vector_update();
+"""
+
+
+def trigger_sql(table, vector_sql, columns):
+    return migrations.RunSQL(
+        TRIGGER_SQL.format(
+            table=table,
+            columns=", ".join(columns),
+            vector=vector_sql.format(row="NEW"),
+            backfill=vector_sql.format(row=table),
+        ),
+        DROP_TRIGGER_SQL.format(table=table),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0008_amazonmarketplace_sales_channel_name'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='amazonproduct',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='amazonorder',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='amazonproduct',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='amazonproduct_search_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='amazonproduct',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='amazonproduct_title_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='amazonproduct',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['sku'], name='amazonproduct_sku_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='amazonorder',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='amazonorder_search_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='amazonorder',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['order_id'], name='amazonorder_order_id_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        trigger_sql(
+            "market_amazonproduct",
+            PRODUCT_VECTOR_SQL,
+            ["title", "sku", "asin", "ean", "type", "bullet_points", "description"],
+        ),
+        trigger_sql(
+            "market_amazonorder",
+            ORDER_VECTOR_SQL,
+            ["order_id", "order_seller_id", "buyer_email", "sales_channel"],
+        ),
+    ]
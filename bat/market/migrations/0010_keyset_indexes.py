@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0009_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='amazonproduct',
+            index=models.Index(fields=['-create_date', '-id'], name='amazonproduct_create_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='amazonorder',
+            index=models.Index(fields=['-create_date', '-id'], name='amazonorder_create_id_idx'),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0010_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='amazonaccountcredentails',
+            name='refresh_token',
+            field=models.CharField(db_index=True, max_length=512, null=True),
+        ),
+    ]
@@ -4,6 +4,8 @@ import uuid
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.fields import GenericRelation
 from django.contrib.postgres.fields import HStoreField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models, transaction
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
@@ -11,7 +13,9 @@ from django_countries.fields import CountryField
 from djmoney.models.fields import MoneyField
 from taggit.managers import TaggableManager
 
+from bat.company.ledger import record_amazon_order_items
 from bat.company.models import Company
+from bat.globalutils.digest import get_row_digest
 from bat.market.constants import AMAZON_REGIONS_CHOICES, EUROPE
 from bat.product.models import Image, IsDeletableMixin, UniqueWithinCompanyMixin
 from bat.setting.models import Status
@@ -77,7 +81,7 @@ class AmazonAccountCredentails(models.Model):
     spapi_oauth_code = models.CharField(max_length=512, null=True)
     access_token = models.CharField(max_length=512, null=True)
     expires_at = models.DateTimeField(null=True)
-    refresh_token = models.CharField(max_length=512, null=True)
+    refresh_token = models.CharField(max_length=512, null=True, db_index=True)
     region = models.CharField(
         verbose_name=_("Region"),
         max_length=255,
@@ -105,25 +109,45 @@ class AmazonAccounts(models.Model):
 
 class AmazonProductManager(models.Manager):
     def import_bulk(self, data, amazonaccount, columns):
+        """
+        insert new and update changed products of the account, rows whose
+        digest matches the stored one are skipped. Products are matched by
+        (sku, ean, asin). return inserted, changed and unchanged counts.
+        """
         amazon_product_objects = []
         amazon_product_objects_update = []
 
         amazon_product_map_tuple = AmazonProduct.objects.filter(
             amazonaccounts_id=amazonaccount.id
-        ).values_list("sku", "ean", "asin", "id")
-        amazon_product_map = {k1 + k2 + k3: v for k1, k2, k3, v in amazon_product_map_tuple}
+        ).values_list("sku", "ean", "asin", "id", "digest")
+        amazon_product_map = {
+            (sku, ean, asin): (pk, digest)
+            for sku, ean, asin, pk, digest in amazon_product_map_tuple
+        }
 
+        unchanged = 0
         for row in data:
-            product_id = amazon_product_map.get(
-                row.get("sku") + row.get("ean") + row.get("asin"), None)
+            digest = get_row_digest(row)
+            product_id, old_digest = amazon_product_map.get(
+                (row.get("sku"), row.get("ean"), row.get("asin")), (None, None))
             if product_id:
+                if digest == old_digest:
+                    unchanged += 1
+                    continue
                 amazon_product_objects_update.append(
-                    AmazonProduct(id=product_id, amazonaccounts=amazonaccount, **row))
+                    AmazonProduct(id=product_id, amazonaccounts=amazonaccount, digest=digest, **row))
             else:
-                amazon_product_objects.append(AmazonProduct(**row, amazonaccounts=amazonaccount))
+                amazon_product_objects.append(
+                    AmazonProduct(**row, amazonaccounts=amazonaccount, digest=digest))
         with transaction.atomic():
             AmazonProduct.objects.bulk_create(amazon_product_objects)
-            AmazonProduct.objects.bulk_update(amazon_product_objects_update, columns)
+            AmazonProduct.objects.bulk_update(
+                amazon_product_objects_update, columns + ["digest"])
+        return {
+            "inserted": len(amazon_product_objects),
+            "changed": len(amazon_product_objects_update),
+            "unchanged": unchanged,
+        }
 
 
 class AmazonProduct(UniqueWithinCompanyMixin, IsDeletableMixin, models.Model):
@@ -169,11 +193,39 @@ class AmazonProduct(UniqueWithinCompanyMixin, IsDeletableMixin, models.Model):
         null=True,
         related_name="products",
     )
+    # digest of the last imported report row, see AmazonProductManager
+    digest = models.CharField(max_length=64, blank=True, default="", editable=False)
+    # maintained by a database trigger, see migration 0009
+    search_vector = SearchVectorField(null=True, editable=False)
     create_date = models.DateTimeField(default=timezone.now)
     update_date = models.DateTimeField(default=timezone.now)
 
     objects = AmazonProductManager()
 
+    class Meta:
+        """Meta for the model."""
+
+        indexes = [
+            GinIndex(
+                fields=["search_vector"], name="amazonproduct_search_gin"
+            ),
+            GinIndex(
+                fields=["title"],
+                name="amazonproduct_title_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+            GinIndex(
+                fields=["sku"],
+                name="amazonproduct_sku_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+            # keyset pagination order
+            models.Index(
+                fields=["-create_date", "-id"],
+                name="amazonproduct_create_id_idx",
+            ),
+        ]
+
     # UniqueWithinCompanyMixin data
     unique_within_company = ["sku", "ean", "asin"]
     velidation_within_company_messages = {
@@ -222,41 +274,51 @@ class AmazonOrdersManager(models.Manager):
         amazon_product_map = {k: v for k, v in amazon_products}
 
         amazon_orders = AmazonOrder.objects.filter(
-            amazonaccounts_id=amazonaccount.id).values_list("order_id", "id", "status__name")
+            amazonaccounts_id=amazonaccount.id).values_list("order_id", "id", "status__name", "digest")
 
         amazon_orders_map = {}
-        amazon_orders_old_status_map = {}
-        for order_id, pk, status in amazon_orders:
+        amazon_orders_status_map = {}
+        amazon_orders_digest_map = {}
+        for order_id, pk, status, digest in amazon_orders:
             amazon_orders_map[order_id] = pk
-            amazon_orders_old_status_map[str(pk)] = status
+            amazon_orders_status_map[pk] = status
+            amazon_orders_digest_map[pk] = digest
 
         amazon_order_items = AmazonOrderItem.objects.filter(
             amazonorder__amazonaccounts_id=amazonaccount.id).values_list("amazonorder_id", "item_id", "item_shipment_id", "id")
-        amazon_order_items_map = {str(k1) + str(k2) + str(k3): v for k1,
+        amazon_order_items_map = {(k1, k2, k3): v for k1,
                                   k2, k3, v in amazon_order_items}
 
         amazon_updated_orders_pk = []
+        amazon_orders_old_status_map = {}
         amazon_order_objects = []
         amazon_order_objects_update = []
         amazon_order_item_objects = []
         amazon_order_item_objects_update = []
         amazon_order_items = []
+        unchanged = 0
         for row in data:
-            row_args = row.copy()
-            amazon_order_items += row_args.pop("items", [])
+            digest = get_row_digest(row)
             order_pk = amazon_orders_map.get(row.get("order_id"), None)
+            if order_pk and amazon_orders_digest_map[order_pk] == digest:
+                # order and its items are the same as in the last import
+                unchanged += 1
+                continue
 
+            row_args = row.copy()
+            amazon_order_items += row_args.pop("items", [])
             if order_pk:
                 amazon_order_objects_update.append(
-                    AmazonOrder(id=order_pk, amazonaccounts_id=amazonaccount.id, **row_args))
+                    AmazonOrder(id=order_pk, amazonaccounts_id=amazonaccount.id, digest=digest, **row_args))
                 amazon_updated_orders_pk.append(order_pk)
+                amazon_orders_old_status_map[str(order_pk)] = amazon_orders_status_map[order_pk]
             else:
                 amazon_order_objects.append(AmazonOrder(
-                    amazonaccounts_id=amazonaccount.id, **row_args))
+                    amazonaccounts_id=amazonaccount.id, digest=digest, **row_args))
 
         with transaction.atomic():
             AmazonOrder.objects.bulk_update(
-                amazon_order_objects_update, order_columns+["update_date"])
+                amazon_order_objects_update, order_columns+["update_date", "digest"])
             orders = AmazonOrder.objects.bulk_create(amazon_order_objects)
 
             amazon_new_order_map = {}
@@ -265,6 +327,7 @@ class AmazonOrdersManager(models.Manager):
                 amazon_new_order_map[order.order_id] = order.id
                 amazon_created_orders_pk.append(order.id)
 
+            sold_items = []
             for order_item in amazon_order_items:
                 sku = order_item.pop("sku", "")
                 order_id = order_item.pop("order_id", "")
@@ -273,18 +336,26 @@ class AmazonOrdersManager(models.Manager):
                     order_id, amazon_orders_map.get(order_id))
 
                 item_pk = amazon_order_items_map.get(
-                    str(order_item["amazonorder_id"]) + str(order_item.get("item_id")) + str(order_item.get("item_shipment_id")), None)
+                    (order_item["amazonorder_id"], order_item.get("item_id"), order_item.get("item_shipment_id")), None)
                 if item_pk:
                     amazon_order_item_objects_update.append(
                         AmazonOrderItem(id=item_pk, update_date=timezone.now, **order_item))
                 else:
                     amazon_order_item_objects.append(AmazonOrderItem(**order_item))
+                    sold_items.append(
+                        (order_item.get("asin"), sku, order_item.get("quantity")))
 
             AmazonOrderItem.objects.bulk_update(
                 amazon_order_item_objects_update, item_columns)
             AmazonOrderItem.objects.bulk_create(amazon_order_item_objects)
+            record_amazon_order_items(amazonaccount, sold_items)
 
-        return amazon_created_orders_pk, amazon_updated_orders_pk, amazon_orders_old_status_map
+        counts = {
+            "inserted": len(amazon_created_orders_pk),
+            "changed": len(amazon_updated_orders_pk),
+            "unchanged": unchanged,
+        }
+        return amazon_created_orders_pk, amazon_updated_orders_pk, amazon_orders_old_status_map, counts
 
 
 class AmazonOrder(models.Model):
@@ -348,6 +419,10 @@ class AmazonOrder(models.Model):
         verbose_name="Select Amazon Account",
     )
     extra_data = HStoreField(null=True, blank=True)
+    # digest of the last imported report row with its items, see AmazonOrdersManager
+    digest = models.CharField(max_length=64, blank=True, default="", editable=False)
+    # maintained by a database trigger, see migration 0009
+    search_vector = SearchVectorField(null=True, editable=False)
     create_date = models.DateTimeField(default=timezone.now)
     update_date = models.DateTimeField(default=timezone.now)
 
@@ -357,6 +432,19 @@ class AmazonOrder(models.Model):
         """Meta for the model."""
 
         unique_together = ("amazonaccounts", "order_id")
+        indexes = [
+            GinIndex(fields=["search_vector"], name="amazonorder_search_gin"),
+            GinIndex(
+                fields=["order_id"],
+                name="amazonorder_order_id_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+            # keyset pagination order
+            models.Index(
+                fields=["-create_date", "-id"],
+                name="amazonorder_create_id_idx",
+            ),
+        ]
 
     def __str__(self):
         """Return Value."""
@@ -256,3 +256,16 @@ class ReportAmazonOrdersCSVParser(object):
                         "gift_wrap_price", "item_promotional_discount", "ship_promotional_discount"]
 
         return list(order_items_map.values()), order_columns, item_columns
+
+    @classmethod
+    def parse_by_sales_channel(cls, orders_report_csv, orders_items_report_csv):
+        """
+        parse seller level reports once and split orders by their sales
+        channel, return {sales channel: orders}, order columns, item columns.
+        """
+        data, order_columns, item_columns = cls.parse(
+            orders_report_csv, orders_items_report_csv)
+        batches = {}
+        for values in data:
+            batches.setdefault(values["sales_channel"], []).append(values)
+        return batches, order_columns, item_columns
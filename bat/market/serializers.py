@@ -10,6 +10,7 @@ from bat.serializersFields.serializers_fields import (
     MoneySerializerField,
 )
 from bat.market import constants
+from bat.setting.exchange import CENT
 
 
 class AmazonMarketplaceSerializer(serializers.ModelSerializer):
@@ -73,6 +74,7 @@ class AmazonOrderSerializer(serializers.ModelSerializer):
     fba_fullfilment_amount = MoneySerializerField()
     amazon_comission_amount = MoneySerializerField()
     manufacturing_amount = MoneySerializerField()
+    converted_amount = serializers.SerializerMethodField()
 
     class Meta:
         model = AmazonOrder
@@ -84,5 +86,15 @@ class AmazonOrderSerializer(serializers.ModelSerializer):
                   "gift_wrap_tax", "item_promotional_discount",
                   "ship_promotional_discount", "fba_fullfilment_amount",
                   "amazon_comission_amount", "manufacturing_amount",
-                  "amazonaccounts", "extra_data",
+                  "amazonaccounts", "extra_data", "converted_amount",
                   )
+
+    def get_converted_amount(self, obj):
+        """
+        amount in the currency query parameter, None without the parameter
+        or a rate of the order's currency.
+        """
+        amount = getattr(obj, "converted_amount", None)
+        if amount is None:
+            return None
+        return amount.quantize(CENT)
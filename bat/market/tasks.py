@@ -1,12 +1,14 @@
 """Task that can run by celery will be placed here."""
 import tempfile
 
+from celery import chord
 from celery.utils.log import get_task_logger
 from config.celery import app
 from datetime import datetime, timedelta
 
 from sp_api.base.reportTypes import ReportType
 
+from bat.market.catalog import enrich_catalog
 from bat.market.models import (
     AmazonAccounts,
     AmazonProduct,
@@ -45,7 +47,8 @@ def amazon_account_products_orders_sync(amazonaccount_id, last_no_of_days=1, is_
     # process data for import
     data, columns = ReportAmazonProductCSVParser.parse(report_csv)
     # import formated data
-    AmazonProduct.objects.import_bulk(data, amazonaccount, columns)
+    counts = AmazonProduct.objects.import_bulk(data, amazonaccount, columns)
+    logger.info("amazon products of account {0}: {1}".format(amazonaccount.id, counts))
 
     if is_orders_sync:
         amazon_orders_sync_account.apply_async([amazonaccount.id, last_no_of_days])
@@ -55,14 +58,48 @@ def amazon_account_products_orders_sync(amazonaccount_id, last_no_of_days=1, is_
 def amazon_products_orders_sync(last_no_of_days=1):
     """fetch products data and orders data from amazon account and sync system products and orders data with that."""
     logger.info("amazon_products_sync task")
-    for account in AmazonAccounts.objects.all():
-        amazon_account_products_orders_sync.apply_async([account.id, last_no_of_days])
+    accounts = AmazonAccounts.objects.select_related("marketplace")
+    for amazonaccount_ids in get_seller_account_groups(accounts):
+        # orders of a seller are imported once products of all its accounts are
+        chord([
+            amazon_account_products_orders_sync.si(
+                amazonaccount_id, last_no_of_days, is_orders_sync=False)
+            for amazonaccount_id in amazonaccount_ids
+        ])(amazon_orders_sync_seller.si(amazonaccount_ids, last_no_of_days))
+
+
+def get_seller_account_groups(accounts):
+    """
+    group account ids of the same seller, accounts sharing credentails and
+    region can be synced with one report request.
+    """
+    groups = {}
+    for account in accounts:
+        if account.credentails_id:
+            key = (account.credentails_id, account.marketplace.region)
+        else:
+            key = ("account", account.id)
+        groups.setdefault(key, []).append(account.id)
+    return list(groups.values())
+
+
+def _download_report(amazonaccount, report_type, file_path, start_time, end_time, marketplace_ids):
+    with open(file_path, "w+") as report_file:
+        get_amazon_report(amazonaccount, report_type, report_file,
+                          start_time, end_time, marketplaceIds=marketplace_ids)
 
 
 @app.task
-def amazon_orders_sync_account(amazonaccount_id, last_no_of_days=1):
-    amazonaccount = AmazonAccounts.objects.get(pk=amazonaccount_id)
-    logger.info("celery amazon_orders_sync_account task")
+def amazon_orders_sync_seller(amazonaccount_ids, last_no_of_days=1):
+    """
+    fetch orders and shipments reports once for all marketplaces of a seller
+    and import the orders of every sales channel into its account.
+    """
+    accounts = list(AmazonAccounts.objects.filter(
+        id__in=amazonaccount_ids).select_related("marketplace", "credentails").order_by("id"))
+    if not accounts:
+        return
+    logger.info("celery amazon_orders_sync_seller task " + str(amazonaccount_ids))
 
     # Temporary files
     timestamp = datetime.timestamp(datetime.now())
@@ -70,45 +107,58 @@ def amazon_orders_sync_account(amazonaccount_id, last_no_of_days=1):
     tmp_orders_csv_file_path = tmp_dir.name + "/orders_report" + str(timestamp) + ".csv"
     tmp_items_csv_file_path = tmp_dir.name + "/items_report" + str(timestamp) + ".csv"
 
-    orders_report_file = open(tmp_orders_csv_file_path, "w+")
-    orders_items_report_file = open(tmp_items_csv_file_path, "w+")
-
     start_time = (datetime.utcnow() - timedelta(days=last_no_of_days)).isoformat()
     end_time = (datetime.utcnow()).isoformat()
+    marketplace_ids = list(dict.fromkeys(
+        account.marketplace.marketplaceId for account in accounts))
 
-    # get report data (report api call)
-    get_amazon_report(amazonaccount, ReportType.GET_FLAT_FILE_ALL_ORDERS_DATA_BY_ORDER_DATE_GENERAL,
-                      orders_report_file, start_time, end_time)
-    get_amazon_report(amazonaccount, ReportType.GET_AMAZON_FULFILLED_SHIPMENTS_DATA_GENERAL,
-                      orders_items_report_file, start_time, end_time)
-
-    # read report data from files
-    orders_report_csv = open(tmp_orders_csv_file_path, "r")
-    orders_items_report_csv = open(tmp_items_csv_file_path, "r")
+    # get report data (report api call), one per report for all marketplaces
+    _download_report(accounts[0], ReportType.GET_FLAT_FILE_ALL_ORDERS_DATA_BY_ORDER_DATE_GENERAL,
+                     tmp_orders_csv_file_path, start_time, end_time, marketplace_ids)
+    _download_report(accounts[0], ReportType.GET_AMAZON_FULFILLED_SHIPMENTS_DATA_GENERAL,
+                     tmp_items_csv_file_path, start_time, end_time, marketplace_ids)
 
     # process data for import
-    data, order_columns, item_columns = ReportAmazonOrdersCSVParser.parse(
-        orders_report_csv, orders_items_report_csv, amazonaccount)
+    with open(tmp_orders_csv_file_path, "r") as orders_report_csv, \
+            open(tmp_items_csv_file_path, "r") as orders_items_report_csv:
+        batches, order_columns, item_columns = ReportAmazonOrdersCSVParser.parse_by_sales_channel(
+            orders_report_csv, orders_items_report_csv)
+    tmp_dir.cleanup()
+
+    for amazonaccount in accounts:
+        data = batches.get(amazonaccount.marketplace.sales_channel_name, [])
+
+        # import formated data
+        (
+            amazon_created_orders_pk,
+            amazon_updated_orders_pk,
+            amazon_orders_old_status_map,
+            counts,
+        ) = AmazonOrder.objects.import_bulk(data, amazonaccount, order_columns, item_columns)
+        logger.info("amazon orders of account {0}: {1}".format(amazonaccount.id, counts))
+
+        # auto campaign
+        if last_no_of_days == 1:
+            email_queue_create_for_orders.delay(
+                amazonaccount.id, amazon_created_orders_pk, amazon_updated_orders_pk, amazon_orders_old_status_map)
+        else:
+            email_queue_create_for_initial_orders.delay(
+                amazonaccount.id, amazon_created_orders_pk)
 
-    # import formated data
-    amazon_created_orders_pk, amazon_updated_orders_pk, amazon_orders_old_status_map = AmazonOrder.objects.import_bulk(
-        data, amazonaccount, order_columns, item_columns)
 
-    # auto campaign
-    if last_no_of_days == 1:
-        email_queue_create_for_orders.delay(
-            amazonaccount_id, amazon_created_orders_pk, amazon_updated_orders_pk, amazon_orders_old_status_map)
-    else:
-        email_queue_create_for_initial_orders.delay(
-            amazonaccount_id, amazon_created_orders_pk)
+@app.task
+def amazon_orders_sync_account(amazonaccount_id, last_no_of_days=1):
+    logger.info("celery amazon_orders_sync_account task")
+    amazon_orders_sync_seller([amazonaccount_id], last_no_of_days)
 
 
 @app.task
 def amazon_orders_sync():
     """fetch orders data from amazon account and sync system orders data with that."""
     logger.info("amazon_orders_sync task")
-    for account in AmazonAccounts.objects.all():
-        amazon_orders_sync_account.apply_async([account.id])
+    accounts = AmazonAccounts.objects.select_related("marketplace")
+    for amazonaccount_ids in get_seller_account_groups(accounts):
+        amazon_orders_sync_seller.apply_async([amazonaccount_ids])
 
 
 @app.task
@@ -118,3 +168,10 @@ def amazon_products_sync():
     for account in AmazonAccounts.objects.all():
         amazon_account_products_orders_sync.apply_async(
             [account.id], kwargs={"is_orders_sync": False})
+
+
+@app.task
+def amazon_catalog_enrich():
+    """fill missing product type, bullet points and image of amazon products from the catalog api."""
+    updated = enrich_catalog()
+    logger.info("amazon catalog enrichment updated products " + str(updated))
@@ -1,3 +1,32 @@
-from django.test import TestCase
+import os
+from types import SimpleNamespace
 
-# Create your tests here.
+from django.core.cache import cache
+
+from bat.market.catalog import get_catalog_fetcher, get_catalog_items
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "catalog")
+
+
+def test_catalog_items_from_fixtures(settings):
+    settings.AMAZON_CATALOG_FIXTURES_DIR = FIXTURES_DIR
+    cache.clear()
+    marketplace = SimpleNamespace(marketplaceId="A1PA6795UKMFR9", region="EU")
+    fetch = get_catalog_fetcher(marketplace, None)
+    fetched = []
+
+    def _counting_fetch(asin):
+        fetched.append(asin)
+        return fetch(asin)
+
+    items = get_catalog_items(marketplace, ["B00TESTAS1", "B00UNKNOWN"], _counting_fetch)
+
+    assert items["B00TESTAS1"]["type"] == "KITCHEN"
+    assert items["B00TESTAS1"]["bullet_points"] == (
+        "Set of 3 boards in different sizes\nMade of organic bamboo"
+    )
+    assert items["B00UNKNOWN"] == {}
+
+    # every asin is fetched once, later lookups are served from the cache
+    get_catalog_items(marketplace, ["B00TESTAS1", "B00UNKNOWN"], _counting_fetch)
+    assert sorted(fetched) == ["B00TESTAS1", "B00UNKNOWN"]
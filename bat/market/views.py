@@ -2,6 +2,7 @@ import csv
 import time
 import base64
 from datetime import datetime, timedelta
+from decimal import Decimal
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -10,7 +11,9 @@ from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.views import View
 from django_filters.rest_framework import DjangoFilterBackend
+from djmoney import settings as money_settings
 from rest_framework import status, viewsets
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -18,7 +21,10 @@ from sp_api.base import Marketplaces
 from sp_api.base.reportTypes import ReportType
 
 from bat.company.models import Company
+from config.celery import PRIORITY_USER
 from bat.company.utils import get_member
+from bat.globalutils.pagination import KeysetPagination
+from bat.globalutils.search import FullTextSearchFilter
 from bat.market import serializers
 from bat.market.amazon_sp_api.amazon_sp_api import Catalog, Reports, Orders
 from bat.market.models import (
@@ -32,6 +38,7 @@ from bat.market.utils import AmazonAPI, generate_uri, set_default_email_campaign
 from bat.market.report_parser import ReportAmazonProductCSVParser, ReportAmazonOrdersCSVParser
 from bat.market.orders_data_builder import AmazonOrderProcessData
 from bat.market.tasks import amazon_account_products_orders_sync
+from bat.setting.exchange import get_converted_expression, sum_converted
 from bat.company.utils import get_member
 
 # from sp_api.api.reports.reports import Reports
@@ -43,32 +50,90 @@ class AmazonProductViewsets(viewsets.ReadOnlyModelViewSet):
     queryset = AmazonProduct.objects.all()
     permission_classes = (IsAuthenticated,)
     serializer_class = serializers.AmazonProductSerializer
+    pagination_class = KeysetPagination
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
+    search_fields = ["title", "sku", "asin", "ean"]
+    search_trigram_fields = ["title", "sku"]
 
     def filter_queryset(self, queryset):
         company_id = self.kwargs.get("company_pk", None)
         _member = get_member(
             company_id=company_id, user_id=self.request.user.id
         )
-        queryset = super().filter_queryset(queryset)
-        return queryset.filter(
+        queryset = queryset.filter(
             amazonaccounts__company__id=company_id
-        ).order_by("-create_date")
+        ).order_by("-create_date", "-id")
+        # search orders by rank, so filter backends run after the default order
+        return super().filter_queryset(queryset)
 
 
 class AmazonOrderViewsets(viewsets.ReadOnlyModelViewSet):
     queryset = AmazonOrder.objects.all()
     permission_classes = (IsAuthenticated,)
     serializer_class = serializers.AmazonOrderSerializer
+    pagination_class = KeysetPagination
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
+    search_fields = ["order_id", "buyer_email"]
+    search_trigram_fields = ["order_id"]
 
     def filter_queryset(self, queryset):
         company_id = self.kwargs.get("company_pk", None)
         _member = get_member(
             company_id=company_id, user_id=self.request.user.id
         )
-        queryset = super().filter_queryset(queryset)
-        return queryset.filter(
+        queryset = queryset.filter(
             amazonaccounts__company__id=company_id
-        ).order_by("-create_date")
+        ).order_by("-create_date", "-id")
+        # search orders by rank, so filter backends run after the default order
+        return super().filter_queryset(queryset)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        currency = self.request.GET.get("currency", None)
+        if currency and self.action in ("list", "retrieve"):
+            # amount of each order in the currency, converted in SQL
+            queryset = queryset.annotate(
+                converted_amount=get_converted_expression(
+                    "amount", "purchase_date", currency.upper()
+                )
+            )
+        return queryset
+
+    @action(detail=False, methods=["get"])
+    def summary(self, request, company_pk=None):
+        """
+        return sales of the filtered orders by marketplace in the company
+        currency, or in the currency query parameter.
+        """
+        currency = request.GET.get("currency", None)
+        if currency:
+            currency = currency.upper()
+        else:
+            company = get_object_or_404(Company, pk=company_pk)
+            currency = company.currency or money_settings.BASE_CURRENCY
+        queryset = self.filter_queryset(self.get_queryset())
+        # orders of currencies without a rate are left out of the totals
+        missing_rates = set()
+        totals = sum_converted(
+            queryset,
+            "amount",
+            "purchase_date",
+            currency,
+            key="amazonaccounts__marketplace_id",
+            missing=missing_rates,
+        )
+        return Response(
+            {
+                "currency": currency,
+                "missing_rates": sorted(missing_rates),
+                "total_sales": sum(totals.values(), Decimal("0.00")),
+                "marketplaces": [
+                    {"marketplace": marketplace_id, "total_sales": total}
+                    for marketplace_id, total in sorted(totals.items())
+                ],
+            },
+            status=status.HTTP_200_OK,
+        )
 
 
 class AmazonMarketplaceViewsets(viewsets.ReadOnlyModelViewSet):
@@ -197,7 +262,12 @@ class AccountsReceiveAmazonCallback(View):
                         settings.MARKET_LIST_URI + "auto-emails/"+str(company.id)+"/campaigns?error=" + e
                     )
                 # call task to collect data from amazon account
-                amazon_account_products_orders_sync.delay(new_account.id, last_no_of_days=8)
+                # ahead of scheduled syncs, the user waits for the first data
+                amazon_account_products_orders_sync.apply_async(
+                    [new_account.id],
+                    kwargs={"last_no_of_days": 8},
+                    priority=PRIORITY_USER,
+                )
                 return HttpResponseRedirect(
                     settings.MARKET_LIST_URI + "auto-emails/"+str(company.id)+"/campaigns?success=Your " +
                     marketplace.name + " marketplace account successfully linked."
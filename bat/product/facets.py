@@ -0,0 +1,157 @@
+"""Catalog facets of products computed with a fixed number of queries."""
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, F, Q
+from django.db.models.expressions import Window
+from django.db.models.functions import RowNumber
+
+from bat.product.models import Image, Product
+
+FACETS_CACHE_TIMEOUT = 60 * 60
+GALLERY_IMAGES_PER_TYPE = 3
+
+
+def get_facets_cache_key(company_id, name):
+    return "product_facets_{0}_{1}".format(company_id, name)
+
+
+def invalidate_facets(company_id):
+    """
+    remove cached facets of the company once the current transaction commits
+    """
+
+    def _delete():
+        cache.delete_many(
+            [
+                get_facets_cache_key(company_id, "tags_types"),
+                get_facets_cache_key(company_id, "types_gallery"),
+            ]
+        )
+
+    transaction.on_commit(_delete)
+
+
+def _base_queryset(queryset):
+    """
+    return a plain product queryset for the given (maybe filtered) queryset
+    so joins added by filters don't duplicate rows in aggregates.
+    """
+    return Product.objects.filter(pk__in=queryset.order_by().values("pk"))
+
+
+def compute_tags_and_types(queryset):
+    """
+    return distinct tags, types, series and hscodes in one query
+    """
+    data = _base_queryset(queryset).aggregate(
+        tag_data=ArrayAgg(
+            "tags__name",
+            distinct=True,
+            filter=Q(tags__isnull=False),
+            ordering="tags__name",
+        ),
+        type_data=ArrayAgg(
+            "type", distinct=True, filter=~Q(type=""), ordering="type"
+        ),
+        series_data=ArrayAgg(
+            "series", distinct=True, filter=~Q(series=""), ordering="series"
+        ),
+        hscode_data=ArrayAgg(
+            "hscode", distinct=True, filter=~Q(hscode=""), ordering="hscode"
+        ),
+    )
+    return {key: value or [] for key, value in data.items()}
+
+
+def compute_types_gallery(queryset):
+    """
+    return product count and top image names for every product type.
+
+    one query for counts and one window function query for the images.
+    """
+    base = _base_queryset(queryset).exclude(type="")
+    counts = (
+        base.values("type")
+        .annotate(total=Count("id"))
+        .order_by("type")
+        .values_list("type", "total")
+    )
+    gallery = {
+        product_type: {"type": product_type, "total": total, "images": []}
+        for product_type, total in counts
+    }
+    if not gallery:
+        return []
+
+    ranked = (
+        base.filter(images__isnull=False, images__is_active=True)
+        .annotate(
+            image_name=F("images__image"),
+            image_rank=Window(
+                expression=RowNumber(),
+                partition_by=[F("type")],
+                order_by=[
+                    F("images__main_image").desc(),
+                    F("images__id").asc(),
+                ],
+            ),
+        )
+        .order_by()
+        .values("type", "image_name", "image_rank")
+    )
+    sql, params = ranked.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT type, image_name FROM ({0}) AS ranked "
+            "WHERE image_rank <= %s ORDER BY type, image_rank".format(sql),
+            [*params, GALLERY_IMAGES_PER_TYPE],
+        )
+        for product_type, image_name in cursor.fetchall():
+            if product_type in gallery and image_name:
+                gallery[product_type]["images"].append(image_name)
+    return list(gallery.values())
+
+
+def get_tags_and_types(company_id, queryset, use_cache=True):
+    """
+    return tags and types facets, cached per company for unfiltered queries
+    """
+    if not use_cache:
+        return compute_tags_and_types(queryset)
+    key = get_facets_cache_key(company_id, "tags_types")
+    data = cache.get(key)
+    if data is None:
+        data = compute_tags_and_types(queryset)
+        cache.set(key, data, FACETS_CACHE_TIMEOUT)
+    return data
+
+
+def get_types_gallery(company_id, queryset, request, use_cache=True):
+    """
+    return product types with their count and absolute image urls.
+
+    Image names are cached, urls are built per request as storage urls
+    may be signed or depend on the host.
+    """
+    if use_cache:
+        key = get_facets_cache_key(company_id, "types_gallery")
+        gallery = cache.get(key)
+        if gallery is None:
+            gallery = compute_types_gallery(queryset)
+            cache.set(key, gallery, FACETS_CACHE_TIMEOUT)
+    else:
+        gallery = compute_types_gallery(queryset)
+
+    storage = Image._meta.get_field("image").storage
+    return [
+        {
+            "type": item["type"],
+            "total": item["total"],
+            "products": [
+                request.build_absolute_uri(storage.url(name))
+                for name in item["images"]
+            ],
+        }
+        for item in gallery
+    ]
@@ -3,6 +3,7 @@ from rest_framework import serializers
 
 from bat.product.models import Image
 from bat.company.serializers import CompanySerializer
+from bat.serializersFields.serializers_fields import ThumbnailUrlsField
 
 
 class ImageListSerializer(serializers.ListSerializer):
@@ -21,9 +22,12 @@ class ImageSerializer(serializers.ModelSerializer):
     """
     Serializer to support list of Image objects.
     """
+    thumbnail_urls = ThumbnailUrlsField()
+
     class Meta:
         model = Image
         fields = ("id", "image", "content_type",
-                  "object_id", "main_image", "is_active", "company")
-        read_only_fields = ("id", "is_active",)
+                  "object_id", "main_image", "is_active", "company",
+                  "is_processed", "thumbnail_urls")
+        read_only_fields = ("id", "is_active", "is_processed",)
         list_serializer_class = ImageListSerializer
@@ -0,0 +1,107 @@
+"""Compare full text search with the icontains based SearchFilter."""
+import statistics
+import time
+from functools import reduce
+from operator import or_
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from bat.globalutils.search import search_queryset
+from bat.market.models import AmazonOrder, AmazonProduct
+from bat.product.models import Product
+
+# model, company lookup, SearchFilter fields, trigram fields
+SEARCH_TARGETS = {
+    "product": (
+        Product,
+        "company_id",
+        [
+            "title",
+            "type",
+            "series",
+            "hscode",
+            "sku",
+            "bullet_points",
+            "description",
+        ],
+        ["title", "sku"],
+    ),
+    "amazonproduct": (
+        AmazonProduct,
+        "amazonaccounts__company_id",
+        ["title", "sku", "asin", "ean"],
+        ["title", "sku"],
+    ),
+    "amazonorder": (
+        AmazonOrder,
+        "amazonaccounts__company_id",
+        ["order_id", "buyer_email"],
+        ["order_id"],
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Time a page of search results with the icontains SearchFilter "
+        "and with the search_vector/trigram backend on existing data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model", choices=sorted(SEARCH_TARGETS), default="product"
+        )
+        parser.add_argument("--company", type=int, default=None)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--page-size", type=int, default=50)
+        parser.add_argument("terms", nargs="+")
+
+    def handle(self, *args, **options):
+        model, company_lookup, search_fields, trigram_fields = SEARCH_TARGETS[
+            options["model"]
+        ]
+        queryset = model.objects.all()
+        if options["company"]:
+            queryset = queryset.filter(**{company_lookup: options["company"]})
+        if not queryset.exists():
+            raise CommandError("No rows to search.")
+
+        self.stdout.write(
+            "{0} rows: {1}".format(model.__name__, queryset.count())
+        )
+        for term in options["terms"]:
+            icontains = queryset.filter(
+                reduce(
+                    or_,
+                    [Q(**{field + "__icontains": term}) for field in search_fields],
+                )
+            ).order_by("-pk")
+            fulltext = search_queryset(
+                queryset, term, trigram_fields
+            ).order_by("-search_rank", "-pk")
+            for name, qs in (("icontains", icontains), ("fulltext", fulltext)):
+                timings, count = self.time_queryset(
+                    qs, options["page_size"], options["repeat"]
+                )
+                self.stdout.write(
+                    "{0:<12} {1:<10} matches={2:<8} median={3:.1f}ms "
+                    "max={4:.1f}ms".format(
+                        term,
+                        name,
+                        count,
+                        statistics.median(timings),
+                        max(timings),
+                    )
+                )
+
+    def time_queryset(self, queryset, page_size, repeat):
+        """Return per run timings in ms of count + first page, and the count."""
+        timings = []
+        count = 0
+        for _i in range(repeat):
+            start = time.perf_counter()
+            count = queryset.count()
+            list(queryset[:page_size])
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings, count
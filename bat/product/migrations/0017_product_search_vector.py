@@ -0,0 +1,63 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('simple', coalesce({row}.title, '') || ' ' || coalesce({row}.sku, '') || ' ' || coalesce({row}.model_number, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce({row}.type, '') || ' ' || coalesce({row}.series, '') || ' ' || coalesce({row}.hscode, '') || ' ' || coalesce({row}.ean, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce({row}.bullet_points, '')), 'C') ||
+    setweight(to_tsvector('simple', coalesce({row}.description, '')), 'D')
+"""
+
+CREATE_TRIGGER_SQL = """
+CREATE FUNCTION product_product_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := {vector};
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER product_product_search_vector_trigger
+BEFORE INSERT OR UPDATE OF title, sku, model_number, type, series, hscode, ean, bullet_points, description
+ON product_product FOR EACH ROW EXECUTE PROCEDURE product_product_search_vector_update();
+
+UPDATE product_product SET search_vector = {backfill};
+""".format(
+    vector=SEARCH_VECTOR_SQL.format(row="NEW"),
+    backfill=SEARCH_VECTOR_SQL.format(row="product_product"),
+)
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS product_product_search_vector_trigger ON product_product;
+DROP FUNCTION IF EXISTS product_product_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0016_merge_20210202_0811'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='product_search_vector_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='product_title_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['sku'], name='product_sku_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER_SQL, DROP_TRIGGER_SQL),
+    ]
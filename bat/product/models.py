@@ -5,6 +5,8 @@ import json
 from decimal import Decimal
 
 
+from bat.globalutils.cascade import cascade_is_active
+from bat.globalutils.storage import delete_files
 from bat.setting.utils import get_status
 from bat.setting.models import Status
 from bat.product.constants import *
@@ -24,6 +26,8 @@ from django.utils.text import slugify
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
 from django.db import models, transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
 
 
 from django.contrib.contenttypes.fields import (
@@ -32,6 +36,8 @@ from django.contrib.contenttypes.fields import (
 )
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.postgres.fields import HStoreField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 
 
 STATUS_DRAFT = 4
@@ -183,6 +189,62 @@ class UniqueWithinCompanyMixin:
         if errors:
             raise ValidationError(errors)
 
+    @classmethod
+    def clean_bulk(cls, instances):
+        """
+        Validate unique within company fields of many new instances at once.
+
+        Existing values are fetched with a single query, values repeated
+        inside the given instances are reported as well.
+        """
+        if not instances:
+            return
+        company = instances[0].get_company
+        company_path = instances[0].get_company_path
+        attnames = {
+            field_name: cls._meta.get_field(field_name).attname
+            for field_name in cls.unique_within_company
+        }
+        lookups = Q()
+        for field_name, attname in attnames.items():
+            values = {
+                getattr(instance, attname)
+                for instance in instances
+                if getattr(instance, attname)
+            }
+            if values:
+                lookups |= Q(**{field_name + "__in": values})
+
+        existing = {field_name: set() for field_name in attnames}
+        if lookups:
+            rows = (
+                cls.objects.filter(lookups)
+                .filter(**{company_path: company})
+                .values_list(*attnames.values())
+            )
+            for row in rows:
+                for field_name, value in zip(attnames, row):
+                    existing[field_name].add(value)
+
+        errors = []
+        for instance in instances:
+            for field_name, attname in attnames.items():
+                lookup_value = getattr(instance, attname)
+                if not lookup_value:
+                    continue
+                if lookup_value in existing[field_name]:
+                    errors.append(
+                        {
+                            field_name: cls.velidation_within_company_messages.get(
+                                field_name, None
+                            )
+                        }
+                    )
+                existing[field_name].add(lookup_value)
+            errors.extend(instance.extra_clean())
+        if errors:
+            raise ValidationError(errors)
+
 
 def image_name(instance, filename):
     """Change name of image."""
@@ -196,6 +258,47 @@ def image_name(instance, filename):
     )
 
 
+def get_or_create_tags(names):
+    """
+    return {lower case name: Tag} for the given tag names.
+
+    Tags are matched case insensitively (TAGGIT_CASE_INSENSITIVE) and
+    missing ones are created in bulk.
+    """
+    lower_names = {}
+    for name in names:
+        lower_names.setdefault(name.lower(), name)
+    if not lower_names:
+        return {}
+
+    def _fetch():
+        return {
+            tag.name.lower(): tag
+            for tag in Tag.objects.annotate(lower_name=Lower("name")).filter(
+                lower_name__in=list(lower_names)
+            )
+        }
+
+    tags_map = _fetch()
+    missing = [
+        name for lower, name in lower_names.items() if lower not in tags_map
+    ]
+    if missing:
+        Tag.objects.bulk_create(
+            [
+                Tag(name=name, slug=slugify(name, allow_unicode=True))
+                for name in missing
+            ],
+            ignore_conflicts=True,
+        )
+        tags_map = _fetch()
+        # slug clashes are skipped by the bulk insert, let taggit pick a slug
+        for lower, name in lower_names.items():
+            if lower not in tags_map:
+                tags_map[lower] = Tag.objects.create(name=name)
+    return tags_map
+
+
 class Image(models.Model):
     """
     This table will store images that stored in AWS.
@@ -209,12 +312,24 @@ class Image(models.Model):
     object_id = models.PositiveIntegerField()
     content_object = GenericForeignKey("content_type", "object_id")
     main_image = models.BooleanField(default=False)
+    # {size: {format: storage name}}, generated by bat.product.tasks
+    thumbnails = models.JSONField(default=dict, blank=True)
+    is_processed = models.BooleanField(default=True)
     is_active = models.BooleanField(default=True)
     create_date = models.DateTimeField(default=timezone.now)
     update_date = models.DateTimeField(default=timezone.now)
 
+    def get_file_names(self):
+        """
+        return storage names of the original and thumbnails
+        """
+        names = [self.image.name] if self.image else []
+        for formats in self.thumbnails.values():
+            names.extend(formats.values())
+        return names
+
     def delete(self, *args, **kwargs):
-        self.image.delete(save=False)  # delete image
+        delete_files(self.image.storage, self.get_file_names())
         super(Image, self).delete(*args, **kwargs)
 
     def archive(self):
@@ -381,12 +496,135 @@ class ProductManager(models.Manager):
             products = Product.objects.filter(id__in=products_id).delete()
         return ids_cant_delete
 
-    def bulk_status_update(self, id_list, status):
+    def create_variations(self, company, variations):
+        """
+        create product variations with their tags and options in bulk.
+
+        variations is a list of product field dicts with optional "tags"
+        (list of tag names) and "product_variation_options" (list of
+        {"productoption": {"name": .., "value": ..}}).
+        """
+        products = []
+        products_tags = []
+        products_options = []
+        for variation in variations:
+            values = variation.copy()
+            products_tags.append(
+                [tag for tag in values.pop("tags", None) or [] if tag]
+            )
+            options = []
+            for variation_option in (
+                values.pop("product_variation_options", None) or []
+            ):
+                option = variation_option.get("productoption", None) or {}
+                name = option.get("name", None)
+                value = option.get("value", None)
+                if name and value:
+                    options.append((name, value))
+            products_options.append(options)
+            products.append(Product(company=company, **values))
+
+        Product.clean_bulk(products)
+
+        with transaction.atomic():
+            products = Product.objects.bulk_create(products)
+
+            # tags
+            tags_map = get_or_create_tags(
+                [tag for tags in products_tags for tag in tags]
+            )
+            ct = ContentType.objects.get_for_model(Product)
+            tag_item_objs = []
+            for product, tags in zip(products, products_tags):
+                tag_ids = {tags_map[tag.lower()].id for tag in tags}
+                for tag_id in tag_ids:
+                    tag_item_objs.append(
+                        TaggedItem(
+                            tag_id=tag_id,
+                            object_id=product.id,
+                            content_type_id=ct.id,
+                        )
+                    )
+            TaggedItem.objects.bulk_create(tag_item_objs)
+
+            # options
+            options_map = ProductOption.objects.get_or_create_bulk(
+                company,
+                [option for options in products_options for option in options],
+            )
+            variation_option_objs = []
+            for product, options in zip(products, products_options):
+                for option in options:
+                    variation_option_objs.append(
+                        ProductVariationOption(
+                            product=product, productoption=options_map[option]
+                        )
+                    )
+            ProductVariationOption.objects.bulk_create(variation_option_objs)
+        return products
+
+    def get_family_ids(self, id_list):
+        """
+        return ids of the given products together with their variations
+        """
+        return list(
+            Product.objects.filter(
+                Q(id__in=id_list) | Q(parent_id__in=id_list)
+            ).values_list("id", flat=True)
+        )
+
+    def bulk_archive(self, id_list):
+        """
+        archive products, their variations and related objects
+        """
+        with transaction.atomic():
+            products_id = self.get_family_ids(id_list)
+            status_obj = get_status(
+                PRODUCT_PARENT_STATUS, PRODUCT_STATUS_ARCHIVE
+            )
+            Product.objects.filter(id__in=products_id).update(
+                status=status_obj, update_date=timezone.now()
+            )
+            cascade_is_active(Product, products_id, False)
+        return products_id
+
+    def bulk_restore(self, id_list):
+        """
+        restore products, their variations and related objects
+        """
         with transaction.atomic():
+            products_id = self.get_family_ids(id_list)
             status_obj = get_status(
-                PRODUCT_PARENT_STATUS, PRODUCT_STATUS.get(status)
+                PRODUCT_PARENT_STATUS, PRODUCT_STATUS_ACTIVE
+            )
+            Product.objects.filter(id__in=products_id).update(
+                status=status_obj, update_date=timezone.now()
+            )
+            cascade_is_active(Product, products_id, True)
+        return products_id
+
+    def bulk_status_update(self, id_list, status):
+        status_name = PRODUCT_STATUS.get(status)
+        if status_name == PRODUCT_STATUS_ARCHIVE:
+            return self.bulk_archive(id_list)
+        with transaction.atomic():
+            archive_status = get_status(
+                PRODUCT_PARENT_STATUS, PRODUCT_STATUS_ARCHIVE
+            )
+            # products leaving archive take their variations archived with
+            # them along and get their related objects back
+            archived_ids = self.get_family_ids(
+                Product.objects.filter(
+                    id__in=id_list, status=archive_status
+                ).values_list("id", flat=True)
+            )
+            products_id = list(set(id_list) | set(archived_ids))
+            status_obj = get_status(PRODUCT_PARENT_STATUS, status_name)
+            Product.objects.filter(id__in=products_id).update(
+                status=status_obj, update_date=timezone.now()
             )
-            Product.objects.filter(id__in=id_list).update(status=status_obj)
+            cascade_is_active(Product, archived_ids, True)
+        return products_id
 
 
 class Product(
@@ -471,6 +709,8 @@ class Product(
         verbose_name="Select Parent",
         related_name="products",
     )
+    # maintained by a database trigger, see migration 0017
+    search_vector = SearchVectorField(null=True, editable=False)
     create_date = models.DateTimeField(default=timezone.now)
     update_date = models.DateTimeField(default=timezone.now)
 
@@ -494,10 +734,26 @@ class Product(
 
     ignore_rel_while_delete = ["ProductVariationOption"]
 
+    # related objects that follow the product on archive/restore
+    archive_cascade = ["images", "productcomponents_product", "product_rrps"]
+
     class Meta:
         """Meta Class."""
 
         verbose_name_plural = _("Products")
+        indexes = [
+            GinIndex(fields=["search_vector"], name="product_search_vector_gin"),
+            GinIndex(
+                fields=["title"],
+                name="product_title_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+            GinIndex(
+                fields=["sku"],
+                name="product_sku_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ]
 
     @property
     def status_name(self):
@@ -506,6 +762,13 @@ class Product(
         """
         return self.status.name
 
+    @property
+    def is_active(self):
+        """
+        return False for archived product
+        """
+        return self.status.name != PRODUCT_STATUS_ARCHIVE
+
     @property
     def get_company(self):
         """
@@ -530,31 +793,15 @@ class Product(
         """
         archive model instance
         """
-        self.is_active = False
-        self.save()
-        for image in self.images.all():
-            image.archive()
-
-        for product_component in self.productcomponents_product.all():
-            product_component.archive()
-
-        for product_rrp in self.product_rrps.all():
-            product_rrp.archive()
+        Product.objects.bulk_archive([self.id])
+        self.refresh_from_db(fields=["status", "update_date"])
 
     def restore(self):
         """
         restore model instance
         """
-        self.is_active = True
-        self.save()
-        for image in self.images.all():
-            image.restore()
-
-        for product_component in self.productcomponents_product.all():
-            product_component.restore()
-
-        for product_rrp in self.product_rrps.all():
-            product_rrp.restore()
+        Product.objects.bulk_restore([self.id])
+        self.refresh_from_db(fields=["status", "update_date"])
 
     def __str__(self):
         """Return Value."""
@@ -638,6 +885,34 @@ class Product(
         return has_permission(member, "add_product")
 
 
+class ProductOptionManager(models.Manager):
+    def get_or_create_bulk(self, company, options):
+        """
+        return {(name, value): ProductOption} for the given pairs, missing
+        options are created with a single insert.
+        """
+        options = set(options)
+        if not options:
+            return {}
+        lookups = Q()
+        for name, value in options:
+            lookups |= Q(name=name, value=value)
+        options_map = {
+            (option.name, option.value): option
+            for option in self.filter(lookups, company=company)
+        }
+        new_options = self.bulk_create(
+            [
+                ProductOption(company=company, name=name, value=value)
+                for name, value in options
+                if (name, value) not in options_map
+            ]
+        )
+        for option in new_options:
+            options_map[(option.name, option.value)] = option
+        return options_map
+
+
 class ProductOption(models.Model):
     """
     Product Option Model.
@@ -650,6 +925,8 @@ class ProductOption(models.Model):
     name = models.CharField(verbose_name=_("Option Name"), max_length=200)
     value = models.CharField(verbose_name=_("Option Value"), max_length=200)
 
+    objects = ProductOptionManager()
+
     class Meta:
         """Meta Class."""
 
@@ -860,6 +1137,8 @@ class ComponentMe(models.Model):
     create_date = models.DateTimeField(default=timezone.now)
     update_date = models.DateTimeField(default=timezone.now)
 
+    archive_cascade = ["files"]
+
     class Meta:
         """Meta Class."""
 
@@ -871,8 +1150,7 @@ class ComponentMe(models.Model):
         """
         self.is_active = False
         self.save()
-        for f in self.files.all():
-            f.archive()
+        cascade_is_active(ComponentMe, [self.id], False)
 
     def restore(self):
         """
@@ -880,8 +1158,7 @@ class ComponentMe(models.Model):
         """
         self.is_active = True
         self.save()
-        for f in self.files.all():
-            f.restore()
+        cascade_is_active(ComponentMe, [self.id], True)
 
     def __str__(self):
         """Return Value."""
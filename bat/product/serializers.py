@@ -11,6 +11,7 @@ from bat.company.models import HsCode, PackingBox
 from bat.company.serializers import PackingBoxSerializer
 from bat.company.utils import get_member
 from bat.globalutils.utils import get_status_object, set_field_errors
+from bat.product.facets import invalidate_facets
 from bat.product.constants import PRODUCT_STATUS_DRAFT, AVAILABLE_IMPORT_FILE_EXTENSIONS, PRODUCT_STATUS_CHOICE2
 from bat.product.models import (
     ComponentMe,
@@ -27,12 +28,15 @@ from bat.serializersFields.serializers_fields import (
     MoneySerializerField,
     StatusField,
     TagField,
+    ThumbnailUrlsField,
     WeightField,
 )
 from bat.setting.utils import get_status
 
 
 class ImageSerializer(serializers.ModelSerializer):
+    thumbnail_urls = ThumbnailUrlsField()
+
     class Meta:
         model = Image
         fields = (
@@ -43,6 +47,8 @@ class ImageSerializer(serializers.ModelSerializer):
             "main_image",
             "is_active",
             "company",
+            "is_processed",
+            "thumbnail_urls",
         )
         read_only_fields = (
             "id",
@@ -50,6 +56,7 @@ class ImageSerializer(serializers.ModelSerializer):
             "object_id",
             "is_active",
             "company",
+            "is_processed",
         )
 
 
@@ -191,7 +198,6 @@ class ProductSerializer(serializers.ModelSerializer):
                     hscode=hscode, company=member.company
                 )
             data.pop("images", None)
-            tags = data.get("tags", None)
             data.pop("tags", None)
             is_component = data.get("is_component", None)
             description = data.get("description", None)
@@ -200,42 +206,18 @@ class ProductSerializer(serializers.ModelSerializer):
 
             # save variations
             for product in products or []:
-                product_variation_options = product.get(
-                    "product_variation_options", None
-                )
-                product.pop("product_variation_options", None)
-
-                tags = product.pop("tags", None)
-
                 product["status"] = data["status"]
                 product["is_component"] = is_component
                 product["description"] = description
                 if hscode:
                     product["hscode"] = hscode
-
-                new_product = Product.objects.create(
-                    company=member.company, **product
-                )
-
-                if tags:
-                    # set tags
-                    new_product.tags.set(*tags)
-                # save options
-                for variation_option in product_variation_options or []:
-                    name = variation_option.get("productoption", None).get(
-                        "name", None
-                    )
-                    value = variation_option.get("productoption", None).get(
-                        "value", None
-                    )
-                    if name and value:
-                        productoption, _c = ProductOption.objects.get_or_create(
-                            name=name, value=value, company=member.company
-                        )
-                        ProductVariationOption.objects.create(
-                            product=new_product, productoption=productoption
-                        )
-        return new_product
+            new_products = Product.objects.create_variations(
+                member.company, products or []
+            )
+            invalidate_facets(member.company.id)
+        if not new_products:
+            raise ValidationError({"products": _("Add at least one variation.")})
+        return new_products[-1]
 
 
 class UpdateProductSerializer(serializers.ModelSerializer):
@@ -1,18 +1,27 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
-from bat.product.models import ProductParent
-from bat.company.models import ComponentMe
-from bat.product.constants import PRODUCT_PARENT_STATUS, PRODUCT_STATUS_DISCONTINUED, PRODUCT_STATUS_ARCHIVE
-from bat.setting.utils import get_status
+from bat.globalutils.cascade import archive_cascaded
+from bat.product.facets import invalidate_facets
+from bat.product.models import Image, Product
 
 
-@receiver(post_save, sender=ProductParent)
-def archive_component_me_on_discontinued(sender, instance, **kwargs):
-    if instance.status == get_status(PRODUCT_PARENT_STATUS, PRODUCT_STATUS_DISCONTINUED):
-        products_ids = list(instance.products.values_list("id", flat=True))
-        component_mes = ComponentMe.objects.filter(component__in=products_ids)
-        component_mes.update(is_active=False)
-        archive_status = get_status(
-            PRODUCT_PARENT_STATUS, PRODUCT_STATUS_ARCHIVE)
-        component_mes.update(status=archive_status)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Image)
+@receiver(post_delete, sender=Image)
+def invalidate_facets_on_change(sender, instance, **kwargs):
+    """Drop cached catalog facets of the company on product/image writes."""
+    invalidate_facets(instance.company_id)
+
+
+@receiver(archive_cascaded, sender=Product)
+def invalidate_facets_on_archive(sender, ids, **kwargs):
+    """Archived products hide their images from the type gallery."""
+    company_ids = (
+        Product.objects.filter(id__in=ids)
+        .values_list("company_id", flat=True)
+        .distinct()
+    )
+    for company_id in company_ids:
+        invalidate_facets(company_id)
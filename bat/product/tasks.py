@@ -0,0 +1,160 @@
+"""Task that can run by celery will be placed here."""
+import io
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import BotoCoreError, ClientError
+from celery.utils.log import get_task_logger
+from django.conf import settings
+from django.core.files import File as DjangoFile
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image as PILImage
+from PIL import UnidentifiedImageError
+
+from bat.product.models import Image
+from config.celery import app
+
+logger = get_task_logger(__name__)
+
+# longest side in pixels of every thumbnail size
+THUMBNAIL_SIZES = {"small": 160, "medium": 480, "large": 1024}
+THUMBNAIL_FORMATS = {"webp": "WEBP", "jpeg": "JPEG"}
+THUMBNAIL_QUALITY = 82
+UPLOAD_THREADS = 6
+# errors of the staging directory or the storage that may pass on a retry
+RETRY_ERRORS = (OSError, BotoCoreError, ClientError)
+MAX_RETRIES = 5
+
+
+def stage_image(uploaded_file):
+    """
+    write an uploaded image to the staging directory, return its path
+    """
+    os.makedirs(settings.IMAGE_STAGING_ROOT, exist_ok=True)
+    _name, extension = os.path.splitext(uploaded_file.name)
+    path = os.path.join(
+        settings.IMAGE_STAGING_ROOT, uuid.uuid4().hex + extension.lower()
+    )
+    with open(path, "wb") as staged:
+        for chunk in uploaded_file.chunks():
+            staged.write(chunk)
+    return path
+
+
+def queue_images(images, staged):
+    """
+    queue processing of staged images once the transaction commits.
+    staged is a list of (staging path, original file name) per image.
+    """
+
+    def _enqueue():
+        for image, (path, file_name) in zip(images, staged):
+            process_image.delay(image.id, path, file_name)
+
+    transaction.on_commit(_enqueue)
+
+
+def render_thumbnails(original):
+    """
+    return {(size, format): bytes} of thumbnails of a PIL image
+    """
+    if original.mode not in ("RGB", "RGBA"):
+        original = original.convert("RGBA")
+    thumbnails = {}
+    for size, pixels in THUMBNAIL_SIZES.items():
+        thumbnail = original.copy()
+        thumbnail.thumbnail((pixels, pixels), PILImage.LANCZOS)
+        for extension, image_format in THUMBNAIL_FORMATS.items():
+            converted = thumbnail
+            if image_format == "JPEG" and converted.mode != "RGB":
+                converted = converted.convert("RGB")
+            buffer = io.BytesIO()
+            converted.save(buffer, image_format, quality=THUMBNAIL_QUALITY)
+            thumbnails[(size, extension)] = buffer.getvalue()
+    return thumbnails
+
+
+def discard_image(image_id, path):
+    """
+    remove the staged file and the row of an image that can't be processed
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    Image.objects.filter(id=image_id, is_processed=False).delete()
+
+
+class ProcessImageTask(app.Task):
+    """Discard the image once processing failed for good."""
+
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        image_id, path = args[:2]
+        logger.error("image %s failed processing: %r", image_id, exc)
+        discard_image(image_id, path)
+
+
+@app.task(
+    bind=True,
+    base=ProcessImageTask,
+    autoretry_for=RETRY_ERRORS,
+    retry_backoff=True,
+    max_retries=MAX_RETRIES,
+)
+def process_image(self, image_id, path, file_name):
+    """
+    upload a staged image with its thumbnails to the storage.
+
+    The original and all thumbnails are uploaded in parallel threads, the
+    Image row is marked processed once everything is stored. Storage errors
+    are retried with backoff, an image still failing after MAX_RETRIES or
+    a file that isn't an image is discarded.
+    """
+    image = Image.objects.filter(id=image_id).first()
+    if image is None:
+        logger.warning("image %s removed before processing", image_id)
+        if os.path.exists(path):
+            os.remove(path)
+        return
+
+    try:
+        with PILImage.open(path) as original:
+            original.load()
+            thumbnails = render_thumbnails(original)
+    except (UnidentifiedImageError, PILImage.DecompressionBombError) as error:
+        # retrying doesn't help, UnidentifiedImageError is an OSError
+        logger.error("image %s is not a valid image: %r", image_id, error)
+        discard_image(image_id, path)
+        return
+
+    storage = image.image.storage
+    original_name = image.image.field.generate_filename(image, file_name)
+    base, _extension = os.path.splitext(original_name)
+
+    def _upload_original():
+        with open(path, "rb") as staged:
+            return storage.save(original_name, DjangoFile(staged))
+
+    def _upload_thumbnail(key, content):
+        size, extension = key
+        name = "{0}_{1}.{2}".format(base, size, extension)
+        return key, storage.save(name, ContentFile(content))
+
+    with ThreadPoolExecutor(max_workers=UPLOAD_THREADS) as pool:
+        original_future = pool.submit(_upload_original)
+        thumbnail_futures = [
+            pool.submit(_upload_thumbnail, key, content)
+            for key, content in thumbnails.items()
+        ]
+        image.image.name = original_future.result()
+        names = {}
+        for future in thumbnail_futures:
+            (size, extension), name = future.result()
+            names.setdefault(size, {})[extension] = name
+
+    image.thumbnails = names
+    image.is_processed = True
+    image.update_date = timezone.now()
+    image.save(update_fields=["image", "thumbnails", "is_processed", "update_date"])
+    os.remove(path)
@@ -0,0 +1,71 @@
+import pytest
+
+from bat.company.models import Company
+from bat.product.constants import (
+    PRODUCT_PARENT_STATUS,
+    PRODUCT_STATUS_ACTIVE,
+    PRODUCT_STATUS_DRAFT,
+)
+from bat.product.models import Image, Product
+from bat.setting.utils import get_status
+from bat.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def create_family(variations):
+    """
+    return a draft parent product with the number of variations, every
+    product with an image.
+    """
+    UserFactory(is_superuser=True)
+    company = Company.objects.create(name="company", email="info@example.com", country="SE")
+    status = get_status(PRODUCT_PARENT_STATUS, PRODUCT_STATUS_DRAFT)
+    parent = Product.objects.create(company=company, title="parent", status=status)
+    for i in range(variations):
+        Product.objects.create(
+            company=company,
+            title="variation {0}".format(i),
+            status=status,
+            parent=parent,
+        )
+    for product in Product.objects.filter(company=company):
+        Image.objects.create(
+            company=company, image="product.png", content_object=product
+        )
+    return parent
+
+
+class TestProductManager:
+    def test_status_update_restores_archived_family(self):
+        parent = create_family(3)
+        family_ids = Product.objects.get_family_ids([parent.id])
+        Product.objects.bulk_status_update([parent.id], "archive")
+        assert not Image.objects.filter(
+            object_id__in=family_ids, is_active=True
+        ).exists()
+
+        updated_ids = Product.objects.bulk_status_update([parent.id], "active")
+
+        assert sorted(updated_ids) == sorted(family_ids)
+        assert set(
+            Product.objects.filter(id__in=family_ids).values_list(
+                "status__name", flat=True
+            )
+        ) == {PRODUCT_STATUS_ACTIVE}
+        assert not Image.objects.filter(
+            object_id__in=family_ids, is_active=False
+        ).exists()
+
+    def test_status_update_of_unarchived_product(self):
+        parent = create_family(2)
+
+        updated_ids = Product.objects.bulk_status_update([parent.id], "active")
+
+        # variations that weren't archived keep their status
+        assert updated_ids == [parent.id]
+        assert set(
+            Product.objects.filter(parent=parent).values_list(
+                "status__name", flat=True
+            )
+        ) == {PRODUCT_STATUS_DRAFT}
@@ -3,7 +3,7 @@ from bat.company.utils import get_member
 from bat.product.import_file import ProductCSVErrorBuilder, ProductExcelErrorBuilder, ProductCSVParser, ProductExcelParser
 from bat.company.models import Company, HsCode
 from bat.setting.utils import get_status
-from bat.product.models import ComponentMe, Product, Image
+from bat.product.models import ComponentMe, Product
 from bat.product.filters import ProductFilter
 from bat.product.constants import (
     PRODUCT_STATUS,
@@ -12,7 +12,8 @@ from bat.product.constants import (
     PRODUCT_STATUS_DISCONTINUED,
     PRODUCT_STATUS
 )
-from bat.product import serializers
+from bat.product import facets, serializers
+from bat.globalutils.search import FullTextSearchFilter
 from bat.mixins.mixins import ArchiveMixin, ExportMixin, RestoreMixin
 from drf_yasg2.utils import swagger_auto_schema
 from rolepermissions.checkers import has_permission
@@ -38,7 +39,7 @@ from django_filters.rest_framework import DjangoFilterBackend
 from dry_rest_permissions.generics import DRYPermissions
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.filters import OrderingFilter
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
@@ -65,7 +66,7 @@ class ProductViewSet(
     serializer_class = serializers.ProductSerializer
     queryset = Product.objects.all()
     permission_classes = (IsAuthenticated, DRYPermissions)
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, OrderingFilter]
     filterset_class = ProductFilter
     search_fields = [
         "title",
@@ -76,6 +77,7 @@ class ProductViewSet(
         "bullet_points",
         "description",
     ]
+    search_trigram_fields = ["title", "sku"]
     ordering_fields = ["create_date", "title"]
 
     archive_message = _("Product is archived")
@@ -211,61 +213,22 @@ class ProductViewSet(
     @action(detail=False, methods=["GET"], url_path="tags-types")
     def get_tags_and_types(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
-        types = (
-            queryset.exclude(type__exact="")
-            .exclude(type__isnull=True)
-            .distinct("type")
-            .values_list("type", flat=True)
+        data = facets.get_tags_and_types(
+            self.kwargs.get("company_pk", None),
+            queryset,
+            use_cache=not request.query_params,
         )
-        tags = (
-            queryset.exclude(tags__isnull=True)
-            .distinct("tags__name")
-            .values_list("tags__name", flat=True)
-        )
-        series = (
-            queryset.exclude(series__exact="")
-            .exclude(series__isnull=True)
-            .distinct("series")
-            .values_list("series", flat=True)
-        )
-        hscode = (
-            queryset.exclude(hscode__exact="")
-            .exclude(hscode__isnull=True)
-            .distinct("hscode")
-            .values_list("hscode", flat=True)
-        )
-        data = {}
-        data["tag_data"] = tags
-        data["type_data"] = types
-        data["series_data"] = series
-        data["hscode_data"] = hscode
         return Response(data, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=["GET"], url_path="types-with-images")
     def get_types(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
-        types = (
-            queryset.exclude(type__exact="")
-            .exclude(type__isnull=True)
-            .distinct("type")
-            .values_list("type", flat=True)
+        type_data = facets.get_types_gallery(
+            self.kwargs.get("company_pk", None),
+            queryset,
+            request,
+            use_cache=not request.query_params,
         )
-        type_data = []
-        for type in types:
-            product_data = {}
-            queryset_type = queryset.filter(type__exact=type)
-            product_images = queryset_type.values_list(
-                "images", flat=True
-            )[:3]
-            product_images = Image.objects.filter(id__in=product_images)
-
-            type_data.append({
-                "type": type,
-                "total": queryset_type.count(),
-                "products": ["http://localhost:8000" + image.image.url for image in product_images]
-            })
-        # data = {}
-        # data["type_data"] = type_data
         return Response(type_data, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=["post"], url_path="import")
@@ -296,6 +259,7 @@ class ProductViewSet(
         data, columns = parser_classes.parse(import_file)
         is_successful, invalid_records = Product.objects.import_bulk(
             data=data, columns=columns, company=company)
+        facets.invalidate_facets(company.id)
 
         if is_successful:
             if invalid_records:
@@ -1,5 +1,6 @@
 from django.utils.translation import ugettext_lazy as _
 from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
 
 from rest_framework import viewsets, status
 from rest_framework.permissions import IsAuthenticated
@@ -10,7 +11,9 @@ from rest_framework.decorators import action
 from bat.product import image_serializers
 from bat.product.models import Image
 from bat.company.utils import get_member
+from bat.globalutils.storage import delete_files
 from bat.globalutils.utils import has_any_permission
+from bat.product.tasks import queue_images, stage_image
 
 
 class BaseImagesViewSet(viewsets.ViewSet):
@@ -36,8 +39,18 @@ class BaseImagesViewSet(viewsets.ViewSet):
             serializer = image_serializers.ImageSerializer(
                 data=images_data, many=True)
             serializer.is_valid(raise_exception=True)
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            # originals go to staging, a worker uploads them with thumbnails
+            images = []
+            staged = []
+            for item in serializer.validated_data:
+                upload = item.pop("image")
+                staged.append((stage_image(upload), upload.name))
+                images.append(Image(is_processed=False, **item))
+            images = Image.objects.bulk_create(images)
+            queue_images(images, staged)
+            data = image_serializers.ImageSerializer(
+                images, many=True, context={"request": request}).data
+            return Response(data, status=status.HTTP_201_CREATED)
         else:
             return Response({"detail": _("Not a image to save")}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -50,13 +63,16 @@ class BaseImagesViewSet(viewsets.ViewSet):
         if not (has_any_permission(member, self.permission_list)):
             return Response({"detail": _("You do not have permission to perform this action.")}, status=status.HTTP_403_FORBIDDEN)
         ids = request.GET.get("ids", None).split(",")
-        images = Image.objects.filter(
-            company__id=company_pk, object_id=object_pk, id__in=ids)
-        if not images.exists():
+        images = list(Image.objects.filter(
+            company__id=company_pk, object_id=object_pk, id__in=ids))
+        if not images:
             return Response({_("images not found")}, status=status.HTTP_404_NOT_FOUND)
         try:
-            for image in images:
-                image.delete()
+            names = [
+                name for image in images for name in image.get_file_names()]
+            Image.objects.filter(id__in=[image.id for image in images]).delete()
+            storage = Image._meta.get_field("image").storage
+            transaction.on_commit(lambda: delete_files(storage, names))
             return Response({_("deleted successfully")}, status=status.HTTP_204_NO_CONTENT)
         except Exception:
             return Response({_("can't deleted")}, status=status.HTTP_400_BAD_REQUEST)
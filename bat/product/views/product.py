@@ -6,7 +6,6 @@ from drf_yasg2.utils import swagger_auto_schema
 from dry_rest_permissions.generics import DRYPermissions
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.filters import SearchFilter
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
@@ -16,6 +15,7 @@ from django.views import View
 from django.http import HttpResponseRedirect
 #
 
+from bat.globalutils.search import FullTextSearchFilter
 from bat.mixins.mixins import ArchiveMixin, ExportMixin, RestoreMixin
 from bat.product import serializers
 from bat.product.models import Product, ProductComponent, ProductPackingBox, ProductRrp
@@ -35,9 +35,10 @@ class ProductVariationViewSet(
     serializer_class = serializers.ProductSerializer
     queryset = Product.objects.all()
     permission_classes = (IsAuthenticated, DRYPermissions)
-    filter_backends = [DjangoFilterBackend, SearchFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
     filterset_fields = ["is_active"]
     search_fields = ["title"]
+    search_trigram_fields = ["title", "sku"]
 
     archive_message = _("Product variation  is archived")
     restore_message = _("Product variation is restored")
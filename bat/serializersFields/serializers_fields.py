@@ -8,11 +8,18 @@ from drf_yasg2 import openapi
 from drf_yasg2.utils import swagger_auto_schema
 from measurement.measures import Weight
 from rest_framework.exceptions import ValidationError
-from rest_framework.serializers import ChoiceField, Field, JSONField
+from rest_framework.serializers import (
+    ChoiceField,
+    Field,
+    JSONField,
+    ListSerializer,
+    PrimaryKeyRelatedField,
+)
 
 from bat.company import constants
 from bat.globalconstants.constants import CURRENCY_CODE_CHOICES
 from bat.product.constants import PRODUCT_STATUS_CHOICE
+from bat.setting.trees import get_status_json as get_cached_status_json
 
 
 class WeightField(JSONField):
@@ -93,6 +100,29 @@ class TagField(Field):
         return data.split(",")
 
 
+class ThumbnailUrlsField(Field):
+    def __init__(self, **kwargs):
+        kwargs["source"] = "*"
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        """
+        Convert image thumbnails to {size: {format: url}}.
+        """
+        storage = value.image.storage
+        request = self.context.get("request", None)
+        urls = {}
+        for size, formats in value.thumbnails.items():
+            urls[size] = {}
+            for extension, name in formats.items():
+                url = storage.url(name)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                urls[size][extension] = url
+        return urls
+
+
 class MoneySerializerField(JSONField):
     class Meta:
         swagger_schema_fields = {
@@ -212,6 +242,12 @@ class QueryFieldsMixin(object):
 
 
 def get_status_json(obj):
+    """
+    give json of Status with all parents, served from the cached status tree.
+    """
+    json_status = get_cached_status_json(obj)
+    if json_status is not None:
+        return json_status
     if obj.parent:
         json_status = {
             "id": obj.id,
@@ -239,3 +275,48 @@ class StatusField(ChoiceField):
             return value
         json_status = get_status_json(value)
         return json_status
+
+
+class BulkPrimaryKeyRelatedField(PrimaryKeyRelatedField):
+    """
+    primary key field that reads objects loaded in bulk by its
+    BulkRelatedListSerializer, unknown keys fall back to one query.
+    """
+
+    loaded = None
+
+    def to_internal_value(self, data):
+        if self.loaded is not None and str(data) in self.loaded:
+            return self.loaded[str(data)]
+        return super().to_internal_value(data)
+
+
+class BulkRelatedListSerializer(ListSerializer):
+    """
+    load objects of every BulkPrimaryKeyRelatedField of the child with one
+    query per field before the items are validated.
+    """
+
+    def to_internal_value(self, data):
+        fields = [
+            (name, field)
+            for name, field in self.child.fields.items()
+            if isinstance(field, BulkPrimaryKeyRelatedField)
+        ]
+        if not isinstance(data, list):
+            return super().to_internal_value(data)
+        for name, field in fields:
+            pks = {
+                str(item[name])
+                for item in data
+                if isinstance(item, dict) and str(item.get(name, "")).isdigit()
+            }
+            field.loaded = {
+                str(pk): obj
+                for pk, obj in field.get_queryset().in_bulk(pks).items()
+            }
+        try:
+            return super().to_internal_value(data)
+        finally:
+            for _name, field in fields:
+                field.loaded = None
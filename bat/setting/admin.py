@@ -4,6 +4,7 @@ from bat.setting.models import (
     Category,
     DeliveryTermName,
     DeliveryTerms,
+    ExchangeRate,
     LogisticLeadTime,
     PaymentTerms,
     Status,
@@ -18,3 +19,10 @@ admin.site.register(PaymentTerms)
 admin.site.register(DeliveryTermName)
 admin.site.register(DeliveryTerms)
 admin.site.register(LogisticLeadTime)
+
+
+@admin.register(ExchangeRate)
+class ExchangeRateAdmin(admin.ModelAdmin):
+    list_display = ("date", "currency", "rate")
+    list_filter = ("currency",)
+    date_hierarchy = "date"
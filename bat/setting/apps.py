@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class SettingConfig(AppConfig):
     name = 'bat.setting'
+
+    def ready(self):
+        import bat.setting.trees  # noqa F401
@@ -0,0 +1,291 @@
+"""Dated exchange rates and conversion of money totals in SQL or NumPy."""
+import csv
+import datetime
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import (
+    Case,
+    DecimalField,
+    ExpressionWrapper,
+    F,
+    OuterRef,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from djmoney import settings as money_settings
+from djmoney.contrib.exchange.backends.base import BaseExchangeBackend
+from djmoney.contrib.exchange.exceptions import MissingRate
+
+from bat.setting.models import ExchangeRate
+
+CENT = Decimal("0.01")
+RATE_FIELD = DecimalField(max_digits=20, decimal_places=6)
+AMOUNT_FIELD = DecimalField(max_digits=28, decimal_places=10)
+
+
+def load_rates(rows):
+    """
+    insert or update rates from (date, currency, rate) rows, return number
+    of loaded rates.
+    """
+    rates = {
+        (currency.upper(), date): Decimal(rate) for date, currency, rate in rows
+    }
+    if not rates:
+        return 0
+    with transaction.atomic():
+        existing = {
+            (rate.currency, rate.date): rate
+            for rate in ExchangeRate.objects.select_for_update().filter(
+                currency__in={currency for currency, _date in rates},
+                date__in={date for _currency, date in rates},
+            )
+        }
+        updated = []
+        created = []
+        for (currency, date), value in rates.items():
+            rate = existing.get((currency, date))
+            if rate is None:
+                created.append(ExchangeRate(currency=currency, date=date, rate=value))
+            elif rate.rate != value:
+                rate.rate = value
+                updated.append(rate)
+        ExchangeRate.objects.bulk_create(created, batch_size=1000)
+        ExchangeRate.objects.bulk_update(updated, ["rate"], batch_size=1000)
+    return len(rates)
+
+
+def load_rates_csv(rates_file):
+    """
+    load rates from a csv file with date (YYYY-MM-DD), currency and rate
+    columns.
+    """
+    return load_rates(
+        (
+            datetime.date.fromisoformat(row["date"]),
+            row["currency"],
+            row["rate"],
+        )
+        for row in csv.DictReader(rates_file)
+    )
+
+
+class RateTable:
+    """
+    Rates of currencies as arrays sorted by date, looked up for many dates
+    at once.
+    """
+
+    def __init__(self, rows, base_currency=None):
+        self.base_currency = base_currency or money_settings.BASE_CURRENCY
+        self.dates = {}
+        self.rates = {}
+        grouped = {}
+        for currency, date, rate in rows:
+            grouped.setdefault(currency, []).append((date, rate))
+        for currency, values in grouped.items():
+            values.sort()
+            self.dates[currency] = np.array(
+                [date for date, _rate in values], dtype="datetime64[D]"
+            )
+            self.rates[currency] = np.array(
+                [rate for _date, rate in values], dtype=np.float64
+            )
+
+    @classmethod
+    def load(cls, currencies, end=None):
+        """
+        return table of the currencies with one query, rates after end are
+        left out.
+        """
+        queryset = ExchangeRate.objects.filter(currency__in=set(currencies))
+        if end is not None:
+            queryset = queryset.filter(date__lte=end)
+        return cls(queryset.values_list("currency", "date", "rate").order_by())
+
+    def get_rates(self, currency, dates):
+        """
+        return rates of the currency on the dates, the latest rate on or
+        before each date.
+        """
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        if currency == self.base_currency:
+            return np.ones(len(dates))
+        if currency not in self.dates:
+            raise MissingRate("Rate {0} does not exist".format(currency))
+        index = np.searchsorted(self.dates[currency], dates, side="right") - 1
+        if len(index) and index.min() < 0:
+            raise MissingRate(
+                "Rate {0} before {1} does not exist".format(
+                    currency, self.dates[currency][0]
+                )
+            )
+        return self.rates[currency][index]
+
+    def get_missing(self, currency, dates):
+        """
+        return a mask of the dates without a rate of the currency.
+        """
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        if currency == self.base_currency:
+            return np.zeros(len(dates), dtype=bool)
+        if currency not in self.dates:
+            return np.ones(len(dates), dtype=bool)
+        return dates < self.dates[currency][0]
+
+    def convert(self, amounts, currencies, dates, target):
+        """
+        return amounts in the target currency, converted with the rates of
+        their dates through the base currency.
+        """
+        amounts = np.asarray(amounts, dtype=np.float64)
+        currencies = np.asarray(currencies)
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        converted = np.empty(len(amounts))
+        target_rates = self.get_rates(target, dates)
+        for currency in np.unique(currencies):
+            mask = currencies == currency
+            converted[mask] = (
+                amounts[mask] * target_rates[mask] / self.get_rates(currency, dates[mask])
+            )
+        return converted
+
+
+def get_converted_totals(rows, target, table=None, missing=None):
+    """
+    return {key: total in target currency} from (key, date, currency,
+    amount) rows, rows without amount are skipped.
+
+    MissingRate is raised when a row can't be converted, unless missing is
+    a set: those rows are left out and their currencies added to it.
+    """
+    rows = [row for row in rows if row[3] is not None and row[2]]
+    if not rows:
+        return {}
+    keys, dates, currencies, amounts = zip(*rows)
+    if table is None:
+        table = RateTable.load(set(currencies) | {target}, end=max(dates))
+    if missing is not None:
+        currencies = np.asarray(currencies)
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        without_target = table.get_missing(target, dates)
+        if without_target.any():
+            missing.add(target)
+        without_rate = without_target.copy()
+        for currency in np.unique(currencies):
+            mask = currencies == currency
+            currency_missing = table.get_missing(currency, dates[mask])
+            if currency_missing.any():
+                missing.add(str(currency))
+                without_rate[mask] |= currency_missing
+        if without_rate.any():
+            keep = ~without_rate
+            keys = [key for key, kept in zip(keys, keep) if kept]
+            dates, currencies = dates[keep], currencies[keep]
+            amounts = [amount for amount, kept in zip(amounts, keep) if kept]
+            if not keys:
+                return {}
+    converted = table.convert(amounts, currencies, dates, target)
+    index = {}
+    codes = np.array([index.setdefault(key, len(index)) for key in keys])
+    sums = np.bincount(codes, weights=converted, minlength=len(index))
+    return {
+        key: Decimal(float(sums[code])).quantize(CENT) for key, code in index.items()
+    }
+
+
+def sum_converted(
+    queryset, amount_field, date_field, target, key=None, missing=None
+):
+    """
+    return {key value: total} of the money field of the queryset in the
+    target currency, by day of date_field when key is None. see
+    get_converted_totals for missing.
+
+    amounts are summed in SQL by key, day and currency first, so only
+    those groups are converted in NumPy however many rows are summed.
+    """
+    day_field = date_field + "__date"
+    currency_field = amount_field + "_currency"
+    key = key or day_field
+    fields = list(dict.fromkeys([key, day_field, currency_field]))
+    rows = (
+        queryset.values(*fields).annotate(total=Sum(amount_field)).order_by()
+    )
+    return get_converted_totals(
+        (
+            (row[key], row[day_field], row[currency_field], row["total"])
+            for row in rows
+        ),
+        target,
+        missing=missing,
+    )
+
+
+def get_rate_expression(date_field, currency=None, currency_field=None):
+    """
+    return the rate of the currency, or of the currency field of each row,
+    on the date of each row as a correlated subquery: the latest rate on
+    or before the date, 1 for the base currency.
+    """
+    base_rate = Value(1, output_field=RATE_FIELD)
+    if currency == money_settings.BASE_CURRENCY:
+        return base_rate
+    rate = Subquery(
+        ExchangeRate.objects.filter(
+            currency=currency or OuterRef(currency_field),
+            date__lte=OuterRef(date_field),
+        )
+        .order_by("-date")
+        .values("rate")[:1],
+        output_field=RATE_FIELD,
+    )
+    if currency:
+        return rate
+    return Case(
+        When(**{currency_field: money_settings.BASE_CURRENCY}, then=base_rate),
+        default=rate,
+        output_field=RATE_FIELD,
+    )
+
+
+def get_converted_expression(amount_field, date_field, target):
+    """
+    return an expression converting the money field of each row to the
+    target currency in SQL, null when a rate is missing.
+    """
+    return ExpressionWrapper(
+        F(amount_field)
+        * get_rate_expression(date_field, currency=target)
+        / get_rate_expression(date_field, currency_field=amount_field + "_currency"),
+        output_field=AMOUNT_FIELD,
+    )
+
+
+class LocalRatesBackend(BaseExchangeBackend):
+    """
+    djmoney exchange backend reading the latest rates of the ExchangeRate
+    table, so convert_money uses the same rates without network access.
+    """
+
+    name = "local"
+
+    def get_rates(self, base_currency=None, **kwargs):
+        base_currency = base_currency or money_settings.BASE_CURRENCY
+        rates = {money_settings.BASE_CURRENCY: Decimal(1)}
+        rates.update(
+            ExchangeRate.objects.order_by("currency", "-date")
+            .distinct("currency")
+            .values_list("currency", "rate")
+        )
+        if base_currency not in rates:
+            raise MissingRate("Rate {0} does not exist".format(base_currency))
+        base_rate = rates[base_currency]
+        return {
+            currency: (rate / base_rate).quantize(Decimal("0.000001"))
+            for currency, rate in rates.items()
+        }
@@ -0,0 +1,60 @@
+"""Time the vectorized currency conversion on generated data."""
+import datetime
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from bat.setting.exchange import RateTable, get_converted_totals
+
+CURRENCIES = ["USD", "EUR", "GBP", "SEK", "JPY", "CAD"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Convert random order amounts in several currencies with a year of "
+        "daily rates and sum them by day, without touching the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=1000000)
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--target", default="EUR")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options["seed"])
+        first = datetime.date(2021, 1, 1)
+        days = [first + datetime.timedelta(days=d) for d in range(options["days"])]
+        table = RateTable(
+            (currency, day, rate)
+            for currency in CURRENCIES[1:]
+            for day, rate in zip(days, rng.uniform(0.5, 150, len(days)))
+        )
+        orders = options["orders"]
+        dates = np.array(days, dtype="datetime64[D]")[
+            rng.integers(0, len(days), orders)
+        ]
+        currencies = np.array(CURRENCIES)[rng.integers(0, len(CURRENCIES), orders)]
+        amounts = rng.uniform(1, 500, orders).round(2)
+
+        start = time.perf_counter()
+        converted = table.convert(amounts, currencies, dates, options["target"])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            "{0} orders: convert {1:.3f}s, total {2:.2f} {3}".format(
+                orders, elapsed, converted.sum(), options["target"]
+            )
+        )
+
+        start = time.perf_counter()
+        totals = get_converted_totals(
+            zip(dates.tolist(), dates.tolist(), currencies, amounts),
+            options["target"],
+            table=table,
+        )
+        self.stdout.write(
+            "{0} orders: convert and sum by day {1:.3f}s, {2} days".format(
+                orders, time.perf_counter() - start, len(totals)
+            )
+        )
@@ -0,0 +1,21 @@
+"""Load dated exchange rates from a csv file."""
+from django.core.management.base import BaseCommand
+
+from bat.setting.exchange import LocalRatesBackend, load_rates_csv
+
+
+class Command(BaseCommand):
+    help = (
+        "Load exchange rates from a csv file with date, currency and rate "
+        "columns, rates are units of the currency per BASE_CURRENCY. The "
+        "latest rates are copied to djmoney's exchange backend."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+
+    def handle(self, *args, **options):
+        with open(options["path"], newline="") as rates_file:
+            loaded = load_rates_csv(rates_file)
+        LocalRatesBackend().update_rates()
+        self.stdout.write("{0} rates loaded".format(loaded))
@@ -1,25 +1,77 @@
 """Midlleware to use for global use mostly related to settins."""
-import logging
+from contextlib import ExitStack
 
 import pytz
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
 from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+
+from bat.globalutils import profiling
+from bat.users.authentication import CachedJSONWebTokenAuthentication
 
 
 class TimezoneMiddleware:
-    """Set user selected timezone."""
+    """
+    Set user selected timezone.
+
+    Api requests carry a JWT instead of a session, their user is read with
+    the cached JWT authentication which keeps the result for the view.
+    """
 
     def __init__(self, get_response):
         """Inti function called when server start."""
         self.get_response = get_response
+        self.jwt_authentication = CachedJSONWebTokenAuthentication()
+
+    def get_user(self, request):
+        try:
+            result = self.jwt_authentication.authenticate(request)
+        except AuthenticationFailed:
+            # the view rejects the request with the proper response
+            return None
+        if result is not None:
+            return result[0]
+        if not request.user.is_anonymous:
+            return request.user
+        return None
 
     def __call__(self, request):
         """Call is called every new request django make."""
-        logger = logging.getLogger(__name__)
-        logger.warning("---TimeZone Setup---")
-        if not request.user.is_anonymous:
-            tzname = request.user.timezone
-            if tzname:
-                timezone.activate(pytz.timezone(tzname))
+        user = self.get_user(request)
+        if user is not None and user.timezone:
+            timezone.activate(pytz.timezone(user.timezone))
         else:
             timezone.deactivate()
         return self.get_response(request)
+
+
+class RequestProfilingMiddleware:
+    """
+    Record queries, cache reads, serializer time and response size per
+    request when REQUEST_PROFILING_ENABLED is set.
+
+    Results are sent in the Server-Timing header and kept in a per process
+    ring buffer. When disabled Django drops the middleware at startup.
+    """
+
+    def __init__(self, get_response):
+        """Inti function called when server start."""
+        if not getattr(settings, "REQUEST_PROFILING_ENABLED", False):
+            raise MiddlewareNotUsed
+        profiling.install()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Call is called every new request django make."""
+        profile, token = profiling.start_profile()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(profile.execute_wrapper)
+                )
+            response = self.get_response(request)
+        data = profiling.finish_profile(token, request, response)
+        response["Server-Timing"] = profiling.get_server_timing(data)
+        return response
@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('setting', '0012_auto_20210122_1602'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExchangeRate',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('currency', models.CharField(max_length=3, verbose_name='Currency')),
+                ('rate', models.DecimalField(decimal_places=6, max_digits=20, verbose_name='Rate')),
+            ],
+            options={
+                'verbose_name_plural': 'Exchange Rates',
+                'ordering': ['currency', 'date'],
+                'unique_together': {('currency', 'date')},
+            },
+        ),
+    ]
@@ -71,6 +71,11 @@ class Category(MPTTModel):
     @property
     def full_path(self):
         """List of all categories."""
+        from bat.setting.trees import get_tree_path
+
+        full_path = get_tree_path(self) if self.pk else None
+        if full_path is not None and full_path[0] == self.name:
+            return full_path
         full_path = [self.name]
         k = self.parent
 
@@ -123,6 +128,11 @@ class Status(MPTTModel):
     @property
     def full_path(self):
         """List of all status."""
+        from bat.setting.trees import get_tree_path
+
+        full_path = get_tree_path(self) if self.pk else None
+        if full_path is not None and full_path[0] == self.name:
+            return full_path
         full_path = [self.name]
         k = self.parent
 
@@ -307,3 +317,29 @@ class LogisticLeadTime(models.Model):
     def __str__(self):
         """Return Value."""
         return self.title
+
+
+class ExchangeRate(models.Model):
+    """
+    Exchange Rate Model.
+
+    Units of the currency for one unit of the BASE_CURRENCY on a date, a rate
+    is used from its date until the next rate of the currency.
+    """
+
+    date = models.DateField(verbose_name=_("Date"))
+    currency = models.CharField(max_length=3, verbose_name=_("Currency"))
+    rate = models.DecimalField(
+        max_digits=20, decimal_places=6, verbose_name=_("Rate")
+    )
+
+    class Meta:
+        """Meta Class."""
+
+        unique_together = (("currency", "date"),)
+        ordering = ["currency", "date"]
+        verbose_name_plural = _("Exchange Rates")
+
+    def __str__(self):
+        """Return Value."""
+        return "{0} {1} {2}".format(self.date, self.currency, self.rate)
@@ -1,28 +1,94 @@
 """Task that can run by celery will be placed here."""
 from celery.utils.log import get_task_logger
 from config.celery import app
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.expressions import Window
+from django.db.models.functions import MD5, Lag
 from reversion.models import Revision, Version
 
 logger = get_task_logger(__name__)
 
+COMPACT_BATCH_SIZE = 500
+
+
+def get_duplicate_version_ids(revision_ids):
+    """
+    return ids of versions of the given revisions that are equal to the
+    previous version of the same object.
+
+    Previous versions are found with one LAG window query over
+    (content_type, object_id, db) and versions are compared by the md5 of
+    their serialized data, nothing gets deserialized.
+    """
+    versions = Version.objects.filter(revision_id__in=revision_ids)
+    ranked = (
+        Version.objects.filter(
+            content_type_id__in=versions.values("content_type_id"),
+            object_id__in=versions.values("object_id"),
+        )
+        .annotate(
+            data_hash=MD5("serialized_data"),
+            previous_hash=Window(
+                expression=Lag(MD5("serialized_data")),
+                partition_by=[F("content_type_id"), F("object_id"), F("db")],
+                order_by=F("id").asc(),
+            ),
+        )
+        .order_by()
+        .values("id", "revision_id", "data_hash", "previous_hash")
+    )
+    sql, params = ranked.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT id FROM ({0}) AS ranked "
+            "WHERE revision_id = ANY(%s) AND data_hash = previous_hash".format(
+                sql
+            ),
+            [*params, list(revision_ids)],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def remove_duplicate_versions(revision_ids):
+    """
+    delete duplicate versions of the revisions in bulk and delete revisions
+    left without versions. return number of deleted versions.
+    """
+    with transaction.atomic():
+        version_ids = get_duplicate_version_ids(revision_ids)
+        if version_ids:
+            Version.objects.filter(id__in=version_ids).delete()
+        Revision.objects.filter(
+            id__in=revision_ids, version__isnull=True
+        ).delete()
+    return len(version_ids)
+
 
 @app.task
 def clear_versions(revision_id, versions_ids):
-    """User task just to test and check."""
-    count = 0
-    if versions_ids:
-        for version in Version.objects.filter(id__in=versions_ids):
-            previous_version = Version.objects.filter(
-                object_id=version.object_id,
-                content_type_id=version.content_type_id,
-                db=version.db,
-                id__lt=version.id,
-            ).first()
-            if not previous_version:
-                continue
-            if previous_version._local_field_dict == version._local_field_dict:
-                version.delete()
-                count += 1
-    if len(versions_ids) == count:
-        Revision.objects.only("id").get(id=revision_id).delete()
-    logger.info("revision checking ....")
+    """remove versions of the revision that don't change anything."""
+    count = remove_duplicate_versions([revision_id])
+    logger.info("revision %s: %s duplicate versions removed", revision_id, count)
+
+
+@app.task
+def compact_versions(batch_size=COMPACT_BATCH_SIZE):
+    """
+    sweep all revisions in batches and remove duplicate versions, meant to
+    be scheduled periodically.
+    """
+    last_id = 0
+    total = 0
+    while True:
+        revision_ids = list(
+            Revision.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not revision_ids:
+            break
+        total += remove_duplicate_versions(revision_ids)
+        last_id = revision_ids[-1]
+    logger.info("version compaction: %s duplicate versions removed", total)
+    return total
@@ -0,0 +1,250 @@
+import datetime
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from djmoney.contrib.exchange.models import convert_money
+from djmoney.money import Money
+from rest_framework.test import APIClient
+
+from bat.company.models import Company, Member
+from bat.market.models import AmazonAccounts, AmazonMarketplace, AmazonOrder
+from bat.setting.exchange import (
+    LocalRatesBackend,
+    get_converted_expression,
+    load_rates,
+    sum_converted,
+)
+from bat.setting.models import LogisticLeadTime, Status
+from bat.users.models import User
+
+pytestmark = pytest.mark.django_db
+
+TODAY = timezone.localdate()
+RATES = [
+    (TODAY, "EUR", "0.843211"),
+    (TODAY, "GBP", "0.731170"),
+    (TODAY, "SEK", "8.612350"),
+]
+COUNTRIES = ["SE", "DE", "GB", "US", "FR", "IT"]
+AMOUNTS = [
+    Money("19.99", "USD"),
+    Money("249.50", "EUR"),
+    Money("0.99", "GBP"),
+    Money("1234.56", "SEK"),
+    Money("75.00", "EUR"),
+    Money("3.33", "SEK"),
+]
+
+
+def create_leadtimes(user: User):
+    leadtimes = []
+    for country, amount in zip(COUNTRIES, AMOUNTS):
+        leadtimes.append(
+            LogisticLeadTime.objects.create(
+                from_country="CN",
+                to_country=country,
+                ship_type="Sea",
+                shipping_time=30,
+                misc_time=5,
+                estimated_avg_rate=amount,
+                rate_type="Kg",
+                user=user,
+            )
+        )
+    return leadtimes
+
+
+@pytest.mark.parametrize("target", ["USD", "EUR", "SEK"])
+def test_conversion_matches_djmoney(user: User, target):
+    load_rates(RATES)
+    LocalRatesBackend().update_rates()
+    leadtimes = create_leadtimes(user)
+    expected = {
+        leadtime.id: convert_money(leadtime.estimated_avg_rate, target).amount.quantize(
+            Decimal("0.01")
+        )
+        for leadtime in leadtimes
+    }
+
+    totals = sum_converted(
+        LogisticLeadTime.objects.all(),
+        "estimated_avg_rate",
+        "create_date",
+        target,
+        key="id",
+    )
+    converted = dict(
+        LogisticLeadTime.objects.annotate(
+            converted=get_converted_expression(
+                "estimated_avg_rate", "create_date", target
+            )
+        ).values_list("id", "converted")
+    )
+
+    for leadtime_id, amount in expected.items():
+        assert totals[leadtime_id] == amount
+        assert abs(converted[leadtime_id] - amount) < Decimal("0.01")
+
+
+def test_rates_of_the_order_date_are_used(user: User):
+    yesterday = TODAY - datetime.timedelta(days=1)
+    load_rates([(yesterday, "EUR", "0.4"), (TODAY, "EUR", "0.8")])
+    leadtime = create_leadtimes(user)[0]
+    LogisticLeadTime.objects.filter(pk=leadtime.pk).update(
+        create_date=leadtime.create_date - datetime.timedelta(days=1)
+    )
+
+    totals = sum_converted(
+        LogisticLeadTime.objects.filter(pk=leadtime.pk),
+        "estimated_avg_rate",
+        "create_date",
+        "EUR",
+        key="id",
+    )
+
+    assert totals[leadtime.pk] == Decimal("8.00")
+
+
+def test_rows_without_rate_are_reported(user: User):
+    load_rates(RATES[:1])
+    create_leadtimes(user)
+    missing = set()
+
+    totals = sum_converted(
+        LogisticLeadTime.objects.all(),
+        "estimated_avg_rate",
+        "create_date",
+        "USD",
+        key="to_country",
+        missing=missing,
+    )
+
+    assert missing == {"GBP", "SEK"}
+    assert set(totals) == {"SE", "DE", "FR"}
+
+
+def create_orders(user: User):
+    """
+    return a company of the user with amazon orders in USD and EUR on one
+    marketplace and in JPY, which has no rate, on another.
+    """
+    company = Company.objects.create(
+        name="company", email="info@example.com", country="SE", currency="USD"
+    )
+    Member.objects.create(
+        job_title="Admin",
+        user=user,
+        company=company,
+        invited_by=user,
+        is_admin=True,
+        invitation_accepted=True,
+    )
+    status = Status.objects.create(name="Shipped", user=user)
+    accounts = [
+        AmazonAccounts.objects.create(
+            marketplace=AmazonMarketplace.objects.create(
+                name=country, country=country, marketplaceId=country
+            ),
+            user=user,
+            company=company,
+        )
+        for country in ("DE", "JP")
+    ]
+    for order_id, account, amount in (
+        ("1", accounts[0], Money("10.00", "USD")),
+        ("2", accounts[0], Money("84.32", "EUR")),
+        ("3", accounts[1], Money("1000", "JPY")),
+    ):
+        AmazonOrder.objects.create(
+            order_id=order_id,
+            purchase_date=timezone.now(),
+            replacement="false",
+            status=status,
+            sales_channel="Amazon",
+            amount=amount,
+            amazonaccounts=account,
+        )
+    return company, accounts
+
+
+class TestOrderTotalViews:
+    def get_client(self, user: User):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client
+
+    def test_dashboard(self, user: User):
+        load_rates(RATES)
+        company, _accounts = create_orders(user)
+
+        response = self.get_client(user).get(
+            reverse(
+                "api:autoemail:email-campaign-dashboard",
+                kwargs={"company_pk": company.pk},
+            )
+        )
+
+        assert response.status_code == 200
+        assert response.data["currency"] == "USD"
+        assert response.data["total_orders"] == 3
+        # the JPY order has no rate, it is reported instead of failing
+        assert response.data["missing_rates"] == ["JPY"]
+        assert response.data["total_sales"] == Decimal("110.00")
+        assert list(response.data["data"].values()) == [Decimal("110.00")]
+
+    def test_dashboard_in_requested_currency(self, user: User):
+        load_rates(RATES)
+        company, _accounts = create_orders(user)
+
+        response = self.get_client(user).get(
+            reverse(
+                "api:autoemail:email-campaign-dashboard",
+                kwargs={"company_pk": company.pk},
+            ),
+            {"currency": "eur"},
+        )
+
+        assert response.data["currency"] == "EUR"
+        assert response.data["total_sales"] == Decimal("92.75")
+
+    def test_summary(self, user: User):
+        load_rates(RATES)
+        company, accounts = create_orders(user)
+
+        response = self.get_client(user).get(
+            reverse(
+                "api:market:company-amazon-order-summary",
+                kwargs={"company_pk": company.pk},
+            )
+        )
+
+        assert response.status_code == 200
+        assert response.data["missing_rates"] == ["JPY"]
+        assert response.data["total_sales"] == Decimal("110.00")
+        assert response.data["marketplaces"] == [
+            {
+                "marketplace": accounts[0].marketplace_id,
+                "total_sales": Decimal("110.00"),
+            }
+        ]
+
+    def test_list_converted_in_sql(self, user: User):
+        load_rates(RATES)
+        company, _accounts = create_orders(user)
+
+        response = self.get_client(user).get(
+            reverse(
+                "api:market:company-amazon-order-list",
+                kwargs={"company_pk": company.pk},
+            ),
+            {"currency": "USD"},
+        )
+
+        assert response.status_code == 200
+        converted = {
+            order["order_id"]: order["converted_amount"]
+            for order in response.data["results"]
+        }
+        assert converted == {"1": Decimal("10.00"), "2": Decimal("100.00"), "3": None}
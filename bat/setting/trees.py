@@ -0,0 +1,118 @@
+"""Cached Status and Category trees, nested json and paths by id."""
+import copy
+import time
+
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from bat.setting.models import Category, Status
+
+TREE_CACHE_TIMEOUT = 60 * 60 * 24
+# seconds a process trusts its local copy before checking the cache version
+TREE_VERSION_CHECK_SECONDS = 5
+
+_local = {}
+
+
+def get_tree_cache_keys(model):
+    label = model._meta.label_lower.replace(".", "_")
+    return "tree_{0}_version".format(label), "tree_{0}_nodes".format(label)
+
+
+def build_tree(rows):
+    """
+    return {id: {"json": .., "path": [..]}} from rows ordered by tree and
+    lft, so a parent always comes before its children.
+    """
+    nodes = {}
+    for row in rows:
+        json = {"id": row["id"], "name": row["name"], "user": row["user_id"]}
+        path = [row["name"]]
+        parent = nodes.get(row["parent_id"])
+        if parent is not None:
+            json["parent"] = parent["json"]
+            path = path + parent["path"]
+        nodes[row["id"]] = {"json": json, "path": path}
+    return nodes
+
+
+def load_tree(model):
+    """
+    return nodes of the whole tree of the model, one query on a cache miss.
+    """
+    version_key, nodes_key = get_tree_cache_keys(model)
+    now = time.monotonic()
+    local = _local.get(model)
+    if local is not None and now - local["checked"] < TREE_VERSION_CHECK_SECONDS:
+        return local["nodes"]
+
+    version = cache.get(version_key)
+    if local is not None and version is not None and local["version"] == version:
+        local["checked"] = now
+        return local["nodes"]
+
+    cached = cache.get(nodes_key) if version is not None else None
+    if cached is not None and cached["version"] == version:
+        nodes = cached["nodes"]
+    else:
+        if version is None:
+            version = int(time.time() * 1000)
+            cache.set(version_key, version, TREE_CACHE_TIMEOUT)
+        rows = model.objects.order_by("tree_id", "lft").values(
+            "id", "name", "user_id", "parent_id"
+        )
+        nodes = build_tree(rows)
+        cache.set(
+            nodes_key, {"version": version, "nodes": nodes}, TREE_CACHE_TIMEOUT
+        )
+    _local[model] = {"version": version, "nodes": nodes, "checked": now}
+    return nodes
+
+
+def invalidate_tree(model):
+    _local.pop(model, None)
+    version_key, _nodes_key = get_tree_cache_keys(model)
+    cache.delete(version_key)
+
+
+def get_node(model, pk):
+    """
+    return cached node of the pk, None when the tree has no such node.
+    """
+    if pk is None:
+        return None
+    node = load_tree(model).get(pk)
+    if node is None:
+        # may be created by another process after the local copy was checked
+        _local.pop(model, None)
+        node = load_tree(model).get(pk)
+    return node
+
+
+def get_status_json(status):
+    """
+    return json of a status with its nested parents.
+    """
+    node = get_node(Status, status.pk)
+    if node is None:
+        return None
+    return copy.deepcopy(node["json"])
+
+
+def get_tree_path(obj):
+    """
+    return names from the object up to its root, None for unknown objects.
+    """
+    node = get_node(type(obj), obj.pk)
+    if node is None:
+        return None
+    return list(node["path"])
+
+
+@receiver(post_save, sender=Status)
+@receiver(post_delete, sender=Status)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def tree_changed_receiver(sender, **kwargs):
+    invalidate_tree(sender)
@@ -0,0 +1,66 @@
+"""JWT authentication reading users from a short lived cache."""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.translation import ugettext as _
+from rest_framework import exceptions
+from rest_framework_jwt.authentication import JSONWebTokenAuthentication
+
+# a saved user is invalidated at once, the timeout only bounds staleness of
+# changes made without save() such as queryset updates
+USER_CACHE_TIMEOUT = 60
+# attribute of the HttpRequest holding the result of the first authentication
+REQUEST_AUTH_ATTRIBUTE = "_jwt_authentication"
+
+
+def get_user_cache_key(user_id):
+    return "jwt_user_{0}".format(user_id)
+
+
+def get_cached_user(user_id):
+    """
+    return user of the id from the cache, loaded with one query on a miss.
+    None when there is no such user.
+    """
+    key = get_user_cache_key(user_id)
+    user = cache.get(key)
+    if user is None:
+        user = get_user_model().objects.filter(pk=user_id).first()
+        if user is not None:
+            cache.set(key, user, USER_CACHE_TIMEOUT)
+    return user
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(get_user_cache_key(user_id))
+
+
+class CachedJSONWebTokenAuthentication(JSONWebTokenAuthentication):
+    """
+    JSONWebTokenAuthentication that looks the user up by the user id of the
+    payload through the cache, and authenticates a request only once so
+    middlewares and the view share the result.
+    """
+
+    def authenticate(self, request):
+        http_request = getattr(request, "_request", request)
+        if hasattr(http_request, REQUEST_AUTH_ATTRIBUTE):
+            return getattr(http_request, REQUEST_AUTH_ATTRIBUTE)
+        result = super().authenticate(request)
+        setattr(http_request, REQUEST_AUTH_ATTRIBUTE, result)
+        return result
+
+    def authenticate_credentials(self, payload):
+        user_id = payload.get("user_id")
+        if not user_id:
+            return super().authenticate_credentials(payload)
+
+        user = get_cached_user(user_id)
+        if user is None:
+            msg = _("Invalid signature.")
+            raise exceptions.AuthenticationFailed(msg)
+
+        if not user.is_active:
+            msg = _("User account is disabled.")
+            raise exceptions.AuthenticationFailed(msg)
+
+        return user
@@ -12,6 +12,8 @@ class EmailOrUsernameModelBackend(ModelBackend):
 
     def authenticate(self, request, username=None, password=None, **kwargs):
         """Check up codes."""
+        # both iexact lookups are served by the UPPER() indexes of the user
+        # table, see migration 0015_user_upper_indexes
         try:
             user = UserModel.objects.get(
                 Q(username__iexact=username) | Q(email__iexact=username))
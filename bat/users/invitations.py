@@ -0,0 +1,186 @@
+"""Acceptance of member and vendor invitations."""
+import logging
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils.translation import ugettext_lazy as _
+from invitations.utils import get_invitation_model
+from notifications.signals import notify
+from rolepermissions.exceptions import RoleDoesNotExist
+from rolepermissions.roles import RolesManager
+from rolepermissions.utils import camel_or_snake_to_title
+
+from bat.company.models import Company, CompanyType, Member
+
+logger = logging.getLogger(__name__)
+Invitation = get_invitation_model()
+User = get_user_model()
+
+
+def get_or_create_permissions(permission_names):
+    """
+    return the permissions of the names, missing ones are created with one
+    query instead of one get_or_create per permission as rolepermissions
+    does.
+    """
+    content_type = ContentType.objects.get_for_model(User)
+    permission_names = set(permission_names)
+    permissions = Permission.objects.filter(
+        content_type=content_type, codename__in=permission_names
+    )
+    missing = permission_names - {permission.codename for permission in permissions}
+    if missing:
+        Permission.objects.bulk_create(
+            [
+                Permission(
+                    content_type=content_type,
+                    codename=codename,
+                    name=camel_or_snake_to_title(codename),
+                )
+                for codename in missing
+            ],
+            ignore_conflicts=True,
+        )
+        permissions = Permission.objects.filter(
+            content_type=content_type, codename__in=permission_names
+        )
+    return list(permissions)
+
+
+def grant_role(member, role, perms):
+    """
+    assign the role to the member keeping only the role's default
+    permissions listed in perms, permissions are added in bulk so the number
+    of queries doesn't depend on the number of permissions.
+
+    same result as assign_role followed by revoke_permission of every
+    default permission not in perms.
+    """
+    role_cls = RolesManager.retrieve_role(role)
+    if role_cls is None:
+        raise RoleDoesNotExist
+    perms = set(perms)
+    permission_names = [
+        name
+        for name, default in getattr(role_cls, "available_permissions", {}).items()
+        if default and name in perms
+    ]
+    group, _created = role_cls.get_or_create_group()
+    member.groups.add(group)
+    if permission_names:
+        member.user_permissions.add(*get_or_create_permissions(permission_names))
+    return group
+
+
+def _accept_vendor_invitation(invitation, user, job_title, role, perms):
+    company_detail = invitation.company_detail
+    company_id = company_detail["company_id"]
+    vendor_type = company_detail["vendor_type"]
+
+    member = (
+        Member.objects.filter(user=user, is_admin=True)
+        .select_related("company")
+        .first()
+    )
+    if member:
+        vendor = member.company
+    else:
+        vendor = Company.objects.create(
+            name=company_detail["vendor_name"], email=invitation.email
+        )
+        member, _c = Member.objects.get_or_create(
+            job_title=job_title,
+            user=user,
+            company=vendor,
+            invited_by=invitation.inviter,
+            is_admin=True,
+            is_active=True,
+            invitation_accepted=True,
+        )
+        grant_role(member, role, perms)
+
+    companytype, _cc = CompanyType.objects.select_related(
+        "category"
+    ).get_or_create(
+        partner=vendor,
+        company_id=company_id,
+        category_id=vendor_type.get("id", None),
+    )
+
+    category = companytype.category
+    if category.extra_data:
+        partner_category = category.extra_data.get("partner_category")
+
+        if partner_category:
+            CompanyType.objects.get_or_create(
+                partner_id=company_id, company=vendor, category_id=partner_category
+            )
+    return member
+
+
+def _accept_member_invitation(invitation, user, job_title, role, perms):
+    member, _c = Member.objects.select_related("company").get_or_create(
+        job_title=job_title,
+        user=user,
+        company_id=invitation.company_detail["company_id"],
+        invited_by=invitation.inviter,
+        is_admin=False,
+        is_active=True,
+        invitation_accepted=True,
+    )
+    grant_role(member, role, perms)
+    return member
+
+
+def accept_invitation(invitation, user):
+    """
+    make the user a member of the invited company, or of a new vendor
+    company for vendor invitations, notify the inviter and delete the
+    invitation. Accepting an invitation again does nothing, return the
+    member or None when the invitation was already accepted.
+    """
+    with transaction.atomic():
+        invitation = (
+            Invitation.objects.select_for_update()
+            .select_related("inviter")
+            .filter(pk=invitation.pk)
+            .first()
+        )
+        if invitation is None:
+            return None
+
+        job_title = invitation.user_detail["job_title"]
+        role = invitation.user_roles["role"]
+        perms = invitation.user_roles["perms"]
+        if invitation.extra_data["type"] == "Vendor Invitation":
+            member = _accept_vendor_invitation(
+                invitation, user, job_title, role, perms
+            )
+        else:
+            member = _accept_member_invitation(
+                invitation, user, job_title, role, perms
+            )
+        invitation.delete()
+
+    notify.send(
+        user,
+        recipient=invitation.inviter,
+        verb=_("Accepted your invitation"),
+        target=member.company,
+    )
+    return member
+
+
+def accept_invitations(user):
+    """
+    accept all invitations of the user's email accepted before the user
+    signed up or logged in.
+    """
+    members = []
+    for invitation in Invitation.objects.filter(email=user.email, accepted=True):
+        member = accept_invitation(invitation, user)
+        if member is not None:
+            members.append(member)
+    return members
@@ -0,0 +1,95 @@
+"""Time login lookups and per request JWT authentication."""
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from rest_framework_jwt.settings import api_settings
+
+from bat.users.authentication import (
+    CachedJSONWebTokenAuthentication,
+    invalidate_cached_user,
+)
+from bat.users.backends import EmailOrUsernameModelBackend
+
+
+class Command(BaseCommand):
+    help = (
+        "Time EmailOrUsernameModelBackend lookups by username and email, "
+        "and JWT authentication of a request with a cold and a warm user "
+        "cache, for an existing user."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=50)
+        parser.add_argument("--password", default="")
+        parser.add_argument("username")
+
+    def handle(self, *args, **options):
+        user = (
+            get_user_model()
+            .objects.filter(username__iexact=options["username"])
+            .first()
+        )
+        if user is None:
+            raise CommandError("No such user.")
+        connection.force_debug_cursor = True
+
+        backend = EmailOrUsernameModelBackend()
+        for name, login in (("username", user.username), ("email", user.email)):
+            self.report(
+                "login " + name,
+                lambda: backend.authenticate(
+                    None,
+                    username=login.upper(),
+                    password=options["password"],
+                ),
+                options["repeat"],
+            )
+        self.explain(user)
+
+        token = api_settings.JWT_ENCODE_HANDLER(
+            api_settings.JWT_PAYLOAD_HANDLER(user)
+        )
+        factory = RequestFactory()
+        authentication = CachedJSONWebTokenAuthentication()
+
+        def _authenticate(cold):
+            if cold:
+                invalidate_cached_user(user.pk)
+            request = factory.get(
+                "/", HTTP_AUTHORIZATION="JWT {0}".format(token)
+            )
+            # twice, as by the timezone middleware and the view
+            authentication.authenticate(request)
+            authentication.authenticate(request)
+
+        self.report("jwt cold cache", lambda: _authenticate(True), options["repeat"])
+        self.report("jwt warm cache", lambda: _authenticate(False), options["repeat"])
+
+    def report(self, name, func, repeat):
+        timings = []
+        queries = 0
+        for _i in range(repeat):
+            start_queries = len(connection.queries_log)
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+            queries += len(connection.queries_log) - start_queries
+        self.stdout.write(
+            "{0:<16} median={1:.2f}ms max={2:.2f}ms queries/run={3:.1f}".format(
+                name,
+                statistics.median(timings),
+                max(timings),
+                queries / repeat,
+            )
+        )
+
+    def explain(self, user):
+        """Print the plan of the login lookup to check the indexes are used."""
+        queryset = get_user_model().objects.filter(
+            username__iexact=user.username
+        ) | get_user_model().objects.filter(email__iexact=user.username)
+        self.stdout.write(queryset.explain())
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+# iexact lookups compile to UPPER("column"::text) = UPPER(%s) on postgres,
+# the expressions below match them so login lookups use the indexes.
+CREATE_INDEXES_SQL = """
+CREATE INDEX IF NOT EXISTS users_user_username_upper_idx ON users_user (UPPER("username"::text));
+CREATE INDEX IF NOT EXISTS users_user_email_upper_idx ON users_user (UPPER("email"::text));
+"""
+
+DROP_INDEXES_SQL = """
+DROP INDEX IF EXISTS users_user_username_upper_idx;
+DROP INDEX IF EXISTS users_user_email_upper_idx;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0014_auto_20210305_0839'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_INDEXES_SQL, DROP_INDEXES_SQL),
+    ]
@@ -5,6 +5,7 @@ from rest_auth.registration.serializers import RegisterSerializer
 from rest_auth.serializers import PasswordResetSerializer
 from rest_framework import serializers
 
+from bat.users.invitations import accept_invitations
 from bat.users.models import InvitationDetail, UserLoginActivity
 
 Invitation = get_invitation_model()
@@ -56,6 +57,7 @@ class RestAuthRegisterSerializer(RegisterSerializer):
         user.first_name = self.cleaned_data.get("first_name")
         user.last_name = self.cleaned_data.get("last_name")
         user.save()
+        accept_invitations(user)
 
 
 class InvitationSerializer(serializers.ModelSerializer):
@@ -0,0 +1,32 @@
+import pytest
+from django.test import RequestFactory
+from rest_framework_jwt.settings import api_settings
+
+from bat.users.authentication import CachedJSONWebTokenAuthentication
+from bat.users.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+def get_jwt_request(rf: RequestFactory, user: User):
+    token = api_settings.JWT_ENCODE_HANDLER(api_settings.JWT_PAYLOAD_HANDLER(user))
+    return rf.get("/fake-url/", HTTP_AUTHORIZATION="JWT {0}".format(token))
+
+
+def test_jwt_user_is_cached(user: User, rf: RequestFactory, query_budget):
+    authentication = CachedJSONWebTokenAuthentication()
+    assert authentication.authenticate(get_jwt_request(rf, user))[0] == user
+
+    with query_budget(0):
+        assert authentication.authenticate(get_jwt_request(rf, user))[0] == user
+
+
+def test_jwt_user_cache_invalidated_on_save(user: User, rf: RequestFactory):
+    authentication = CachedJSONWebTokenAuthentication()
+    authentication.authenticate(get_jwt_request(rf, user))
+
+    user.timezone = "Europe/Berlin"
+    user.save()
+
+    cached, _token = authentication.authenticate(get_jwt_request(rf, user))
+    assert cached.timezone == "Europe/Berlin"
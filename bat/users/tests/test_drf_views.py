@@ -32,3 +32,13 @@ class TestUserViewSet:
             "name": user.name,
             "url": f"http://testserver/api/users/{user.username}/",
         }
+
+    def test_me_query_budget(self, user: User, rf: RequestFactory, query_budget):
+        view = UserViewSet()
+        request = rf.get("/fake-url/")
+        request.user = user
+
+        view.request = request
+
+        with query_budget(0):
+            view.me(request)
@@ -0,0 +1,125 @@
+import pytest
+from rolepermissions.roles import RolesManager
+
+from bat.company.models import Company, CompanyType, Member
+from bat.setting.models import Category
+from bat.users.invitations import accept_invitation, get_or_create_permissions
+from bat.users.models import InvitationDetail, User
+from bat.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def create_role(role):
+    """
+    create the group and permissions of the role, as a database where the
+    role was granted before.
+    """
+    role_cls = RolesManager.retrieve_role(role)
+    role_cls.get_or_create_group()
+    get_or_create_permissions(role_cls.permission_names_list())
+    return list(role_cls.permission_names_list())
+
+
+def create_invitation(user: User, role, perms):
+    inviter = UserFactory()
+    company = Company.objects.create(name="company", email="info@example.com", country="SE")
+    invitation = InvitationDetail.create(
+        email=user.email,
+        inviter=inviter,
+        user_detail={"job_title": "Staff"},
+        company_detail={"company_id": company.id},
+        user_roles={"role": role, "perms": perms},
+        extra_data={"type": "Member Invitation"},
+    )
+    return invitation, company
+
+
+def create_vendor_invitation(user: User, perms):
+    inviter = UserFactory()
+    company = Company.objects.create(name="company", email="info@example.com", country="SE")
+    category = Category.objects.create(name="vendor", user=inviter, is_vendor_category=True)
+    invitation = InvitationDetail.create(
+        email=user.email,
+        inviter=inviter,
+        user_detail={"job_title": "Owner"},
+        company_detail={
+            "company_id": company.id,
+            "vendor_name": "vendor",
+            "vendor_type": {"id": category.id},
+        },
+        user_roles={"role": "vendor_admin", "perms": perms},
+        extra_data={"type": "Vendor Invitation"},
+    )
+    return invitation, company
+
+
+class TestAcceptInvitation:
+    def test_query_budget(self, user: User, query_budget):
+        perms = create_role("company_admin")
+        invitation, company = create_invitation(user, "company_admin", perms[1:])
+
+        # invitation, member, group, permissions, delete and notification
+        with query_budget(17):
+            member = accept_invitation(invitation, user)
+
+        assert member.company == company
+        assert set(member.user_permissions.values_list("codename", flat=True)) == set(
+            perms[1:]
+        )
+        assert list(member.groups.values_list("name", flat=True)) == ["company_admin"]
+        assert not InvitationDetail.objects.filter(pk=invitation.pk).exists()
+
+    def test_queries_independent_of_permissions(self, user: User, query_budget):
+        perms = create_role("company_admin")
+        counts = []
+        for granted in (perms[:1], perms):
+            invitee = UserFactory()
+            invitation, _company = create_invitation(invitee, "company_admin", granted)
+            with query_budget(17) as context:
+                accept_invitation(invitation, invitee)
+            counts.append(len(context.captured_queries))
+
+        assert counts[0] == counts[1]
+
+    def test_vendor_invitation_query_budget(self, user: User, query_budget):
+        perms = create_role("vendor_admin")
+        invitation, company = create_vendor_invitation(user, perms)
+
+        # the member queries plus the vendor company, its company type and
+        # category
+        with query_budget(22):
+            member = accept_invitation(invitation, user)
+
+        assert member.is_admin
+        assert member.company.name == "vendor"
+        assert set(member.user_permissions.values_list("codename", flat=True)) == set(
+            perms
+        )
+        assert CompanyType.objects.filter(
+            partner=member.company, company=company
+        ).exists()
+        assert not InvitationDetail.objects.filter(pk=invitation.pk).exists()
+
+    def test_missing_permissions_are_created(self, user: User):
+        perms = list(RolesManager.retrieve_role("company_admin").permission_names_list())
+        invitation, _company = create_invitation(user, "company_admin", perms)
+
+        member = accept_invitation(invitation, user)
+
+        assert member.user_permissions.count() == len(perms)
+
+    def test_accept_twice(self, user: User):
+        perms = create_role("company_admin")
+        invitation, company = create_invitation(user, "company_admin", perms)
+
+        accept_invitation(invitation, user)
+
+        assert accept_invitation(invitation, user) is None
+        assert Member.objects.filter(user=user, company=company).count() == 1
+
+    def test_user_save_does_not_query_invitations(self, user: User, query_budget):
+        create_invitation(user, "company_admin", [])
+
+        with query_budget(1):
+            user.save()
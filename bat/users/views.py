@@ -1,5 +1,4 @@
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_save
 from django.shortcuts import get_object_or_404
 from django.utils.translation import gettext_lazy as _
 from invitations.utils import get_invitation_model
@@ -12,6 +11,7 @@ from rest_framework.response import Response
 
 from bat.company.utils import get_list_of_roles_permissions
 from bat.users import serializers
+from bat.users.invitations import accept_invitation
 
 from bat.users.models import UserLoginActivity
 
@@ -67,14 +67,10 @@ class InvitationViewSet(viewsets.ReadOnlyModelViewSet):
     def accept(self, request, pk=None):
         """
         accept invitation
-        and perform signals to complete tasks
+        and add the user to the invited company
         """
         instance = self.get_object()
-        instance.accepted = True
-        instance.save()
-        post_save.send(
-            User, instance=self.request.user, created=False, using=None
-        )
+        accept_invitation(instance, self.request.user)
         return Response(
             {"detail": _("Accepted successfully")}, status=status.HTTP_200_OK
         )
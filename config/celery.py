@@ -1,11 +1,27 @@
-"""Celery setup for scheduled tasks."""
+"""
+Celery setup for scheduled tasks.
+
+Tasks are routed to one queue per workload so a burst on one queue doesn't
+starve the others, each queue is served by its own worker:
+
+    celery -A config worker -Q sync -c 2 --prefetch-multiplier 1
+    celery -A config worker -Q email -c 8 --prefetch-multiplier 4
+    celery -A config worker -Q housekeeping -c 2 --prefetch-multiplier 1
+    celery -A config worker -Q documents -c 2 --prefetch-multiplier 1
+    celery -A config worker -Q default -c 4
+
+see WORKER_QUEUES, a worker without -Q consumes all queues.
+"""
 from __future__ import absolute_import
 
 import os
+import time
 
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import before_task_publish
 from django.conf import settings
+from kombu import Exchange, Queue
 
 # set the default Django settings module for the 'celery' program.
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.production")
@@ -13,15 +29,130 @@ app = Celery(
     "bat",
     broker=settings.REDIS_URL,
     backend=settings.REDIS_URL,
-    include=["bat.users.tasks", "bat.setting.tasks", "bat.market.tasks", "bat.autoemail.tasks"],
+    include=[
+        "bat.users.tasks",
+        "bat.setting.tasks",
+        "bat.market.tasks",
+        "bat.autoemail.tasks",
+        "bat.company.tasks",
+        "bat.product.tasks",
+    ],
 )
 
+QUEUE_DEFAULT = "default"
+QUEUE_SYNC = "sync"
+QUEUE_EMAIL = "email"
+QUEUE_HOUSEKEEPING = "housekeeping"
+QUEUE_DOCUMENTS = "documents"
+
+# the redis transport consumes lower numbers first
+PRIORITY_USER = 0
+PRIORITY_DEFAULT = 5
+
+# header holding the publish time, used to report the age of queued tasks
+SENT_AT_HEADER = "sent_at"
+
+# worker settings and task options per queue. acks_late tasks are redelivered
+# when a worker dies, only idempotent workloads use it: emails aren't sent
+# twice, imports and renders are safe to repeat.
+WORKER_QUEUES = {
+    QUEUE_DEFAULT: {
+        "concurrency": 4,
+        "prefetch_multiplier": 4,
+        "task_options": {"soft_time_limit": 5 * 60, "time_limit": 6 * 60},
+    },
+    QUEUE_SYNC: {
+        "concurrency": 2,
+        "prefetch_multiplier": 1,
+        "task_options": {
+            "acks_late": True,
+            "soft_time_limit": 30 * 60,
+            "time_limit": 35 * 60,
+        },
+    },
+    QUEUE_EMAIL: {
+        "concurrency": 8,
+        "prefetch_multiplier": 4,
+        "task_options": {"soft_time_limit": 60, "time_limit": 90},
+    },
+    QUEUE_HOUSEKEEPING: {
+        "concurrency": 2,
+        "prefetch_multiplier": 1,
+        "task_options": {
+            "acks_late": True,
+            "soft_time_limit": 10 * 60,
+            "time_limit": 12 * 60,
+        },
+    },
+    QUEUE_DOCUMENTS: {
+        "concurrency": 2,
+        "prefetch_multiplier": 1,
+        "task_options": {
+            "acks_late": True,
+            "soft_time_limit": 5 * 60,
+            "time_limit": 6 * 60,
+        },
+    },
+}
+
+TASK_ROUTES = {
+    "bat.market.tasks.*": {"queue": QUEUE_SYNC},
+    "bat.autoemail.tasks.*": {"queue": QUEUE_EMAIL},
+    "bat.setting.tasks.clear_versions": {"queue": QUEUE_HOUSEKEEPING},
+    "bat.setting.tasks.compact_versions": {"queue": QUEUE_HOUSEKEEPING},
+    "bat.company.tasks.forecast_inventory": {"queue": QUEUE_HOUSEKEEPING},
+    "bat.company.tasks.forecast_all_inventories": {"queue": QUEUE_HOUSEKEEPING},
+    "bat.company.tasks.snapshot_inventory": {"queue": QUEUE_HOUSEKEEPING},
+    "bat.company.tasks.render_pdf_file": {"queue": QUEUE_DOCUMENTS},
+    "bat.product.tasks.process_image": {"queue": QUEUE_DOCUMENTS},
+}
+
+
+def get_task_queue(name):
+    """
+    return queue of a task name by TASK_ROUTES, QUEUE_DEFAULT when no route
+    matches.
+    """
+    for pattern, route in TASK_ROUTES.items():
+        if name == pattern or (
+            pattern.endswith("*") and name.startswith(pattern[:-1])
+        ):
+            return route["queue"]
+    return QUEUE_DEFAULT
+
+
+class QueueTaskAnnotations:
+    """Apply the task options of a task's queue to the task class."""
+
+    def annotate(self, task):
+        return WORKER_QUEUES[get_task_queue(task.name)]["task_options"]
+
+
 app.conf.update(
     CELERY_TASK_SERIALIZER="json",
     CELERY_RESULT_SERIALIZER="json",
     CELERY_TASK_RESULT_EXPIRES=3600,
     CELERY_TIMEZONE="UTC",
-    CELERYBEAT_SCHEDULER="django_celery_beat.schedulers:DatabaseScheduler"
+    CELERYBEAT_SCHEDULER="django_celery_beat.schedulers:DatabaseScheduler",
+    CELERY_DEFAULT_QUEUE=QUEUE_DEFAULT,
+    CELERY_QUEUES=[
+        Queue(queue, Exchange(queue), routing_key=queue) for queue in WORKER_QUEUES
+    ],
+    CELERY_ROUTES=TASK_ROUTES,
+    CELERY_ANNOTATIONS=[QueueTaskAnnotations()],
+    CELERY_DEFAULT_PRIORITY=PRIORITY_DEFAULT,
+    # tasks started by a user triggered task keep its priority
+    CELERY_INHERIT_PARENT_PRIORITY=True,
+    # a long task doesn't hold prefetched messages of other tasks, workers of
+    # short task queues raise it with --prefetch-multiplier
+    CELERYD_PREFETCH_MULTIPLIER=1,
+    BROKER_TRANSPORT_OPTIONS={
+        "priority_steps": list(range(10)),
+        "queue_order_strategy": "priority",
+        # longer than the longest time limit, or acks_late tasks still
+        # running are delivered again
+        "visibility_timeout": 2 * 60 * 60,
+    },
     # CELERYBEAT_SCHEDULE={
     #     "task1": {
     #         "task": "bat.users.tasks.task1",
@@ -31,6 +162,12 @@ app.conf.update(
 )
 
 
+@before_task_publish.connect
+def set_sent_at_header(headers=None, **kwargs):
+    if headers is not None:
+        headers.setdefault(SENT_AT_HEADER, time.time())
+
+
 @app.task(bind=True)
 def debug_task(self):
     print('Request: {0!r}'.format(self.request))
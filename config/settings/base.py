@@ -84,6 +84,7 @@ THIRD_PARTY_APPS = [
     "django_countries",
     # Currency and currency conversion
     "djmoney",
+    "djmoney.contrib.exchange",
     # Django defender
     "defender",
     # Django Modified Preorder Tree Traversal
@@ -172,6 +173,8 @@ AUTH_PASSWORD_VALIDATORS = [
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#middleware
 MIDDLEWARE = [
+    # request profiling, removed at startup unless REQUEST_PROFILING_ENABLED
+    "bat.setting.middleware.RequestProfilingMiddleware",
     # Cors Middleware
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
@@ -196,6 +199,12 @@ MIDDLEWARE = [
     "defender.middleware.FailedLoginMiddleware",
 ]
 
+# REQUEST PROFILING
+# ------------------------------------------------------------------------------
+# see bat.setting.middleware.RequestProfilingMiddleware
+REQUEST_PROFILING_ENABLED = env.bool("REQUEST_PROFILING_ENABLED", default=False)
+REQUEST_PROFILING_BUFFER_SIZE = env.int("REQUEST_PROFILING_BUFFER_SIZE", default=200)
+
 # STATIC
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#static-root
@@ -216,6 +225,11 @@ STATICFILES_FINDERS = [
 MEDIA_ROOT = str(APPS_DIR / "media")
 # https://docs.djangoproject.com/en/dev/ref/settings/#media-url
 MEDIA_URL = "/media/"
+# uploaded images wait here until a celery worker moves them to the storage,
+# must be shared between web and worker processes.
+IMAGE_STAGING_ROOT = env("IMAGE_STAGING_ROOT", default=str(APPS_DIR / "staging"))
+# recorded catalog api payloads read instead of calling the api, see bat.market.catalog
+AMAZON_CATALOG_FIXTURES_DIR = env("AMAZON_CATALOG_FIXTURES_DIR", default=None)
 
 # TEMPLATES
 # ------------------------------------------------------------------------------
@@ -341,7 +355,7 @@ SOCIALACCOUNT_ADAPTER = "bat.users.adapters.SocialAccountAdapter"
 # django-rest-framework - https://www.django-rest-framework.org/api-guide/settings/
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_jwt.authentication.JSONWebTokenAuthentication",
+        "bat.users.authentication.CachedJSONWebTokenAuthentication",
         "rest_framework.authentication.SessionAuthentication",
         # "rest_framework.authentication.TokenAuthentication",
     ),
@@ -370,6 +384,12 @@ REST_AUTH_SERIALIZERS = {
     "PASSWORD_RESET_SERIALIZER": "bat.users.serializers.PasswordSerializer",
 }
 
+# django-money
+# rates of bat.setting.models.ExchangeRate are units per BASE_CURRENCY, the
+# local backend feeds them to djmoney's convert_money without network access
+BASE_CURRENCY = "USD"
+EXCHANGE_BACKEND = "bat.setting.exchange.LocalRatesBackend"
+
 # jwt
 JWT_AUTH = {"JWT_EXPIRATION_DELTA": timedelta(seconds=36000)}
 